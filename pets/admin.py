@@ -1,7 +1,12 @@
 from django.contrib import admin
-from .models import Pet, Evento, Meta, ItemCompra # <-- Mudança aqui
+from .models import Pet, Evento, Meta, ItemCompra, Lembrete, PesoRegistro, RelatorioSnapshot, Tarefa, ProgressoImportacao # <-- Mudança aqui
 
 admin.site.register(Pet)
 admin.site.register(Evento)
 admin.site.register(Meta)
-admin.site.register(ItemCompra) # <-- Mudança aqui
\ No newline at end of file
+admin.site.register(ItemCompra) # <-- Mudança aqui
+admin.site.register(Lembrete)
+admin.site.register(PesoRegistro)
+admin.site.register(RelatorioSnapshot)
+admin.site.register(Tarefa)
+admin.site.register(ProgressoImportacao)
@@ -0,0 +1,158 @@
+# ==============================================================================
+# AGENDA DO TUTOR (TODOS OS PETS) E FEED iCALENDAR
+# ==============================================================================
+# Os eventos únicos da janela vêm de UMA consulta por faixa de data
+# (Evento JOIN Pet filtrando por tutor, select_related('pet')): o banco percorre
+# os pets do tutor pelo índice (tutor, nome) e, para cada um, faz um range scan
+# no índice (pet, data). Os recorrentes vêm de uma segunda consulta (só as
+# séries) e são expandidos como em pets/recorrencia.py.
+#
+# O .ics é gerado linha a linha (StreamingHttpResponse) e os clientes de
+# calendário se autenticam com um token na URL, já que não têm a sessão.
+import hashlib
+from datetime import timedelta, timezone as fuso
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from . import recorrencia
+from .models import Evento, Pet
+
+# Janela do feed: um pouco do passado e o próximo ano
+FEED_DIAS_ANTES = 90
+FEED_DIAS_DEPOIS = 365
+TAMANHO_CHUNK = 500
+
+DIAS_ICS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+FREQUENCIAS_ICS = {'diaria': 'DAILY', 'semanal': 'WEEKLY', 'mensal': 'MONTHLY'}
+
+
+def _eventos_do_tutor(tutor):
+    return Evento.objects.filter(pet__tutor=tutor).select_related('pet')
+
+
+def eventos_unicos(tutor, inicio, fim):
+    return _eventos_do_tutor(tutor).filter(recorrencia='', data__range=(inicio, fim)).order_by('data', 'pet__nome', 'id')
+
+
+def itens_da_agenda(tutor, inicio, fim):
+    """Eventos únicos + ocorrências dos recorrentes em [inicio, fim], por data e pet."""
+    itens = list(eventos_unicos(tutor, inicio, fim))
+    itens.extend(recorrencia.expandir(recorrencia.series_na_janela(_eventos_do_tutor(tutor), inicio, fim), inicio, fim))
+    itens.sort(key=lambda item: (item.data, item.pet.nome, item.pk))
+    return itens
+
+
+# --- Token do feed ---
+
+def _assinatura(user):
+    # Depende do hash da senha: trocar a senha revoga os links de calendário antigos
+    return salted_hmac('vetlab.agenda', f'{user.pk}:{user.password}').hexdigest()[:32]
+
+
+def token_agenda(user):
+    return f'{user.pk}-{_assinatura(user)}'
+
+
+def usuario_do_token(token):
+    pk, _, assinatura = (token or '').partition('-')
+    if not pk.isdigit() or not assinatura:
+        return None
+    user = User.objects.filter(pk=pk, is_active=True).first()
+    if user is None or not constant_time_compare(assinatura, _assinatura(user)):
+        return None
+    return user
+
+
+# --- Versão do feed (GET condicional) ---
+
+def carimbo_agenda(tutor):
+    """
+    (última alteração, etag) da agenda em uma consulta. PetStats.atualizado_em
+    muda a cada escrita em eventos do pet (inclusive exclusões e conclusões de
+    ocorrências); a contagem de pets cobre pets removidos.
+    """
+    dados = Pet.objects.filter(tutor=tutor).aggregate(
+        pets=Count('pk'), pet=Max('atualizado_em'), stats=Max('stats__atualizado_em'),
+    )
+    datas = [data for data in (dados['pet'], dados['stats']) if data is not None]
+    ultima = max(datas) if datas else None
+    # A janela anda com o dia, então a data de hoje também entra na versão
+    partes = (tutor.pk, dados['pets'], ultima.isoformat() if ultima else '', timezone.localdate().isoformat())
+    return ultima, hashlib.sha1('|'.join(str(parte) for parte in partes).encode()).hexdigest()
+
+
+# --- iCalendar ---
+
+def _escapar(texto):
+    return (
+        str(texto).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _dobrar(linha):
+    """Quebra linhas com mais de 75 octetos (RFC 5545, 3.1)."""
+    dados = linha.encode()
+    if len(dados) <= 75:
+        return linha + '\r\n'
+    partes, atual = [], b''
+    for caractere in linha:
+        codificado = caractere.encode()
+        if len(atual) + len(codificado) > (75 if not partes else 74):
+            partes.append(atual.decode())
+            atual = b''
+        atual += codificado
+    partes.append(atual.decode())
+    return '\r\n '.join(partes) + '\r\n'
+
+
+def _regra(evento):
+    regra = [f'FREQ={FREQUENCIAS_ICS[evento.recorrencia]}', f'INTERVAL={evento.intervalo}']
+    if evento.recorrencia == 'semanal' and evento.dias_semana_lista():
+        regra.append('BYDAY=' + ','.join(DIAS_ICS[dia] for dia in evento.dias_semana_lista()))
+    if evento.recorrencia == 'mensal' and evento.data.day > 28:
+        # Dia 29-31 cai no último dia nos meses mais curtos, como em recorrencia.datas()
+        regra.append('BYMONTHDAY=' + ','.join(str(dia) for dia in range(28, evento.data.day + 1)) + ';BYSETPOS=-1')
+    if evento.repetir_ate:
+        regra.append(f'UNTIL={evento.repetir_ate:%Y%m%d}')
+    return ';'.join(regra)
+
+
+def _vevento(evento, dominio):
+    resumo = f'{evento.get_tipo_display()} — {evento.pet.nome}'
+    if evento.concluido:
+        resumo = f'[Concluído] {resumo}'
+    linhas = [
+        'BEGIN:VEVENT',
+        f'UID:evento-{evento.pk}@{dominio}',
+        f'DTSTAMP:{evento.atualizado_em.astimezone(fuso.utc):%Y%m%dT%H%M%SZ}',
+        f'DTSTART;VALUE=DATE:{evento.data:%Y%m%d}',
+        f'DTEND;VALUE=DATE:{evento.data + timedelta(days=1):%Y%m%d}',
+        f'SUMMARY:{_escapar(resumo)}',
+    ]
+    if evento.observacoes:
+        linhas.append(f'DESCRIPTION:{_escapar(evento.observacoes)}')
+    if evento.recorrencia:
+        linhas.append(f'RRULE:{_regra(evento)}')
+    linhas.append('END:VEVENT')
+    return ''.join(_dobrar(linha) for linha in linhas)
+
+
+def linhas_ics(tutor, dominio, hoje=None):
+    """Gera o calendário em pedaços: cabeçalho, um VEVENT por evento/série, rodapé."""
+    hoje = hoje or timezone.localdate()
+    inicio, fim = hoje - timedelta(days=FEED_DIAS_ANTES), hoje + timedelta(days=FEED_DIAS_DEPOIS)
+    yield ''.join(_dobrar(linha) for linha in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//VETLAB//Agenda dos Pets//PT-BR',
+        'CALSCALE:GREGORIAN', f'X-WR-CALNAME:{_escapar(f"VETLAB — {tutor.username}")}',
+    ))
+    for evento in eventos_unicos(tutor, inicio, fim).iterator(chunk_size=TAMANHO_CHUNK):
+        yield _vevento(evento, dominio)
+    # Séries: um VEVENT com RRULE cada, o próprio cliente expande as ocorrências
+    series = _eventos_do_tutor(tutor).exclude(recorrencia='').filter(data__lte=fim).exclude(repetir_ate__lt=inicio)
+    for evento in series.order_by('id').iterator(chunk_size=TAMANHO_CHUNK):
+        yield _vevento(evento, dominio)
+    yield _dobrar('END:VCALENDAR')
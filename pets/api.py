@@ -0,0 +1,273 @@
+# ==============================================================================
+# API JSON (v1)
+# ==============================================================================
+# Endpoints para o app mobile e integrações. As listas são
+# serializadas direto de .values() (sem instanciar models), paginadas por
+# cursor (pets/paginacao.py) e aceitam ?fields= para devolver só as colunas
+# pedidas. A checagem de dono é a mesma das páginas HTML (views.pet_do_tutor).
+# As escritas em lote (POST cria, PATCH altera) passam por pets/lote.py.
+import json
+from datetime import date, datetime, time
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+
+from django.db.models import Value
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+
+from . import busca as busca_textual, lote, pesos
+from .models import Evento, ItemCompra, Meta, Pet, PetStats
+from .paginacao import paginar
+from .views import (
+    ORDENACAO_EVENTOS, ORDENACAO_ITENS_A_COMPRAR, ORDENACAO_METAS, pet_do_tutor,
+)
+
+TAMANHO_PADRAO = 20
+TAMANHO_MAXIMO = 100
+
+CAMPOS_PET = ('id', 'nome', 'especie', 'raca', 'data_nascimento', 'peso', 'atualizado_em')
+CAMPOS_EVENTO = (
+    'id', 'pet_id', 'tipo', 'data', 'observacoes', 'concluido', 'atualizado_em',
+    'recorrencia', 'intervalo', 'dias_semana', 'repetir_ate',
+)
+CAMPOS_META = ('id', 'pet_id', 'descricao', 'data_prazo', 'progresso', 'atualizado_em')
+CAMPOS_ITEM = ('id', 'pet_id', 'descricao', 'criado_em', 'comprado', 'atualizado_em')
+
+ORDENACAO_PETS = ('nome', 'id')
+
+VERDADEIRO = {'1', 'true', 'sim'}
+FALSO = {'0', 'false', 'nao', 'não'}
+
+
+class ErroApi(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+def api_view(view=None, *, metodos=('GET', 'HEAD')):
+    """Endpoint autenticado por sessão, com erros (401/404/405/400) em JSON."""
+    if view is None:
+        return lambda view: api_view(view, metodos=metodos)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in metodos:
+            return JsonResponse({'erro': 'Método não permitido.'}, status=405, headers={'Allow': ', '.join(metodos)})
+        if not request.user.is_authenticated:
+            return JsonResponse({'erro': 'Autenticação necessária.'}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return JsonResponse({'erro': 'Não encontrado.'}, status=404)
+        except ErroApi as erro:
+            return JsonResponse({'erro': erro.mensagem}, status=erro.status)
+        except ValidationError as erro:
+            return JsonResponse({'erro': 'Lote inválido.', 'detalhes': erro.messages}, status=400)
+    return wrapper
+
+
+# --- Parâmetros de consulta ---
+
+def _campos_pedidos(request, permitidos):
+    bruto = request.GET.get('fields')
+    if not bruto:
+        return list(permitidos)
+    campos = [campo.strip() for campo in bruto.split(',') if campo.strip()]
+    invalidos = [campo for campo in campos if campo not in permitidos]
+    if invalidos:
+        raise ErroApi(f"Campos inválidos em 'fields': {', '.join(invalidos)}. Permitidos: {', '.join(permitidos)}.")
+    return campos
+
+
+def _booleano(request, nome):
+    valor = request.GET.get(nome)
+    if valor is None:
+        return None
+    if valor.lower() in VERDADEIRO:
+        return True
+    if valor.lower() in FALSO:
+        return False
+    raise ErroApi(f"'{nome}' deve ser true ou false.")
+
+
+def _data(request, nome):
+    valor = request.GET.get(nome)
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ErroApi(f"'{nome}' deve estar no formato AAAA-MM-DD.")
+
+
+def _tamanho(request):
+    valor = request.GET.get('limite')
+    if not valor:
+        return TAMANHO_PADRAO
+    try:
+        tamanho = int(valor)
+    except ValueError:
+        raise ErroApi("'limite' deve ser um número inteiro.")
+    if not 1 <= tamanho <= TAMANHO_MAXIMO:
+        raise ErroApi(f"'limite' deve estar entre 1 e {TAMANHO_MAXIMO}.")
+    return tamanho
+
+
+def _lista(request, queryset, ordenacao, permitidos):
+    """Pagina `queryset` como linhas de .values() com os campos pedidos + os da ordenação."""
+    campos = _campos_pedidos(request, permitidos)
+    necessarios = list(dict.fromkeys([*campos, *(campo.lstrip('-') for campo in ordenacao)]))
+    pagina = paginar(request, queryset.values(*necessarios), ordenacao, tamanho=_tamanho(request))
+
+    extras = set(necessarios) - set(campos)
+    resultados = pagina.itens
+    if extras:
+        resultados = [{campo: linha[campo] for campo in campos} for linha in resultados]
+    proximo = request.build_absolute_uri(pagina.url_proxima) if pagina.url_proxima else None
+    return JsonResponse({'resultados': resultados, 'proximo': proximo})
+
+
+def _corpo_json(request, chave):
+    try:
+        corpo = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        raise ErroApi("Corpo da requisição não é um JSON válido.")
+    linhas = corpo.get(chave) if isinstance(corpo, dict) else None
+    if not isinstance(linhas, list) or not all(isinstance(linha, dict) for linha in linhas):
+        raise ErroApi(f"Envie um objeto JSON com a lista '{chave}'.")
+    return linhas
+
+
+# --- Endpoints ---
+
+@api_view
+def pets(request):
+    return _lista(request, Pet.objects.filter(tutor=request.user), ORDENACAO_PETS, CAMPOS_PET)
+
+
+@api_view
+def pet_detalhe(request, pk):
+    campos = _campos_pedidos(request, CAMPOS_PET)
+    linha = Pet.objects.filter(pk=pk, tutor=request.user).values(*campos, *(f'stats__{c}' for c in PetStats.CONTADORES)).first()
+    if linha is None:
+        raise Http404
+    dados = {campo: linha[campo] for campo in campos}
+    dados['stats'] = {contador: linha[f'stats__{contador}'] or 0 for contador in PetStats.CONTADORES}
+    return JsonResponse(dados)
+
+
+@api_view
+def pet_eventos(request, pk):
+    pet = pet_do_tutor(request, pk, Pet.objects.only('pk'))
+    eventos = Evento.objects.filter(pet=pet)
+
+    tipo = request.GET.get('tipo')
+    if tipo:
+        tipos_validos = [valor for valor, _ in Evento.TIPOS_EVENTO]
+        if tipo not in tipos_validos:
+            raise ErroApi(f"'tipo' deve ser um de: {', '.join(tipos_validos)}.")
+        eventos = eventos.filter(tipo=tipo)
+    concluido = _booleano(request, 'concluido')
+    if concluido is not None:
+        eventos = eventos.filter(concluido=concluido)
+    data_de, data_ate = _data(request, 'data_de'), _data(request, 'data_ate')
+    if data_de:
+        eventos = eventos.filter(data__gte=data_de)
+    if data_ate:
+        eventos = eventos.filter(data__lte=data_ate)
+
+    return _lista(request, eventos, ORDENACAO_EVENTOS, CAMPOS_EVENTO)
+
+
+@api_view
+def pet_metas(request, pk):
+    pet = pet_do_tutor(request, pk, Pet.objects.only('pk'))
+    metas = Meta.objects.filter(pet=pet)
+
+    concluida = _booleano(request, 'concluida')
+    if concluida is not None:
+        metas = metas.filter(progresso=100) if concluida else metas.filter(progresso__lt=100)
+    prazo_de, prazo_ate = _data(request, 'prazo_de'), _data(request, 'prazo_ate')
+    if prazo_de:
+        metas = metas.filter(data_prazo__gte=prazo_de)
+    if prazo_ate:
+        metas = metas.filter(data_prazo__lte=prazo_ate)
+
+    return _lista(request, metas, ORDENACAO_METAS, CAMPOS_META)
+
+
+@api_view
+def pet_compras(request, pk):
+    pet = pet_do_tutor(request, pk, Pet.objects.only('pk'))
+    itens = ItemCompra.objects.filter(pet=pet)
+
+    comprado = _booleano(request, 'comprado')
+    if comprado is not None:
+        # Value() mantém a comparação usável pelo índice (pet, comprado, criado_em)
+        itens = itens.filter(comprado=Value(comprado))
+    criado_de, criado_ate = _data(request, 'criado_de'), _data(request, 'criado_ate')
+    if criado_de:
+        itens = itens.filter(criado_em__date__gte=criado_de)
+    if criado_ate:
+        itens = itens.filter(criado_em__date__lte=criado_ate)
+
+    return _lista(request, itens, ORDENACAO_ITENS_A_COMPRAR, CAMPOS_ITEM)
+
+
+@api_view
+def pet_pesos(request, pk):
+    """Histórico de peso para o gráfico, já reduzido pelo banco a no máximo ?pontos= pontos."""
+    pet = pet_do_tutor(request, pk, Pet.objects.only('pk'))
+    valor = request.GET.get('pontos') or pesos.PONTOS_PADRAO
+    try:
+        pontos = int(valor)
+    except ValueError:
+        raise ErroApi("'pontos' deve ser um número inteiro.")
+    if not 2 <= pontos <= pesos.PONTOS_MAXIMO:
+        raise ErroApi(f"'pontos' deve estar entre 2 e {pesos.PONTOS_MAXIMO}.")
+    de, ate = _data(request, 'de'), _data(request, 'ate')
+    inicio = timezone.make_aware(datetime.combine(de, time.min)) if de else None
+    fim = timezone.make_aware(datetime.combine(ate, time.max)) if ate else None
+    return JsonResponse(pesos.serie(pet, inicio, fim, pontos))
+
+
+@api_view
+def busca(request):
+    texto = request.GET.get('q', '').strip()[:200]
+    if not busca_textual.termos(texto):
+        raise ErroApi("Parâmetro 'q' obrigatório.")
+    resultados = busca_textual.buscar(request.user, texto, _tamanho(request))
+    return JsonResponse({'resultados': [
+        {
+            'tipo': resultado.registro,
+            'id': resultado.objeto.pk,
+            'pet_id': resultado.pet.pk,
+            'titulo': resultado.titulo,
+            'trecho': resultado.trecho_texto,
+            'relevancia': resultado.relevancia,
+        }
+        for resultado in resultados
+    ]})
+
+
+@api_view(metodos=('POST', 'PATCH'))
+def eventos_lote(request):
+    linhas = _corpo_json(request, 'eventos')
+    if request.method == 'POST':
+        criados = lote.criar_eventos(request.user, linhas)
+        return JsonResponse({'criados': [evento.pk for evento in criados]}, status=201)
+    atualizados = lote.atualizar_eventos(request.user, linhas)
+    return JsonResponse({'atualizados': [evento.pk for evento in atualizados]})
+
+
+@api_view(metodos=('POST', 'PATCH'))
+def compras_lote(request):
+    linhas = _corpo_json(request, 'itens')
+    if request.method == 'POST':
+        criados = lote.criar_itens(request.user, linhas)
+        return JsonResponse({'criados': [item.pk for item in criados]}, status=201)
+    atualizados = lote.atualizar_itens(request.user, linhas)
+    return JsonResponse({'atualizados': [item.pk for item in atualizados]})
@@ -0,0 +1,15 @@
+from django.urls import path
+from . import api
+
+# Incluídas em project/urls.py com o prefixo 'api/v1/'
+urlpatterns = [
+    path('pets/', api.pets, name='api_pets'),
+    path('pets/<int:pk>/', api.pet_detalhe, name='api_pet_detalhe'),
+    path('pets/<int:pk>/eventos/', api.pet_eventos, name='api_pet_eventos'),
+    path('pets/<int:pk>/metas/', api.pet_metas, name='api_pet_metas'),
+    path('pets/<int:pk>/compras/', api.pet_compras, name='api_pet_compras'),
+    path('pets/<int:pk>/pesos/', api.pet_pesos, name='api_pet_pesos'),
+    path('busca/', api.busca, name='api_busca'),
+    path('eventos/lote/', api.eventos_lote, name='api_eventos_lote'),
+    path('compras/lote/', api.compras_lote, name='api_compras_lote'),
+]
@@ -0,0 +1,488 @@
+# ==============================================================================
+# BENCHMARK DAS VIEWS (`manage.py benchmark_vetlab`)
+# ==============================================================================
+# Chama cada rota de pets/urls.py pelo Client de testes do Django, logado como
+# um tutor da base (normalmente gerada por `manage.py seed_vetlab`), e mede
+# latência (p50/p95/p99) e quantidade de consultas de cada uma. Cada requisição
+# roda dentro de uma transação desfeita no fim: rotas que gravam (concluir,
+# marcar item, ...) podem ser repetidas e a base não muda entre execuções.
+#
+# O resultado é um dict serializável em JSON; `comparar()` confronta com um
+# resultado anterior (baseline) e lista as regressões: mais consultas que
+# antes, ou p95 acima da tolerância.
+#
+# `carga()` é outro tipo de medida: vazão com requisições simultâneas, pelo
+# handler WSGI (views síncronas) ou ASGI (views assíncronas) do próprio Django.
+# `conexoes()` mede quanto custa abrir a conexão do banco a cada requisição e
+# `sessoes()`, as consultas que a sessão/mensagens custam num POST-redirect-GET.
+# `transferencia()` mede bytes enviados e tempo de render no perfil de settings
+# atual (rode uma vez com cada VETLAB_PERFIL para comparar).
+import asyncio
+import copy
+import gzip
+import io
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, transaction
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from .models import Evento, ItemCompra, Meta, Pet, Tarefa
+from .urls import urlpatterns
+from .urls_assincronas import ASSINCRONAS
+
+REPETICOES = 20
+AQUECIMENTO = 2
+TOLERANCIA = 0.25
+# Variações de p95 abaixo disso (ms) são ruído, não regressão
+MINIMO_REGRESSAO_MS = 5.0
+
+# Rotas que não fazem sentido repetir (logout derrubaria a sessão do benchmark)
+IGNORADAS = {'logout'}
+# Só medidas quando o tutor do benchmark é da equipe (para os outros dão 403)
+SO_EQUIPE = {'relatorios'}
+# Carga: requisições e simultâneas padrão, e o ROOT_URLCONF de cada modo
+REQUISICOES_CARGA = 400
+CONCORRENCIA = 16
+URLCONF_DO_MODO = {'wsgi': 'project.urls', 'asgi': 'project.urls_assincronas'}
+# Conexões: o CONN_MAX_AGE de cada modo
+MODOS_CONEXAO = {'nova': 0, 'persistente': 600}
+# Transferência: o que um navegador atual aceita, e os loaders de template sem cache (referência)
+ACCEPT_ENCODING = 'gzip, deflate, br'
+LOADERS_SEM_CACHE = ['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader']
+# Sessões: (SESSION_ENGINE, MESSAGE_STORAGE) de cada modo; 'db' é o padrão do Django
+MODOS_SESSAO = {
+    'db': ('django.contrib.sessions.backends.db', 'django.contrib.messages.storage.fallback.FallbackStorage'),
+    'db_mensagens_na_sessao': ('django.contrib.sessions.backends.db', 'django.contrib.messages.storage.session.SessionStorage'),
+    'cached_db': ('django.contrib.sessions.backends.cached_db', 'django.contrib.messages.storage.fallback.FallbackStorage'),
+    'signed_cookies': ('django.contrib.sessions.backends.signed_cookies', 'django.contrib.messages.storage.fallback.FallbackStorage'),
+}
+
+# Query string de cada rota que precisa de uma
+PARAMETROS = {
+    'busca': {'q': 'vacina'},
+    'exportar': {'formato': 'jsonl'},
+}
+
+
+def alvos(tutor):
+    """Pet (o com mais eventos), evento, meta, item e exportação pronta do tutor usados nos parâmetros das rotas."""
+    pet = Pet.objects.filter(tutor=tutor).order_by('-stats__total_eventos', 'pk').first()
+    if pet is None:
+        raise ValueError(f"O tutor {tutor.username} não tem pets.")
+    return {
+        'pet': pet.pk,
+        'evento': Evento.objects.filter(pet=pet, recorrencia='').values_list('pk', flat=True).first(),
+        'meta': Meta.objects.filter(pet=pet).values_list('pk', flat=True).first(),
+        'item': ItemCompra.objects.filter(pet=pet).values_list('pk', flat=True).first(),
+        'tarefa': Tarefa.objects.filter(tutor=tutor, tipo='exportacao', situacao='concluida').values_list('pk', flat=True).last(),
+    }
+
+
+def _alvo_do_parametro(nome_rota, parametro):
+    if parametro == 'pet_pk':
+        return 'pet'
+    if nome_rota.startswith('evento_'):
+        return 'evento'
+    if nome_rota.startswith('meta_'):
+        return 'meta'
+    if nome_rota.startswith('shop_item_'):
+        return 'item'
+    if nome_rota.startswith('tarefa_'):
+        return 'tarefa'
+    return 'pet'
+
+
+def rotas(ids):
+    """(nome, caminho) de cada rota de pets/urls.py, com os parâmetros preenchidos por `ids` (de alvos())."""
+    for padrao in urlpatterns:
+        if not isinstance(padrao, URLPattern) or not padrao.name or padrao.name in IGNORADAS:
+            continue
+        parametros = {nome: ids[_alvo_do_parametro(padrao.name, nome)] for nome in padrao.pattern.converters}
+        if None in parametros.values():
+            continue  # ex.: pet sem metas
+        yield padrao.name, reverse(padrao.name, kwargs=parametros)
+
+
+def _percentil(amostras, p):
+    if len(amostras) == 1:
+        return amostras[0]
+    return statistics.quantiles(amostras, n=100, method='inclusive')[p - 1]
+
+
+def _requisicao(client, caminho, parametros):
+    with transaction.atomic():
+        inicio = time.perf_counter()
+        resposta = client.get(caminho, parametros)
+        if resposta.streaming:
+            # Exportação/.ics: o tempo inclui gerar o corpo inteiro
+            for _ in resposta.streaming_content:
+                pass
+        duracao = time.perf_counter() - inicio
+        transaction.set_rollback(True)
+    return resposta.status_code, duracao
+
+
+def executar(tutor, repeticoes=REPETICOES, aquecimento=AQUECIMENTO, sem_cache=False, somente=None, progresso=None):
+    """
+    Mede as rotas (todas, ou só as de `somente`) como `tutor`. `sem_cache`
+    esvazia o cache antes de cada requisição (pior caso). Devolve o resultado
+    para salvar em JSON.
+    """
+    client = Client(SERVER_NAME='localhost')
+    client.force_login(tutor)
+    resultado = {
+        'gerado_em': timezone.now().isoformat(),
+        'banco': connection.vendor,
+        'tutor': tutor.username,
+        'repeticoes': repeticoes,
+        'sem_cache': sem_cache,
+        'rotas': {},
+    }
+
+    for nome, caminho in rotas(alvos(tutor)):
+        if (somente and nome not in somente) or (nome in SO_EQUIPE and not tutor.is_staff):
+            continue
+        parametros = PARAMETROS.get(nome, {})
+        for _ in range(aquecimento):
+            _requisicao(client, caminho, parametros)
+
+        duracoes, consultas, status = [], 0, None
+        for _ in range(repeticoes):
+            if sem_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                status, duracao = _requisicao(client, caminho, parametros)
+            duracoes.append(duracao * 1000)
+            consultas = max(consultas, len(capturadas))
+
+        resultado['rotas'][nome] = {
+            'caminho': caminho,
+            'status': status,
+            'consultas': consultas,
+            'p50_ms': round(_percentil(duracoes, 50), 2),
+            'p95_ms': round(_percentil(duracoes, 95), 2),
+            'p99_ms': round(_percentil(duracoes, 99), 2),
+            'max_ms': round(max(duracoes), 2),
+        }
+        if progresso:
+            progresso(nome, resultado['rotas'][nome])
+    return resultado
+
+
+def comparar(atual, baseline, tolerancia=TOLERANCIA):
+    """Regressões de `atual` em relação a `baseline` (mensagens; lista vazia = nenhuma)."""
+    regressoes = []
+    for nome, medida in atual['rotas'].items():
+        anterior = baseline.get('rotas', {}).get(nome)
+        if anterior is None:
+            continue
+        if medida['consultas'] > anterior['consultas']:
+            regressoes.append(f"{nome}: {medida['consultas']} consultas (antes {anterior['consultas']})")
+        limite = anterior['p95_ms'] * (1 + tolerancia)
+        if medida['p95_ms'] > limite and medida['p95_ms'] - anterior['p95_ms'] >= MINIMO_REGRESSAO_MS:
+            regressoes.append(f"{nome}: p95 {medida['p95_ms']:.1f} ms (antes {anterior['p95_ms']:.1f} ms, limite {limite:.1f} ms)")
+    return regressoes
+
+
+# --- Carga: WSGI (síncrono) x ASGI (assíncrono) ---
+
+def _cookies(tutor):
+    client = Client()
+    client.force_login(tutor)
+    return '; '.join(f'{nome}={morsel.value}' for nome, morsel in client.cookies.items())
+
+
+def _wsgi(handler, caminho, cookie):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0),
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    status = []
+    inicio = time.perf_counter()
+    resposta = handler(environ, lambda linha, cabecalhos, exc_info=None: status.append(linha))
+    try:
+        for _ in resposta:
+            pass
+    finally:
+        resposta.close()  # dispara request_finished (fecha/recicla a conexão do banco), como o servidor faria
+    return int(status[0].split()[0]), time.perf_counter() - inicio
+
+
+def _carga_wsgi(caminhos, cookie, concorrencia):
+    # Um pool de threads sobre o WSGIHandler, como um worker gthread do gunicorn
+    handler = WSGIHandler()
+    with ThreadPoolExecutor(concorrencia) as executor:
+        return list(executor.map(lambda caminho: _wsgi(handler, caminho, cookie), caminhos))
+
+
+def _carga_asgi(caminhos, cookie, concorrencia):
+    # Tarefas num único event loop sobre o ASGIHandler, como um worker do uvicorn
+    handler = ASGIHandler()
+
+    async def requisicao(caminho, vagas):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': caminho, 'raw_path': caminho.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        mensagens = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        status = []
+
+        async def receive():
+            if mensagens:
+                return mensagens.pop()
+            await asyncio.Future()  # o cliente nunca desconecta; o Django cancela a espera no fim
+
+        async def send(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                status.append(mensagem['status'])
+
+        async with vagas:
+            inicio = time.perf_counter()
+            await handler(scope, receive, send)
+            return status[0], time.perf_counter() - inicio
+
+    async def todas():
+        vagas = asyncio.Semaphore(concorrencia)
+        return await asyncio.gather(*(requisicao(caminho, vagas) for caminho in caminhos))
+
+    return asyncio.run(todas())
+
+
+def carga(tutor, modo, requisicoes=REQUISICOES_CARGA, concorrencia=CONCORRENCIA, somente=None):
+    """
+    Vazão de `requisicoes` GETs, `concorrencia` por vez, em rodízio pelas páginas
+    com versão assíncrona (ou pelas rotas de `somente`), pelo handler `modo`
+    ('wsgi' ou 'asgi') do Django, sem servidor HTTP no meio: a diferença medida
+    é a do handler e das views. Nada é desfeito, então use só rotas de leitura.
+    """
+    if modo not in URLCONF_DO_MODO:
+        raise ValueError(f"Modo inválido: {modo} (use {' ou '.join(URLCONF_DO_MODO)}).")
+    nomes = set(somente or ASSINCRONAS)
+    caminhos = [caminho for nome, caminho in rotas(alvos(tutor)) if nome in nomes]
+    if not caminhos:
+        raise ValueError("Nenhuma rota para a carga.")
+    sequencia = [caminhos[i % len(caminhos)] for i in range(requisicoes)]
+    cookie = _cookies(tutor)
+    disparar = _carga_wsgi if modo == 'wsgi' else _carga_asgi
+
+    with override_settings(ROOT_URLCONF=URLCONF_DO_MODO[modo]):
+        disparar(caminhos * 2, cookie, concorrencia)  # aquecimento: cache das páginas e imports
+        inicio = time.perf_counter()
+        medidas = disparar(sequencia, cookie, concorrencia)
+        segundos = time.perf_counter() - inicio
+
+    duracoes = [duracao * 1000 for _, duracao in medidas]
+    return {
+        'modo': modo,
+        'requisicoes': requisicoes,
+        'concorrencia': concorrencia,
+        'rotas': sorted(nomes),
+        'segundos': round(segundos, 3),
+        'req_por_s': round(requisicoes / segundos, 1),
+        'p50_ms': round(_percentil(duracoes, 50), 2),
+        'p95_ms': round(_percentil(duracoes, 95), 2),
+        'p99_ms': round(_percentil(duracoes, 99), 2),
+        'falhas': sum(1 for status, _ in medidas if status != 200),
+    }
+
+
+# --- Conexões: uma nova por requisição x persistente (CONN_MAX_AGE) ---
+
+def conexoes(tutor, requisicoes=REQUISICOES_CARGA, somente=None):
+    """
+    Custo de abrir a conexão do banco a cada requisição: as mesmas rotas de
+    leitura, uma de cada vez pelo WSGIHandler, com CONN_MAX_AGE=0 (conexão
+    nova por requisição) e com conexão persistente (CONN_HEALTH_CHECKS como
+    estiver configurado). Com o pool do psycopg ligado (OPTIONS['pool']) mede
+    só a configuração atual. A diferença das médias é o custo por requisição.
+    """
+    nomes = set(somente or ASSINCRONAS)
+    caminhos = [caminho for nome, caminho in rotas(alvos(tutor)) if nome in nomes]
+    if not caminhos:
+        raise ValueError("Nenhuma rota para medir.")
+    sequencia = [caminhos[i % len(caminhos)] for i in range(requisicoes)]
+    cookie = _cookies(tutor)
+    handler = WSGIHandler()
+    configuracao = connection.settings_dict
+    modos = {'pool': configuracao['CONN_MAX_AGE']} if 'pool' in configuracao.get('OPTIONS', {}) else MODOS_CONEXAO
+    abertas = []
+
+    def contar(sender, **kwargs):
+        abertas.append(sender)
+
+    resultado = {'banco': connection.vendor, 'requisicoes': requisicoes, 'health_checks': configuracao['CONN_HEALTH_CHECKS'], 'modos': {}}
+    idade_original = configuracao['CONN_MAX_AGE']
+    connection_created.connect(contar)
+    try:
+        for modo, idade in modos.items():
+            # A idade vale para a próxima conexão aberta: fecha a atual antes de trocar
+            connection.close()
+            configuracao['CONN_MAX_AGE'] = idade
+            for caminho in caminhos * 2:  # aquecimento: cache das páginas e imports
+                _wsgi(handler, caminho, cookie)
+            abertas.clear()
+            medidas = [_wsgi(handler, caminho, cookie) for caminho in sequencia]
+            duracoes = [duracao * 1000 for _, duracao in medidas]
+            resultado['modos'][modo] = {
+                'conexoes_abertas': len(abertas),
+                'media_ms': round(statistics.fmean(duracoes), 3),
+                'p50_ms': round(_percentil(duracoes, 50), 3),
+                'p95_ms': round(_percentil(duracoes, 95), 3),
+                'falhas': sum(1 for status, _ in medidas if status != 200),
+            }
+    finally:
+        connection_created.disconnect(contar)
+        connection.close()
+        configuracao['CONN_MAX_AGE'] = idade_original
+
+    if {'nova', 'persistente'} <= resultado['modos'].keys():
+        nova, persistente = resultado['modos']['nova'], resultado['modos']['persistente']
+        resultado['custo_conexao_ms'] = round(nova['media_ms'] - persistente['media_ms'], 3)
+    return resultado
+
+
+# --- Sessões e mensagens: evento_adicionar -> evento_list ---
+
+def sessoes(tutor, repeticoes=REPETICOES, aquecimento=AQUECIMENTO):
+    """
+    Consultas de cada ciclo POST evento_adicionar -> redirect -> GET evento_list
+    (duas requisições) com cada combinação de MODOS_SESSAO, e quantas delas
+    vão à tabela de sessões. Tudo roda numa transação desfeita no fim, como o
+    benchmark por rota. `economia_por_requisicao` compara com o modo 'db'.
+    """
+    adicionar = reverse('evento_adicionar', kwargs={'pet_pk': alvos(tutor)['pet']})
+    dados = {'tipo': 'consulta', 'data': timezone.localdate().isoformat(), 'observacoes': ''}
+    resultado = {'banco': connection.vendor, 'repeticoes': repeticoes, 'modos': {}}
+
+    for modo, (engine, mensagens) in MODOS_SESSAO.items():
+        with override_settings(SESSION_ENGINE=engine, MESSAGE_STORAGE=mensagens), transaction.atomic():
+            client = Client(SERVER_NAME='localhost')
+            client.force_login(tutor)
+            post = get = sessao = falhas = 0
+            duracoes = []
+            for i in range(aquecimento + repeticoes):
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    resposta = client.post(adicionar, dados)
+                    antes_do_get = len(consultas)
+                    pagina = client.get(resposta['Location'])
+                    duracao = time.perf_counter() - inicio
+                if i < aquecimento:
+                    continue
+                post += antes_do_get
+                get += len(consultas) - antes_do_get
+                sessao += sum(1 for consulta in consultas.captured_queries if 'django_session' in consulta['sql'])
+                falhas += resposta.status_code != 302 or pagina.status_code != 200
+                duracoes.append(duracao * 1000)
+            transaction.set_rollback(True)
+        resultado['modos'][modo] = {
+            'session_engine': engine,
+            'message_storage': mensagens,
+            'consultas_post': round(post / repeticoes, 2),
+            'consultas_get': round(get / repeticoes, 2),
+            'consultas_sessao': round(sessao / repeticoes, 2),
+            'ciclo_ms': round(statistics.fmean(duracoes), 2),
+            'falhas': falhas,
+        }
+
+    base = resultado['modos']['db']
+    for medida in resultado['modos'].values():
+        total = medida['consultas_post'] + medida['consultas_get']
+        medida['economia_por_requisicao'] = round((base['consultas_post'] + base['consultas_get'] - total) / 2, 2)
+    return resultado
+
+
+# --- Transferência: bytes enviados e render no perfil atual ---
+
+def _server_timing(resposta, nome):
+    # Medidas da instrumentação (pets/instrumentacao.py), em ms
+    return float(re.search(rf'{nome};dur=([\d.]+)', resposta['Server-Timing']).group(1))
+
+
+def _corpo(resposta):
+    conteudo = b''.join(resposta.streaming_content) if resposta.streaming else resposta.content
+    if hasattr(resposta, 'close'):
+        resposta.close()
+    return conteudo
+
+
+def transferencia(tutor, repeticoes=REPETICOES, somente=None):
+    """
+    Para as páginas de leitura (ou as rotas de `somente`): bytes do HTML, bytes
+    transferidos para um navegador que aceita gzip/br e tempos de render e da
+    requisição com os TEMPLATES atuais e, como referência, sem o loader em
+    cache. Para os estáticos que essas páginas usam: bytes originais,
+    transferidos e o Cache-Control. O cache de páginas é esvaziado antes de
+    cada requisição, para o template ser de fato renderizado.
+    """
+    nomes = set(somente or ASSINCRONAS)
+    caminhos = [(nome, caminho) for nome, caminho in rotas(alvos(tutor)) if nome in nomes]
+    if not caminhos:
+        raise ValueError("Nenhuma rota para medir.")
+    sem_cache = copy.deepcopy(settings.TEMPLATES)
+    sem_cache[0]['APP_DIRS'] = False
+    sem_cache[0].setdefault('OPTIONS', {})['loaders'] = LOADERS_SEM_CACHE
+    client = Client(SERVER_NAME='localhost', HTTP_ACCEPT_ENCODING=ACCEPT_ENCODING)
+    client.force_login(tutor)
+    resultado = {
+        'perfil': settings.VETLAB_PERFIL, 'debug': settings.DEBUG, 'repeticoes': repeticoes,
+        'paginas': {}, 'estaticos': {},
+    }
+
+    estaticos = set()
+    for nome, caminho in caminhos:
+        tempos = {}
+        for loaders, templates in (('atual', settings.TEMPLATES), ('sem_cache', sem_cache)):
+            with override_settings(TEMPLATES=templates):
+                render, total = [], []
+                for i in range(repeticoes + 1):  # a primeira compila e guarda os templates
+                    cache.clear()
+                    resposta = client.get(caminho)
+                    corpo = _corpo(resposta)
+                    if i:
+                        render.append(_server_timing(resposta, 'tpl'))
+                        total.append(_server_timing(resposta, 'total'))
+                # O render não inclui carregar/compilar o template: a diferença do loader aparece no total
+                tempos[loaders] = (round(statistics.fmean(render), 2), round(statistics.fmean(total), 2))
+        html = gzip.decompress(corpo) if resposta.get('Content-Encoding') == 'gzip' else corpo
+        estaticos.update(re.findall(r'(?:href|src)="(%s[^"]+)"' % re.escape(settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL), html.decode()))
+        resultado['paginas'][nome] = {
+            'status': resposta.status_code,
+            'bytes_html': len(html),
+            'bytes_transferidos': len(corpo),
+            'content_encoding': resposta.get('Content-Encoding', ''),
+            'render_ms': tempos['atual'][0],
+            'total_ms': tempos['atual'][1],
+            'render_sem_cache_ms': tempos['sem_cache'][0],
+            'total_sem_cache_ms': tempos['sem_cache'][1],
+        }
+
+    for url in sorted(estaticos):
+        original = client.get(url, HTTP_ACCEPT_ENCODING='identity')
+        comprimido = client.get(url)
+        resultado['estaticos'][url] = {
+            'status': comprimido.status_code,
+            'bytes_originais': len(_corpo(original)),
+            'bytes_transferidos': len(_corpo(comprimido)),
+            'content_encoding': comprimido.get('Content-Encoding', ''),
+            'cache_control': comprimido.get('Cache-Control', ''),
+        }
+    return resultado
+
@@ -0,0 +1,191 @@
+# ==============================================================================
+# BUSCA TEXTUAL (PETS, OBSERVAÇÕES DE EVENTOS, METAS E LISTA DE COMPRAS)
+# ==============================================================================
+# Três implementações, escolhidas pelo banco em uso:
+#   - PostgreSQL: full-text search do próprio banco (to_tsvector/websearch_to_tsquery
+#     em português), com índices GIN de expressão criados na migração 0010.
+#     O SearchVector daqui precisa ser idêntico ao da migração para o índice valer.
+#   - SQLite: tabela virtual FTS5 `pets_busca`, mantida por triggers (0010). O
+#     rowid codifica (tabela, id) e a coluna `tutor` restringe a busca ao tutor
+#     dentro do próprio índice.
+#   - Outros bancos (ou SQLite sem FTS5): icontains, sem ranking.
+# Os resultados vêm ordenados por relevância e sempre filtrados pelo tutor.
+import re
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Evento, ItemCompra, Meta, Pet
+
+LIMITE = 20
+MAXIMO_TERMOS = 10
+CONFIG_POSTGRES = 'portuguese'
+TABELA_FTS = 'pets_busca'
+
+# Marcadores do trecho destacado (trocados por <mark> depois do escape)
+INICIO_DESTAQUE, FIM_DESTAQUE = '\x02', '\x03'
+
+# registro -> (código no rowid do FTS5, model, campos pesquisados, campo do trecho, caminho até o tutor, url)
+TABELAS = {
+    'pet': (0, Pet, ('nome', 'especie', 'raca'), 'nome', 'tutor', 'pet_visao_geral'),
+    'evento': (1, Evento, ('tipo', 'observacoes'), 'observacoes', 'pet__tutor', 'evento_list'),
+    'meta': (2, Meta, ('descricao',), 'descricao', 'pet__tutor', 'meta_list'),
+    'item_compra': (3, ItemCompra, ('descricao',), 'descricao', 'pet__tutor', 'shop_list'),
+}
+REGISTRO_POR_CODIGO = {codigo: registro for registro, (codigo, *_) in TABELAS.items()}
+
+
+class Resultado:
+    def __init__(self, registro, objeto, trecho, relevancia):
+        self.registro = registro
+        self.objeto = objeto
+        self.trecho = trecho
+        self.relevancia = relevancia
+
+    @property
+    def pet(self):
+        return self.objeto if self.registro == 'pet' else self.objeto.pet
+
+    @property
+    def titulo(self):
+        if self.registro == 'pet':
+            return f"Pet: {self.objeto.nome}"
+        if self.registro == 'evento':
+            return f"{self.objeto.get_tipo_display()} de {self.pet.nome} em {self.objeto.data:%d/%m/%Y}"
+        if self.registro == 'meta':
+            return f"Meta de {self.pet.nome}: {self.objeto.descricao}"
+        return f"Compra para {self.pet.nome}: {self.objeto.descricao}"
+
+    @property
+    def url(self):
+        return reverse(TABELAS[self.registro][5], args=[self.pet.pk])
+
+    @property
+    def trecho_html(self):
+        return mark_safe(escape(self.trecho).replace(INICIO_DESTAQUE, '<mark>').replace(FIM_DESTAQUE, '</mark>'))
+
+    @property
+    def trecho_texto(self):
+        return self.trecho.replace(INICIO_DESTAQUE, '').replace(FIM_DESTAQUE, '')
+
+
+def termos(texto):
+    return re.findall(r'\w+', (texto or '').lower())[:MAXIMO_TERMOS]
+
+
+def buscar(tutor, texto, limite=LIMITE):
+    """Até `limite` resultados do tutor para `texto`, do mais para o menos relevante."""
+    if not termos(texto):
+        return []
+    if connection.vendor == 'postgresql':
+        return _buscar_postgres(tutor, texto, limite)
+    if connection.vendor == 'sqlite':
+        try:
+            # Savepoint: se o SQLite não tiver FTS5 (tabela não criada na migração) a transação segue válida
+            with transaction.atomic():
+                return _buscar_fts5(tutor, texto, limite)
+        except OperationalError:
+            pass
+    return _buscar_simples(tutor, texto, limite)
+
+
+def _base(registro, tutor):
+    _, model, _, _, caminho, _ = TABELAS[registro]
+    queryset = model.objects.filter(**{caminho: tutor})
+    return queryset if registro == 'pet' else queryset.select_related('pet')
+
+
+def _ordenar(resultados, limite):
+    resultados.sort(key=lambda resultado: -resultado.relevancia)
+    return resultados[:limite]
+
+
+# --- PostgreSQL ---
+
+def vetor(registro):
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector(*TABELAS[registro][2], config=CONFIG_POSTGRES)
+
+
+def _buscar_postgres(tutor, texto, limite):
+    from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+
+    consulta = SearchQuery(texto, config=CONFIG_POSTGRES, search_type='websearch')
+    resultados = []
+    for registro, (_, _, _, campo_trecho, _, _) in TABELAS.items():
+        # Uma consulta por tabela: o filtro usa a mesma expressão do índice GIN
+        linhas = (
+            _base(registro, tutor)
+            .annotate(documento=vetor(registro))
+            .filter(documento=consulta)
+            .annotate(
+                relevancia=SearchRank(vetor(registro), consulta),
+                trecho=SearchHeadline(
+                    campo_trecho, consulta, config=CONFIG_POSTGRES,
+                    start_sel=INICIO_DESTAQUE, stop_sel=FIM_DESTAQUE, max_words=25, min_words=8,
+                ),
+            )
+            .order_by('-relevancia')[:limite]
+        )
+        resultados.extend(Resultado(registro, obj, obj.trecho or '', obj.relevancia) for obj in linhas)
+    return _ordenar(resultados, limite)
+
+
+# --- SQLite FTS5 ---
+
+def _consulta_fts5(tutor, texto):
+    # Cada termo vira uma frase com prefixo ("alerg"* acha "alergia"); termos só
+    # com \w, então não há como injetar sintaxe do FTS5
+    busca = ' '.join(f'"{termo}"*' for termo in termos(texto))
+    return f'tutor : "t{tutor.pk}" AND texto : ({busca})'
+
+
+def _buscar_fts5(tutor, texto, limite):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, snippet({TABELA_FTS}, 0, %s, %s, '…', 16), rank FROM {TABELA_FTS} "
+            f"WHERE {TABELA_FTS} MATCH %s ORDER BY rank LIMIT %s",
+            [INICIO_DESTAQUE, FIM_DESTAQUE, _consulta_fts5(tutor, texto), limite],
+        )
+        linhas = cursor.fetchall()
+
+    encontrados = {}
+    for rowid, trecho, rank in linhas:
+        pk, codigo = divmod(rowid, 4)
+        encontrados.setdefault(REGISTRO_POR_CODIGO[codigo], {})[pk] = (trecho, -rank)
+
+    resultados = []
+    for registro, por_pk in encontrados.items():
+        # Carrega os objetos de cada tabela de uma vez (e confere o tutor de novo)
+        for obj in _base(registro, tutor).filter(pk__in=por_pk):
+            trecho, relevancia = por_pk[obj.pk]
+            resultados.append(Resultado(registro, obj, trecho, relevancia))
+    return _ordenar(resultados, limite)
+
+
+# --- Fallback: icontains ---
+
+def _trecho_simples(texto, palavras, largura=80):
+    texto = texto or ''
+    minusculo = texto.lower()
+    posicao = min((minusculo.find(p) for p in palavras if p in minusculo), default=0)
+    inicio = max(posicao - largura // 2, 0)
+    trecho = texto[inicio:inicio + largura]
+    for palavra in sorted(set(palavras), key=len, reverse=True):
+        trecho = re.sub(f'({re.escape(palavra)})', f'{INICIO_DESTAQUE}\\1{FIM_DESTAQUE}', trecho, flags=re.IGNORECASE)
+    return trecho
+
+
+def _buscar_simples(tutor, texto, limite):
+    palavras = termos(texto)
+    resultados = []
+    for registro, (_, _, campos, campo_trecho, _, _) in TABELAS.items():
+        filtro = Q()
+        for palavra in palavras:
+            filtro &= Q(*(Q(**{f'{campo}__icontains': palavra}) for campo in campos), _connector=Q.OR)
+        for obj in _base(registro, tutor).filter(filtro).order_by('-pk')[:limite]:
+            resultados.append(Resultado(registro, obj, _trecho_simples(getattr(obj, campo_trecho), palavras), 0))
+    return resultados[:limite]
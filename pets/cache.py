@@ -0,0 +1,98 @@
+# ==============================================================================
+# CACHE DAS PÁGINAS POR TUTOR / PET
+# ==============================================================================
+# Read-through: a view passa uma função que monta o contexto; se a chave já
+# estiver no cache, o banco nem é consultado.
+#
+# A invalidação é por "geração": cada tutor e cada pet têm um número de versão
+# que entra na chave dos dados. Uma escrita (signals em pets/signals.py) só
+# incrementa a geração; as entradas antigas deixam de ser encontradas e expiram
+# sozinhas pelo timeout. Funciona com qualquer backend de cache do Django; com
+# mais de um processo gravando, o backend precisa ser compartilhado (veja
+# CACHES em project/settings.py).
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+PREFIXO = 'vetlab'
+
+
+def _chave_geracao(tipo, pk):
+    return f'{PREFIXO}:ger:{tipo}:{pk}'
+
+
+def _nova_geracao():
+    # Baseada no relógio: se a chave de geração for removida do cache (LRU),
+    # o valor novo nunca coincide com uma geração antiga ainda armazenada.
+    return time.time_ns()
+
+
+def _geracoes(chaves):
+    valores = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in valores:
+            cache.add(chave, _nova_geracao(), timeout=None)
+            valores[chave] = cache.get(chave)
+    return [valores[chave] for chave in chaves]
+
+
+def _incrementar(chave):
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, _nova_geracao(), timeout=None)
+
+
+def _chave(nome, tutor_id, pet_id, geracao, partes):
+    chave = f'{PREFIXO}:{nome}:u{tutor_id}:p{pet_id}:g{geracao}'
+    if partes:
+        # Partes vindas da URL (ex.: cursor) passam por hash: chave curta e sem caracteres inválidos
+        chave += ':' + hashlib.sha1(repr(partes).encode()).hexdigest()
+    return chave
+
+
+def em_cache(nome, tutor_id, pet_id, calcular, *partes):
+    """
+    Devolve o valor de `calcular()` guardado para (nome, tutor, pet, *partes),
+    calculando e armazenando quando ainda não existe. Exceções de `calcular`
+    (ex.: Http404 da checagem de dono) não são cacheadas.
+    """
+    chaves_geracao = [_chave_geracao('tutor', tutor_id)]
+    if pet_id is not None:
+        chaves_geracao.append(_chave_geracao('pet', pet_id))
+    geracao = '.'.join(str(g) for g in _geracoes(chaves_geracao))
+
+    chave = _chave(nome, tutor_id, pet_id, geracao, partes)
+    valor = cache.get(chave)
+    if valor is None:
+        valor = calcular()
+        cache.set(chave, valor, getattr(settings, 'VETLAB_CACHE_TIMEOUT', 300))
+    return valor
+
+
+async def aem_cache(nome, tutor_id, pet_id, calcular, *partes):
+    """em_cache() para as views assíncronas: `calcular` é uma corrotina e o cache é lido pela API async."""
+    chaves_geracao = [_chave_geracao('tutor', tutor_id)]
+    if pet_id is not None:
+        chaves_geracao.append(_chave_geracao('pet', pet_id))
+    valores = await cache.aget_many(chaves_geracao)
+    for chave in chaves_geracao:
+        if chave not in valores:
+            await cache.aadd(chave, _nova_geracao(), timeout=None)
+            valores[chave] = await cache.aget(chave)
+    chave = _chave(nome, tutor_id, pet_id, '.'.join(str(valores[c]) for c in chaves_geracao), partes)
+    valor = await cache.aget(chave)
+    if valor is None:
+        valor = await calcular()
+        await cache.aset(chave, valor, getattr(settings, 'VETLAB_CACHE_TIMEOUT', 300))
+    return valor
+
+
+def invalidar(tutor_id=None, pet_id=None):
+    """Invalida tudo o que foi cacheado para o tutor e/ou para o pet."""
+    if tutor_id is not None:
+        _incrementar(_chave_geracao('tutor', tutor_id))
+    if pet_id is not None:
+        _incrementar(_chave_geracao('pet', pet_id))
@@ -0,0 +1,23 @@
+# ==============================================================================
+# CHECAGENS DE DEPLOY (`manage.py check --deploy`)
+# ==============================================================================
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+CACHES_POR_PROCESSO = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def cache_compartilhado(app_configs, **kwargs):
+    # O cache das páginas (pets/cache.py) é invalidado só no processo que grava
+    if getattr(settings, 'PRODUCAO', False) and settings.CACHES['default']['BACKEND'] in CACHES_POR_PROCESSO:
+        return [Warning(
+            "O perfil de produção está com um cache por processo: com mais de um worker, "
+            "páginas podem ficar velhas por até VETLAB_CACHE_TIMEOUT depois de uma escrita.",
+            hint="Configure CACHE_BACKEND/CACHE_LOCATION com um cache compartilhado (ex.: RedisCache).",
+            id='pets.W001',
+        )]
+    return []
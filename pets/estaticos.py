@@ -0,0 +1,34 @@
+# ==============================================================================
+# ARQUIVOS ESTÁTICOS (WHITENOISE) SOB WSGI E ASGI
+# ==============================================================================
+# O WhiteNoiseMiddleware é só síncrono: sob ASGI o Django teria de passar toda
+# requisição por sync_to_async/async_to_sync ao atravessá-lo, inclusive as das
+# views assíncronas. Esta subclasse também aceita a cadeia assíncrona e só vai
+# para uma thread quando de fato serve um arquivo.
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware as _WhiteNoiseMiddleware
+
+
+class WhiteNoiseMiddleware(_WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,103 @@
+# ==============================================================================
+# EXPORTAÇÃO DO HISTÓRICO (CSV / JSONL)
+# ==============================================================================
+# Gera as linhas de pets, eventos, metas e itens de compra de um ou mais
+# tutores sem carregar nada inteiro na memória: cada tabela é lida com
+# .values_list().iterator(chunk_size=...) (cursor no servidor no PostgreSQL) e
+# cada linha já sai formatada. Usado pela view exportar_view (StreamingHttpResponse)
+# e pelo comando `manage.py export_vetlab`.
+import csv
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Evento, ItemCompra, Meta, Pet
+
+TAMANHO_CHUNK = 2000
+FORMATOS = ('csv', 'jsonl')
+
+# (registro, model, campos, caminho até o tutor)
+TABELAS = (
+    ('pet', Pet, ('id', 'nome', 'especie', 'raca', 'data_nascimento', 'peso', 'atualizado_em'), 'tutor'),
+    ('evento', Evento, (
+        'id', 'pet_id', 'tipo', 'data', 'observacoes', 'concluido', 'atualizado_em',
+        'recorrencia', 'intervalo', 'dias_semana', 'repetir_ate',
+    ), 'pet__tutor'),
+    ('meta', Meta, ('id', 'pet_id', 'descricao', 'data_prazo', 'progresso', 'atualizado_em'), 'pet__tutor'),
+    ('item_compra', ItemCompra, ('id', 'pet_id', 'descricao', 'criado_em', 'comprado', 'atualizado_em'), 'pet__tutor'),
+)
+
+# Cabeçalho do CSV: união das colunas de todas as tabelas, precedida do tipo de registro
+COLUNAS_CSV = ('registro', 'tutor_id') + tuple(dict.fromkeys(campo for _, _, campos, _ in TABELAS for campo in campos))
+
+
+def registros(tutores=None, desde=None, chunk_size=TAMANHO_CHUNK):
+    """
+    Gera (registro, dict) de todas as tabelas. `tutores`: ids (None = todos, para
+    a conta da clínica). `desde`: só o que foi criado/alterado a partir desse
+    datetime (exportação incremental; exclusões não aparecem).
+    """
+    for registro, model, campos, caminho_tutor in TABELAS:
+        queryset = model.objects.all()
+        if tutores is not None:
+            queryset = queryset.filter(**{f'{caminho_tutor}__in': tutores})
+        if desde is not None:
+            queryset = queryset.filter(atualizado_em__gte=desde)
+        linhas = queryset.order_by('pk').values_list(f'{caminho_tutor}_id', *campos).iterator(chunk_size=chunk_size)
+        for tutor_id, *valores in linhas:
+            yield registro, {'tutor_id': tutor_id, **dict(zip(campos, valores))}
+
+
+def interpretar_desde(texto):
+    """'AAAA-MM-DD' ou datetime ISO 8601 -> datetime com fuso. ValueError se inválido."""
+    valor = parse_datetime(texto)
+    if valor is None:
+        dia = parse_date(texto)
+        if dia is None:
+            raise ValueError(f"Data inválida: {texto!r}")
+        valor = datetime.combine(dia, time.min)
+    if timezone.is_naive(valor):
+        valor = timezone.make_aware(valor)
+    return valor
+
+
+class _Eco:
+    """Pseudo-arquivo cujo write() só devolve o texto, para o csv.writer gerar strings."""
+    def write(self, valor):
+        return valor
+
+
+def linhas_csv(tutores=None, desde=None, chunk_size=TAMANHO_CHUNK):
+    escritor = csv.DictWriter(_Eco(), fieldnames=COLUNAS_CSV)
+    yield escritor.writeheader()
+    for registro, dados in registros(tutores, desde, chunk_size):
+        yield escritor.writerow({'registro': registro, **dados})
+
+
+def linhas_jsonl(tutores=None, desde=None, chunk_size=TAMANHO_CHUNK):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for registro, dados in registros(tutores, desde, chunk_size):
+        yield encoder.encode({'registro': registro, **dados}) + '\n'
+
+
+def linhas(formato, tutores=None, desde=None, chunk_size=TAMANHO_CHUNK):
+    if formato == 'csv':
+        return linhas_csv(tutores, desde, chunk_size)
+    if formato == 'jsonl':
+        return linhas_jsonl(tutores, desde, chunk_size)
+    raise ValueError(f"Formato desconhecido: {formato}")
+
+
+def em_blocos(linhas, tamanho=64 * 1024):
+    """Junta as linhas em blocos de ~`tamanho` caracteres: menos chamadas de escrita no socket."""
+    bloco, total = [], 0
+    for linha in linhas:
+        bloco.append(linha)
+        total += len(linha)
+        if total >= tamanho:
+            yield ''.join(bloco)
+            bloco, total = [], 0
+    if bloco:
+        yield ''.join(bloco)
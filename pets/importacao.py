@@ -0,0 +1,227 @@
+# ==============================================================================
+# IMPORTAÇÃO EM LOTE (CSV / JSONL)
+# ==============================================================================
+# Carga de históricos de clínicas com `manage.py import_vetlab`. O arquivo é
+# lido em streaming e processado em lotes: cada lote é validado por inteiro,
+# os tutores são buscados por username em UMA consulta e as linhas são
+# gravadas com bulk_create em UMA transação. O progresso (ProgressoImportacao)
+# é gravado nessa mesma transação, então uma importação interrompida é
+# retomada de onde parou sem gravar nenhum lote duas vezes.
+#
+# Formato: o mesmo da exportação (pets/exportacao.py) — uma coluna `registro`
+# (pet, evento, meta ou item_compra) e as colunas do model. Pets trazem o `id`
+# do sistema de origem e o tutor: `tutor` (username, para cargas de outros
+# sistemas) ou `tutor_id` (pk no VETLAB, como sai da exportação); eventos,
+# metas e itens apontam para o id de origem do pet em `pet_id`. Colunas
+# desconhecidas são ignoradas.
+import csv
+import json
+import time
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from .cache import invalidar
+from .models import Evento, ItemCompra, Meta, PesoRegistro, Pet, PetStats, ProgressoImportacao
+
+TAMANHO_LOTE = 1000
+FORMATOS = ('csv', 'jsonl')
+
+# registro -> (model, campos importados). criado_em/atualizado_em são preenchidos pelo banco.
+TABELAS = {
+    'pet': (Pet, ('nome', 'especie', 'raca', 'data_nascimento', 'peso')),
+    'evento': (Evento, ('tipo', 'data', 'observacoes', 'concluido', 'recorrencia', 'intervalo', 'dias_semana', 'repetir_ate')),
+    'meta': (Meta, ('descricao', 'data_prazo', 'progresso')),
+    'item_compra': (ItemCompra, ('descricao', 'comprado')),
+}
+
+
+class ErroImportacao(Exception):
+    def __init__(self, mensagens):
+        self.mensagens = mensagens if isinstance(mensagens, list) else [mensagens]
+        super().__init__('\n'.join(self.mensagens))
+
+
+# --- Leitura ---
+
+def ler_registros(arquivo, formato):
+    """Gera um dict por registro do arquivo, sem carregá-lo inteiro."""
+    if formato == 'csv':
+        for linha in csv.DictReader(arquivo):
+            # Célula vazia = campo ausente (vale o default/null do model)
+            yield {chave: valor for chave, valor in linha.items() if valor != ''}
+    elif formato == 'jsonl':
+        for numero, linha in enumerate(arquivo, start=1):
+            if not linha.strip():
+                continue
+            try:
+                dados = json.loads(linha)
+            except ValueError:
+                raise ErroImportacao(f"Linha {numero} do arquivo não é um JSON válido.")
+            if not isinstance(dados, dict):
+                raise ErroImportacao(f"Linha {numero} do arquivo não é um objeto JSON.")
+            yield dados
+    else:
+        raise ValueError(f"Formato desconhecido: {formato}")
+
+
+# --- Estado (retomada) ---
+
+def carregar_estado(chave):
+    """Progresso salvo da importação `chave` ({'processados': n, 'pets': {...}}) ou None."""
+    progresso = ProgressoImportacao.objects.filter(chave=chave).first()
+    return {'processados': progresso.processados, 'pets': progresso.pets} if progresso else None
+
+
+def descartar_estado(chave):
+    ProgressoImportacao.objects.filter(chave=chave).delete()
+
+
+# --- Importação ---
+
+class Importador:
+    """
+    Importa registros em lotes de `tamanho_lote`. `estado` é o dict salvo de
+    uma execução anterior ({'processados': n, 'pets': {id de origem: pk}});
+    os `processados` primeiros registros são pulados. Com `chave`, o estado é
+    gravado em ProgressoImportacao junto com cada lote. Com `simular=True` tudo
+    é validado e nada é gravado. `ao_confirmar(estado)` é chamado após cada
+    lote gravado.
+    """
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE, simular=False, estado=None, ao_confirmar=None, chave=None):
+        estado = estado or {}
+        self.tamanho_lote = tamanho_lote
+        self.simular = simular
+        self.ao_confirmar = ao_confirmar
+        self.chave = chave
+        self.processados = estado.get('processados', 0)
+        self.pets = dict(estado.get('pets', {}))
+        self.gravados = {registro: 0 for registro in TABELAS}
+
+    @property
+    def estado(self):
+        return {'processados': self.processados, 'pets': self.pets}
+
+    def importar(self, registros):
+        registros = iter(registros)
+        # Registros já confirmados numa execução anterior
+        for _ in islice(registros, self.processados):
+            pass
+        while True:
+            linhas = list(islice(registros, self.tamanho_lote))
+            if not linhas:
+                break
+            self._lote(linhas, inicio=self.processados + 1)
+            if not self.simular and self.ao_confirmar:
+                self.ao_confirmar(self.estado)
+        return self.gravados
+
+    def _lote(self, linhas, inicio):
+        erros = []
+        pets = [linha for linha in linhas if linha.get('registro') == 'pet']
+        usernames = {str(linha['tutor']) for linha in pets if linha.get('tutor')}
+        ids = {int(linha['tutor_id']) for linha in pets if not linha.get('tutor') and str(linha.get('tutor_id', '')).isdigit()}
+        # Uma consulta para os dois jeitos de indicar o tutor
+        encontrados = User.objects.filter(Q(username__in=usernames) | Q(pk__in=ids)).values_list('username', 'pk')
+        tutores = dict(encontrados)
+        tutores_por_id = set(tutores.values())
+
+        novos_pets = {}    # id de origem -> Pet (ainda sem pk)
+        dependentes = []   # (registro, objeto, id de origem do pet)
+        for numero, linha in enumerate(linhas, start=inicio):
+            registro = linha.get('registro')
+            if registro not in TABELAS:
+                erros.append(f"Registro {numero}: tipo '{registro}' desconhecido.")
+                continue
+            model, campos = TABELAS[registro]
+            obj = model(**{campo: linha[campo] for campo in campos if campo in linha})
+
+            if registro == 'pet':
+                origem = str(linha.get('id', '')).strip()
+                if not origem:
+                    erros.append(f"Registro {numero}: pet sem 'id'.")
+                elif origem in self.pets or origem in novos_pets:
+                    erros.append(f"Registro {numero}: pet '{origem}' duplicado.")
+                if linha.get('tutor'):
+                    tutor_id = tutores.get(str(linha['tutor']))
+                    if tutor_id is None:
+                        erros.append(f"Registro {numero}: tutor '{linha['tutor']}' não encontrado.")
+                elif linha.get('tutor_id') not in (None, ''):
+                    tutor_id = int(linha['tutor_id']) if str(linha['tutor_id']).isdigit() else None
+                    if tutor_id not in tutores_por_id:
+                        tutor_id = None
+                        erros.append(f"Registro {numero}: tutor_id '{linha['tutor_id']}' não encontrado.")
+                else:
+                    tutor_id = None
+                    erros.append(f"Registro {numero}: pet sem 'tutor' nem 'tutor_id'.")
+                obj.tutor_id = tutor_id
+                novos_pets[origem] = obj
+            else:
+                origem = str(linha.get('pet_id', '')).strip()
+                if origem not in self.pets and origem not in novos_pets:
+                    erros.append(f"Registro {numero}: pet '{origem}' não importado antes deste registro.")
+                dependentes.append((registro, obj, origem))
+
+            try:
+                # exclude: as chaves estrangeiras já foram conferidas acima (validar consultaria o banco)
+                obj.full_clean(exclude=['tutor', 'pet'])
+            except ValidationError as erro:
+                for campo, mensagens in erro.message_dict.items():
+                    erros.extend(f"Registro {numero}: {campo}: {mensagem}" for mensagem in mensagens)
+        if erros:
+            raise ErroImportacao(erros)
+
+        if self.simular:
+            self.pets.update((origem, None) for origem in novos_pets)
+            self.processados += len(linhas)
+        else:
+            self._gravar(novos_pets, dependentes, self.processados + len(linhas))
+        self.gravados['pet'] += len(novos_pets)
+        for registro, _, _ in dependentes:
+            self.gravados[registro] += 1
+
+    def _gravar(self, novos_pets, dependentes, processados):
+        with transaction.atomic():
+            Pet.objects.bulk_create(novos_pets.values(), batch_size=self.tamanho_lote)
+            PesoRegistro.objects.bulk_create(
+                (PesoRegistro(pet=pet, peso=pet.peso) for pet in novos_pets.values()), batch_size=self.tamanho_lote,
+            )
+            pets = {**self.pets, **{origem: pet.pk for origem, pet in novos_pets.items()}}
+
+            por_model = {}
+            for registro, obj, origem in dependentes:
+                obj.pet_id = pets[origem]
+                por_model.setdefault(type(obj), []).append(obj)
+            for model, objetos in por_model.items():
+                model.objects.bulk_create(objetos, batch_size=self.tamanho_lote)
+
+            # bulk_create não dispara os signals: histórico de peso (acima), contadores e cache à mão
+            pet_ids = sorted({pet.pk for pet in novos_pets.values()} | {obj.pet_id for _, obj, _ in dependentes})
+            PetStats.recalcular(pet_ids)
+            tutor_ids = set(Pet.objects.filter(pk__in=pet_ids).values_list('tutor_id', flat=True).distinct())
+
+            def executar():
+                for tutor_id in tutor_ids:
+                    invalidar(tutor_id=tutor_id)
+
+            executar()
+            transaction.on_commit(executar)
+
+            # Na mesma transação do lote: não há como um ficar gravado sem o outro
+            if self.chave:
+                ProgressoImportacao.objects.update_or_create(chave=self.chave, defaults={'processados': processados, 'pets': pets})
+        # Só depois do commit: se o lote falhar, o estado continua como estava
+        self.pets, self.processados = pets, processados
+
+
+def importar_arquivo(caminho, formato, tamanho_lote=TAMANHO_LOTE, simular=False, estado=None, ao_confirmar=None, chave=None):
+    """Importa `caminho`; devolve (importador, segundos) para o relatório de throughput."""
+    importador = Importador(tamanho_lote, simular, estado, ao_confirmar, chave)
+    inicio = time.perf_counter()
+    with open(caminho, encoding='utf-8', newline='') as arquivo:
+        importador.importar(ler_registros(arquivo, formato))
+    return importador, time.perf_counter() - inicio
@@ -0,0 +1,249 @@
+# ==============================================================================
+# INSTRUMENTAÇÃO: CONSULTAS, TEMPO DE BANCO/TEMPLATE E MÉTRICAS POR VIEW
+# ==============================================================================
+# InstrumentacaoMiddleware mede cada requisição:
+#   - consultas e tempo de banco: connection.execute_wrapper em volta da view;
+#   - tempo de template: o backend TemplatesInstrumentados (settings.TEMPLATES)
+#     soma o render dos templates de página na medição da requisição atual;
+#   - tempo total.
+# O resultado vai no cabeçalho Server-Timing (visível no DevTools do navegador)
+# e é acumulado por nome de rota (pet_visao_geral, evento_list, ...) para o
+# endpoint /metrics, no formato texto do Prometheus. Consultas com o mesmo SQL
+# repetidas muitas vezes na mesma requisição (padrão N+1) geram um aviso no log.
+#
+# Os acumulados ficam na memória de cada processo: com vários workers, o
+# Prometheus deve coletar de cada um (ou somar pelo label de instância).
+# Respostas em streaming (exportação, .ics) só têm medido o que acontece antes
+# do primeiro byte. Funciona sob WSGI e ASGI (views síncronas e assíncronas).
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger('pets.instrumentacao')
+
+# Limites do histograma de duração (segundos)
+BALDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Mesmo SQL repetido a partir de quantas vezes na requisição conta como N+1
+LIMITE_REPETICOES = 5
+
+_medicao_atual = ContextVar('vetlab_medicao', default=None)
+
+
+class Medicao:
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_banco = 0.0
+        self.tempo_template = 0.0
+        self.sqls = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: chamado em toda consulta da conexão
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_banco += time.perf_counter() - inicio
+            self.consultas += 1
+            self.sqls[sql] += 1
+
+    def repetidas(self):
+        limite = getattr(settings, 'VETLAB_N_MAIS_1_LIMITE', LIMITE_REPETICOES)
+        return [(sql, vezes) for sql, vezes in self.sqls.most_common() if vezes >= limite]
+
+
+# --- Tempo de template ---
+
+class TemplateInstrumentado(Template):
+    def render(self, context=None, request=None):
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicao.tempo_template += time.perf_counter() - inicio
+
+
+class TemplatesInstrumentados(DjangoTemplates):
+    """DjangoTemplates que mede o render dos templates de página ({% include %} entra no do pai)."""
+
+    def from_string(self, template_code):
+        return TemplateInstrumentado(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TemplateInstrumentado(super().get_template(template_name).template, self)
+
+
+# --- Acumulados por view ---
+
+class Registro:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.requisicoes = Counter()   # (view, método, status) -> n
+        self.duracao = {}              # view -> [contagem por balde..., +Inf]
+        self.somas = {}                # view -> {'total', 'banco', 'template', 'consultas', 'n_mais_1'}
+
+    def registrar(self, view, metodo, status, total, medicao, repetidas):
+        with self._trava:
+            self.requisicoes[(view, metodo, status)] += 1
+            baldes = self.duracao.setdefault(view, [0] * (len(BALDES) + 1))
+            for indice, limite in enumerate(BALDES):
+                if total <= limite:
+                    baldes[indice] += 1
+            baldes[-1] += 1
+            somas = self.somas.setdefault(view, Counter())
+            somas['total'] += total
+            somas['banco'] += medicao.tempo_banco
+            somas['template'] += medicao.tempo_template
+            somas['consultas'] += medicao.consultas
+            somas['n_mais_1'] += int(bool(repetidas))
+
+    def limpar(self):
+        with self._trava:
+            self.requisicoes.clear()
+            self.duracao.clear()
+            self.somas.clear()
+
+    def texto_prometheus(self):
+        linhas = []
+
+        def cabecalho(nome, tipo, ajuda):
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} {tipo}')
+
+        with self._trava:
+            cabecalho('vetlab_requisicoes_total', 'counter', 'Requisições por view, método e status.')
+            for (view, metodo, status), n in sorted(self.requisicoes.items()):
+                linhas.append(f'vetlab_requisicoes_total{_labels(view=view, metodo=metodo, status=status)} {n}')
+
+            cabecalho('vetlab_requisicao_segundos', 'histogram', 'Duração total da requisição.')
+            for view, baldes in sorted(self.duracao.items()):
+                for limite, n in zip(BALDES + ('+Inf',), baldes):
+                    linhas.append(f'vetlab_requisicao_segundos_bucket{_labels(view=view, le=limite)} {n}')
+                linhas.append(f'vetlab_requisicao_segundos_sum{_labels(view=view)} {_numero(self.somas[view]["total"])}')
+                linhas.append(f'vetlab_requisicao_segundos_count{_labels(view=view)} {baldes[-1]}')
+
+            for nome, chave, ajuda in (
+                ('vetlab_db_consultas_total', 'consultas', 'Consultas SQL executadas.'),
+                ('vetlab_db_segundos_total', 'banco', 'Tempo gasto no banco.'),
+                ('vetlab_template_segundos_total', 'template', 'Tempo gasto renderizando templates.'),
+                ('vetlab_n_mais_1_total', 'n_mais_1', 'Requisições com consultas repetidas (N+1).'),
+            ):
+                cabecalho(nome, 'counter', ajuda)
+                for view, somas in sorted(self.somas.items()):
+                    linhas.append(f'{nome}{_labels(view=view)} {_numero(somas[chave])}')
+        return '\n'.join(linhas) + '\n'
+
+
+def _numero(valor):
+    # Sem arredondar: com :g um contador de 1234567 sairia 1.23457e+06 e pararia de crescer
+    return repr(valor) if isinstance(valor, float) else str(int(valor))
+
+
+def _labels(**labels):
+    def escapar(texto):
+        texto = _numero(texto) if isinstance(texto, float) else str(texto)
+        return texto.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{chave}="{escapar(valor)}"' for chave, valor in labels.items()) + '}'
+
+
+registro = Registro()
+
+
+# --- Middleware ---
+
+class InstrumentacaoMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pilha:
+                _medir_conexoes(pilha, medicao)
+                response = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        return self._registrar(request, response, medicao, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        # Sob ASGI o ORM (async ou via sync_to_async) executa as consultas na
+        # thread do banco desta requisição (ThreadSensitiveContext), não na do
+        # event loop: o execute_wrapper é instalado e removido lá.
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        pilha = ExitStack()
+        try:
+            await sync_to_async(_medir_conexoes)(pilha, medicao)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(pilha.close)()
+        finally:
+            _medicao_atual.reset(token)
+        return self._registrar(request, response, medicao, time.perf_counter() - inicio)
+
+    def _registrar(self, request, response, medicao, total):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'sem_rota'
+        repetidas = medicao.repetidas()
+        if repetidas:
+            sql, vezes = repetidas[0]
+            logger.warning(
+                "Possível N+1 em %s (%s %s): mesma consulta executada %d vezes: %s",
+                view, request.method, request.path, vezes, sql[:300],
+            )
+        registro.registrar(view, request.method, f'{response.status_code // 100}xx', total, medicao, repetidas)
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={medicao.tempo_banco * 1000:.1f};desc="{medicao.consultas} consultas"',
+            f'tpl;dur={medicao.tempo_template * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        return response
+
+
+def _medir_conexoes(pilha, medicao):
+    # Normalmente só a conexão default; com réplicas, todas entram na conta
+    for alias in connections:
+        pilha.enter_context(connections[alias].execute_wrapper(medicao))
+
+
+# --- Endpoint /metrics ---
+
+def metricas(request):
+    """
+    Métricas no formato do Prometheus. Com VETLAB_METRICAS_TOKEN definido, exige
+    'Authorization: Bearer <token>' (o coletor não tem sessão); sem ele, só a equipe.
+    """
+    esperado = getattr(settings, 'VETLAB_METRICAS_TOKEN', '')
+    if esperado:
+        enviado = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        autorizado = constant_time_compare(enviado, esperado)
+    else:
+        autorizado = request.user.is_authenticated and request.user.is_staff
+    if not autorizado:
+        return HttpResponseForbidden("Acesso às métricas negado.")
+    return HttpResponse(registro.texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,215 @@
+# ==============================================================================
+# LEMBRETES DE EVENTOS (VARREDURA + ENVIO)
+# ==============================================================================
+# Executado por `manage.py lembretes` (uma vez, pelo cron, ou em loop com --loop).
+#
+# 1. varrer(): encontra, com consultas por faixa de data sobre o índice
+#    (concluido, data), os eventos não concluídos que estão próximos ou
+#    atrasados e enfileira um Lembrete para cada um. A varredura é incremental:
+#    VarreduraLembretes guarda até que data cada faixa já foi coberta, e a
+#    próxima execução só olha os dias novos + os eventos alterados desde então
+#    (índice em atualizado_em). Eventos recorrentes (pets/recorrencia.py) têm as
+#    ocorrências de cada faixa calculadas na hora; as já concluídas são puladas.
+#    Marca d'água e lembretes são gravados na mesma
+#    transação e a restrição única do Lembrete descarta repetidos, então parar
+#    e reiniciar a qualquer momento não duplica nada.
+# 2. enviar_pendentes(): consome a fila pelo backend de e-mail do Django
+#    (settings.EMAIL_BACKEND). Reserva o lote ("enviando") numa transação curta,
+#    envia fora de qualquer transação e grava os desfechos num bulk_update no
+#    fim. Entrega "pelo menos uma vez": se o processo cair no meio de um lote, a
+#    reserva vence depois de PRAZO_RESERVA e o lote volta a ser enviado.
+from datetime import timedelta
+from itertools import islice
+from types import SimpleNamespace
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Q, Value
+from django.utils import timezone
+
+from . import recorrencia
+from .models import Evento, ExcecaoRecorrencia, Lembrete, VarreduraLembretes
+
+ANTECEDENCIA_DIAS = 3
+# Eventos atrasados há mais tempo que isso não geram lembrete (primeira execução, pausas longas)
+ATRASO_MAXIMO_DIAS = 30
+# Reprocessa um pouco antes da última execução: cobre transações que confirmaram
+# depois da leitura com atualizado_em anterior a ela (os repetidos são descartados)
+MARGEM_ALTERADOS = timedelta(minutes=5)
+TAMANHO_LOTE = 500
+MAXIMO_TENTATIVAS = 5
+# Reserva "enviando" mais antiga que isso é de um envio que morreu: volta para a fila
+PRAZO_RESERVA = timedelta(minutes=30)
+
+CAMPOS_EVENTO = (
+    'id', 'tipo', 'data', 'recorrencia', 'intervalo', 'dias_semana', 'repetir_ate',
+    'pet__nome', 'pet__tutor__username', 'pet__tutor__email',
+)
+UM_DIA = timedelta(days=1)
+
+
+def _em_lotes(iteravel, tamanho):
+    iteravel = iter(iteravel)
+    while lote := list(islice(iteravel, tamanho)):
+        yield lote
+
+
+def _eventos_pendentes():
+    # Value() mantém a comparação usável pelo índice (concluido, data)
+    return Evento.objects.filter(concluido=Value(False)).exclude(pet__tutor__email='')
+
+
+def _mensagem(tipo, nome_tipo, data, pet, tutor):
+    data_br = data.strftime('%d/%m/%Y')
+    if tipo == 'atrasado':
+        assunto = f"{nome_tipo} de {pet} está atrasado(a) ({data_br})"
+        corpo = f"Olá, {tutor}!\n\n{nome_tipo} de {pet} estava marcado(a) para {data_br} e ainda não foi concluído(a)."
+    else:
+        assunto = f"Lembrete: {nome_tipo} de {pet} em {data_br}"
+        corpo = f"Olá, {tutor}!\n\n{nome_tipo} de {pet} está marcado(a) para {data_br}."
+    return assunto, corpo + "\n\nMarque como concluído no VETLAB para não receber mais avisos.\n"
+
+
+def _concluidas(evento_ids, de, ate):
+    """(evento, data) das ocorrências já concluídas das séries, em uma consulta."""
+    if not evento_ids:
+        return set()
+    return set(ExcecaoRecorrencia.objects.filter(evento_id__in=evento_ids, data__range=(de, ate)).values_list('evento_id', 'data'))
+
+
+def _enfileirar(linhas, hoje, de, ate):
+    nomes_tipo = dict(Evento.TIPOS_EVENTO)
+    eventos = [SimpleNamespace(**linha) for linha in linhas]
+    concluidas = _concluidas([evento.id for evento in eventos if evento.recorrencia], de, ate)
+    lembretes = []
+    for evento in eventos:
+        for data in recorrencia.datas(evento, de, ate):
+            if (evento.id, data) in concluidas:
+                continue
+            tipo = 'atrasado' if data < hoje else 'proximo'
+            assunto, corpo = _mensagem(tipo, nomes_tipo.get(evento.tipo, evento.tipo), data, evento.pet__nome, evento.pet__tutor__username)
+            lembretes.append(Lembrete(
+                evento_id=evento.id, tipo=tipo, data_evento=data,
+                destinatario=evento.pet__tutor__email, assunto=assunto, corpo=corpo,
+            ))
+    # ignore_conflicts + restrição única: o que já estava na fila é ignorado pelo banco
+    Lembrete.objects.bulk_create(lembretes, batch_size=TAMANHO_LOTE, ignore_conflicts=True)
+    return len(eventos)
+
+
+def _na_faixa(de, ate):
+    """Eventos únicos com data na faixa + séries com alguma ocorrência possível nela."""
+    unicos = Q(recorrencia='', data__range=(de, ate))
+    series = ~Q(recorrencia='') & Q(data__lte=ate) & (Q(repetir_ate__isnull=True) | Q(repetir_ate__gte=de))
+    return [_eventos_pendentes().filter(unicos), _eventos_pendentes().filter(series)]
+
+
+def varrer(hoje=None, antecedencia=ANTECEDENCIA_DIAS):
+    """Enfileira os lembretes devidos; devolve quantos eventos foram examinados."""
+    hoje = hoje or timezone.localdate()
+    inicio = timezone.now()
+    proximos_ate = hoje + timedelta(days=antecedencia)
+    atrasados_ate = hoje - UM_DIA
+    piso = hoje - timedelta(days=ATRASO_MAXIMO_DIAS)
+
+    with transaction.atomic():
+        # Lock da linha de marca d'água: duas varreduras simultâneas ficam em série
+        marca, _ = VarreduraLembretes.objects.select_for_update().get_or_create(pk=1)
+
+        consultas = []  # (queryset, de, até): as ocorrências são geradas só dentro da faixa
+        # Dias ainda não cobertos de cada faixa
+        de = hoje if marca.proximos_ate is None else max(marca.proximos_ate + UM_DIA, hoje)
+        if de <= proximos_ate:
+            consultas.extend((consulta, de, proximos_ate) for consulta in _na_faixa(de, proximos_ate))
+        de = piso if marca.atrasados_ate is None else max(marca.atrasados_ate + UM_DIA, piso)
+        if de <= atrasados_ate:
+            consultas.extend((consulta, de, atrasados_ate) for consulta in _na_faixa(de, atrasados_ate))
+        if marca.alterados_desde is not None:
+            # Criados/remarcados/reabertos depois da última varredura, em dias já cobertos
+            consultas.append((
+                _eventos_pendentes().filter(atualizado_em__gte=marca.alterados_desde, data__lte=proximos_ate),
+                piso, proximos_ate,
+            ))
+
+        examinados = 0
+        for consulta, de, ate in consultas:
+            linhas = consulta.order_by().values(*CAMPOS_EVENTO).iterator(chunk_size=TAMANHO_LOTE)
+            for lote in _em_lotes(linhas, TAMANHO_LOTE):
+                examinados += _enfileirar(lote, hoje, de, ate)
+
+        marca.proximos_ate = max(proximos_ate, marca.proximos_ate or proximos_ate)
+        marca.atrasados_ate = max(atrasados_ate, marca.atrasados_ate or atrasados_ate)
+        marca.alterados_desde = inicio - MARGEM_ALTERADOS
+        marca.save()
+    return examinados
+
+
+def _reservar(limite, agora):
+    """Marca até `limite` lembretes pendentes como "enviando" numa transação curta e devolve-os."""
+    with transaction.atomic():
+        # Envio interrompido (processo morto no meio do lote): a reserva antiga volta para a fila
+        Lembrete.objects.filter(situacao='enviando', reservado_em__lt=agora - PRAZO_RESERVA).update(situacao='pendente')
+        pendentes = Lembrete.objects.filter(situacao='pendente').order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            # Vários processos de envio dividem a fila sem esperar um pelo outro
+            pendentes = pendentes.select_for_update(skip_locked=True)
+        ids = list(pendentes.values_list('pk', flat=True)[:limite])
+        # situacao='pendente' de novo: sem skip_locked, o que outro processo reservou antes fica de fora
+        Lembrete.objects.filter(pk__in=ids, situacao='pendente').update(situacao='enviando', reservado_em=agora)
+    return list(
+        Lembrete.objects.filter(pk__in=ids, situacao='enviando', reservado_em=agora)
+        .select_related('evento').only(
+            'id', 'assunto', 'corpo', 'destinatario', 'data_evento', 'tentativas', 'situacao',
+            'evento__concluido', 'evento__data', 'evento__recorrencia', 'evento__intervalo',
+            'evento__dias_semana', 'evento__repetir_ate',
+        )
+        .order_by('id')
+    )
+
+
+def enviar_pendentes(limite=TAMANHO_LOTE):
+    """Envia até `limite` lembretes pendentes; devolve {situação: quantidade}."""
+    resultado = {'enviado': 0, 'cancelado': 0, 'falhou': 0, 'adiado': 0}
+    agora = timezone.now()
+    lembretes = _reservar(limite, agora)
+    if not lembretes:
+        return resultado
+
+    # Daqui em diante, fora de transação: nenhuma linha fica travada enquanto o SMTP responde
+    series = [lembrete for lembrete in lembretes if lembrete.evento.recorrencia]
+    concluidas = set()
+    if series:
+        concluidas = set(ExcecaoRecorrencia.objects.filter(
+            evento_id__in={lembrete.evento_id for lembrete in series},
+            data__in={lembrete.data_evento for lembrete in series},
+        ).values_list('evento_id', 'data'))
+    with get_connection() as conexao:
+        for lembrete in lembretes:
+            evento = lembrete.evento
+            if (
+                evento.concluido
+                or not recorrencia.e_ocorrencia(evento, lembrete.data_evento)
+                or (evento.pk, lembrete.data_evento) in concluidas
+            ):
+                # Concluído ou remarcado depois de enfileirado (a nova data gera outro lembrete)
+                lembrete.situacao = 'cancelado'
+                resultado['cancelado'] += 1
+                continue
+            try:
+                EmailMessage(lembrete.assunto, lembrete.corpo, to=[lembrete.destinatario], connection=conexao).send()
+            except Exception as erro:
+                lembrete.tentativas += 1
+                lembrete.erro = str(erro)[:1000]
+                if lembrete.tentativas >= MAXIMO_TENTATIVAS:
+                    lembrete.situacao = 'falhou'
+                    resultado['falhou'] += 1
+                else:
+                    lembrete.situacao = 'pendente'
+                    resultado['adiado'] += 1
+                continue
+            lembrete.situacao = 'enviado'
+            lembrete.enviado_em = timezone.now()
+            resultado['enviado'] += 1
+
+    Lembrete.objects.bulk_update(lembretes, ['situacao', 'enviado_em', 'tentativas', 'erro'], batch_size=TAMANHO_LOTE)
+    return resultado
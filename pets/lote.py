@@ -0,0 +1,166 @@
+# ==============================================================================
+# ESCRITAS EM LOTE (EVENTOS E ITENS DE COMPRA)
+# ==============================================================================
+# Usadas pelo formulário "evento para vários pets", pela lista de compras
+# (vários itens de uma vez) e pelos endpoints /api/v1/.../lote/.
+#
+# Cada lote: valida todas as linhas, confere o dono de todos os pets/registros
+# em UMA consulta, grava com bulk_create/bulk_update em UMA transação e então
+# recalcula o PetStats e invalida o cache dos pets afetados (bulk_* não dispara
+# os signals de pets/signals.py).
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidar
+from .models import Evento, ItemCompra, Pet, PetStats
+
+TAMANHO_MAXIMO_LOTE = 1000
+TAMANHO_BATCH = 500
+
+TIPOS_EVENTO = {valor for valor, _ in Evento.TIPOS_EVENTO}
+
+
+def _pk(valor):
+    if isinstance(valor, bool):
+        raise ValueError
+    return int(valor)
+
+
+def _conferir_tamanho(linhas):
+    if not linhas:
+        raise ValidationError("Nenhum registro enviado.")
+    if len(linhas) > TAMANHO_MAXIMO_LOTE:
+        raise ValidationError(f"No máximo {TAMANHO_MAXIMO_LOTE} registros por lote.")
+
+
+def _validar_evento(linha, erros, numero, parcial=False):
+    dados = {}
+    if 'tipo' in linha or not parcial:
+        if linha.get('tipo') not in TIPOS_EVENTO:
+            erros.append(f"Linha {numero}: tipo de evento inválido.")
+        dados['tipo'] = linha.get('tipo')
+    if 'data' in linha or not parcial:
+        try:
+            dados['data'] = date.fromisoformat(str(linha.get('data')))
+        except ValueError:
+            erros.append(f"Linha {numero}: data inválida (use AAAA-MM-DD).")
+    if 'observacoes' in linha:
+        dados['observacoes'] = linha['observacoes'] or None
+    if 'concluido' in linha:
+        if not isinstance(linha['concluido'], bool):
+            erros.append(f"Linha {numero}: 'concluido' deve ser true ou false.")
+        dados['concluido'] = linha['concluido']
+    return dados
+
+
+def _validar_item(linha, erros, numero, parcial=False):
+    dados = {}
+    if 'descricao' in linha or not parcial:
+        descricao = (linha.get('descricao') or '').strip()
+        if not descricao:
+            erros.append(f"Linha {numero}: descrição obrigatória.")
+        elif len(descricao) > ItemCompra._meta.get_field('descricao').max_length:
+            erros.append(f"Linha {numero}: descrição muito longa.")
+        dados['descricao'] = descricao
+    if 'comprado' in linha:
+        if not isinstance(linha['comprado'], bool):
+            erros.append(f"Linha {numero}: 'comprado' deve ser true ou false.")
+        dados['comprado'] = linha['comprado']
+    return dados
+
+
+def _pets_do_tutor(tutor, pet_ids):
+    """Confere, em uma consulta, que todos os pets existem e são do tutor."""
+    encontrados = set(Pet.objects.filter(tutor=tutor, pk__in=set(pet_ids)).values_list('pk', flat=True))
+    faltando = set(pet_ids) - encontrados
+    if faltando:
+        raise ValidationError(f"Pets inválidos: {', '.join(str(pk) for pk in sorted(faltando))}.")
+
+
+def _depois_do_lote(tutor, pet_ids):
+    pet_ids = sorted(set(pet_ids))
+    PetStats.recalcular(pet_ids)
+
+    def executar():
+        for pet_id in pet_ids:
+            invalidar(pet_id=pet_id)
+        invalidar(tutor_id=tutor.pk)
+
+    executar()
+    transaction.on_commit(executar)
+
+
+def _criar(model, validar, tutor, linhas):
+    _conferir_tamanho(linhas)
+    erros, objetos = [], []
+    for numero, linha in enumerate(linhas, start=1):
+        try:
+            pet_id = _pk(linha.get('pet'))
+        except (TypeError, ValueError):
+            erros.append(f"Linha {numero}: pet inválido.")
+            continue
+        objetos.append(model(pet_id=pet_id, **validar(linha, erros, numero)))
+    if erros:
+        raise ValidationError(erros)
+
+    pet_ids = [obj.pet_id for obj in objetos]
+    _pets_do_tutor(tutor, pet_ids)
+    with transaction.atomic():
+        criados = model.objects.bulk_create(objetos, batch_size=TAMANHO_BATCH)
+        _depois_do_lote(tutor, pet_ids)
+    return criados
+
+
+def _atualizar(model, validar, tutor, linhas):
+    _conferir_tamanho(linhas)
+    erros, alteracoes = [], {}
+    for numero, linha in enumerate(linhas, start=1):
+        try:
+            pk = _pk(linha.get('id'))
+        except (TypeError, ValueError):
+            erros.append(f"Linha {numero}: id inválido.")
+            continue
+        alteracoes[pk] = validar(linha, erros, numero, parcial=True)
+    if erros:
+        raise ValidationError(erros)
+
+    with transaction.atomic():
+        # Checagem de dono e carga dos registros na mesma consulta (com lock de linha)
+        objetos = list(model.objects.select_for_update().filter(pk__in=alteracoes, pet__tutor=tutor))
+        faltando = set(alteracoes) - {obj.pk for obj in objetos}
+        if faltando:
+            raise ValidationError(f"Registros inválidos: {', '.join(str(pk) for pk in sorted(faltando))}.")
+
+        agora = timezone.now()
+        campos = {'atualizado_em'}  # bulk_update não aplica auto_now
+        for obj in objetos:
+            for campo, valor in alteracoes[obj.pk].items():
+                setattr(obj, campo, valor)
+                campos.add(campo)
+            obj.atualizado_em = agora
+        model.objects.bulk_update(objetos, sorted(campos), batch_size=TAMANHO_BATCH)
+        _depois_do_lote(tutor, [obj.pet_id for obj in objetos])
+    return objetos
+
+
+def criar_eventos(tutor, linhas):
+    """linhas: [{'pet': id, 'tipo': ..., 'data': 'AAAA-MM-DD', 'observacoes': ...}, ...]"""
+    return _criar(Evento, _validar_evento, tutor, linhas)
+
+
+def atualizar_eventos(tutor, linhas):
+    """linhas: [{'id': id, e qualquer um de 'tipo', 'data', 'observacoes', 'concluido'}, ...]"""
+    return _atualizar(Evento, _validar_evento, tutor, linhas)
+
+
+def criar_itens(tutor, linhas):
+    """linhas: [{'pet': id, 'descricao': ...}, ...]"""
+    return _criar(ItemCompra, _validar_item, tutor, linhas)
+
+
+def atualizar_itens(tutor, linhas):
+    """linhas: [{'id': id, e qualquer um de 'descricao', 'comprado'}, ...]"""
+    return _atualizar(ItemCompra, _validar_item, tutor, linhas)
@@ -0,0 +1,160 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from pets import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede latência (p50/p95/p99) e consultas de cada rota de pets/urls.py como um tutor da base "
+        "e, opcionalmente, compara com um resultado anterior (baseline). Com --carga, compara a vazão "
+        "das páginas de leitura sob WSGI (views síncronas) e ASGI (views assíncronas); com --conexoes, "
+        "o custo de abrir a conexão do banco a cada requisição (CONN_MAX_AGE=0) x conexão persistente; "
+        "com --sessoes, as consultas de sessão/mensagens no fluxo evento_adicionar -> evento_list; "
+        "com --transferencia, bytes enviados e tempo de render no perfil de settings atual (VETLAB_PERFIL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tutor', default='bench_000000', help="Username do tutor usado nas requisições (padrão: bench_000000, do seed_vetlab).")
+        parser.add_argument('--repeticoes', type=int, default=benchmark.REPETICOES, help=f"Requisições medidas por rota (padrão: {benchmark.REPETICOES}).")
+        parser.add_argument('--aquecimento', type=int, default=benchmark.AQUECIMENTO, help=f"Requisições descartadas antes de medir (padrão: {benchmark.AQUECIMENTO}).")
+        parser.add_argument('--sem-cache', action='store_true', help="Esvazia o cache antes de cada requisição (pior caso).")
+        parser.add_argument('--rota', action='append', dest='rotas', help="Mede só esta rota (nome em pets/urls.py; pode repetir).")
+        parser.add_argument('--saida', help="Grava o resultado neste arquivo JSON.")
+        parser.add_argument('--baseline', help="Resultado anterior (JSON) para comparar; regressões fazem o comando falhar.")
+        parser.add_argument('--tolerancia', type=float, default=benchmark.TOLERANCIA, help=f"Aumento de p95 aceito sobre a baseline (padrão: {benchmark.TOLERANCIA:.0%}%).")
+        parser.add_argument('--carga', action='store_true', help="Teste de carga WSGI x ASGI em vez do benchmark por rota.")
+        parser.add_argument('--requisicoes', type=int, default=benchmark.REQUISICOES_CARGA, help=f"Requisições por modo na carga ou em --conexoes (padrão: {benchmark.REQUISICOES_CARGA}).")
+        parser.add_argument('--conexoes', action='store_true', help="Conexão nova por requisição x persistente em vez do benchmark por rota.")
+        parser.add_argument('--sessoes', action='store_true', help="Consultas por backend de sessão/mensagens no fluxo evento_adicionar -> evento_list.")
+        parser.add_argument('--transferencia', action='store_true', help="Bytes do HTML/estáticos e tempo de render no perfil atual em vez do benchmark por rota.")
+        parser.add_argument('--concorrencia', type=int, default=benchmark.CONCORRENCIA, help=f"Requisições simultâneas na carga (padrão: {benchmark.CONCORRENCIA}).")
+
+    def handle(self, *args, tutor, repeticoes, aquecimento, sem_cache, rotas, saida, baseline, tolerancia,
+               carga, conexoes, sessoes, transferencia, requisicoes, concorrencia, **options):
+        if repeticoes < 1 or aquecimento < 0 or tolerancia < 0:
+            raise CommandError("--repeticoes deve ser maior que zero; --aquecimento e --tolerancia não podem ser negativos.")
+        usuario = User.objects.filter(username=tutor).first()
+        if usuario is None:
+            raise CommandError(f"Tutor '{tutor}' não encontrado. Gere a base com `manage.py seed_vetlab` ou use --tutor.")
+        if carga:
+            return self.carga(usuario, requisicoes, concorrencia, rotas, saida)
+        if conexoes:
+            return self.conexoes(usuario, requisicoes, rotas, saida)
+        if sessoes:
+            return self.sessoes(usuario, repeticoes, aquecimento, saida)
+        if transferencia:
+            return self.transferencia(usuario, repeticoes, rotas, saida)
+        anterior = None
+        if baseline:
+            try:
+                with open(baseline, encoding='utf-8') as arquivo:
+                    anterior = json.load(arquivo)
+            except (OSError, ValueError) as erro:
+                raise CommandError(f"Não foi possível ler a baseline: {erro}")
+
+        self.stdout.write(f"{'rota':<28} {'status':>6} {'consultas':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+        def progresso(nome, medida):
+            self.stdout.write(
+                f"{nome:<28} {medida['status']:>6} {medida['consultas']:>9} "
+                f"{medida['p50_ms']:>8.1f} {medida['p95_ms']:>8.1f} {medida['p99_ms']:>8.1f}"
+            )
+
+        try:
+            resultado = benchmark.executar(usuario, repeticoes, aquecimento, sem_cache, rotas, progresso)
+        except ValueError as erro:
+            raise CommandError(str(erro))
+
+        if saida:
+            with open(saida, 'w', encoding='utf-8') as arquivo:
+                json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado gravado em {saida}.")
+        if anterior is not None:
+            regressoes = benchmark.comparar(resultado, anterior, tolerancia)
+            if regressoes:
+                raise CommandError("Regressões em relação à baseline:\n  " + "\n  ".join(regressoes))
+            self.stdout.write(self.style.SUCCESS("Nenhuma regressão em relação à baseline."))
+
+    def carga(self, usuario, requisicoes, concorrencia, rotas, saida):
+        if requisicoes < 1 or concorrencia < 1:
+            raise CommandError("--requisicoes e --concorrencia devem ser maiores que zero.")
+        self.stdout.write(f"{'modo':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'falhas':>7}")
+        resultado = {}
+        for modo in benchmark.URLCONF_DO_MODO:
+            try:
+                medida = benchmark.carga(usuario, modo, requisicoes, concorrencia, rotas)
+            except ValueError as erro:
+                raise CommandError(str(erro))
+            resultado[modo] = medida
+            self.stdout.write(
+                f"{modo:<6} {medida['req_por_s']:>8.1f} {medida['p50_ms']:>8.1f} "
+                f"{medida['p95_ms']:>8.1f} {medida['p99_ms']:>8.1f} {medida['falhas']:>7}"
+            )
+        self.stdout.write(f"ASGI/WSGI: {resultado['asgi']['req_por_s'] / resultado['wsgi']['req_por_s']:.2f}x a vazão.")
+        if saida:
+            with open(saida, 'w', encoding='utf-8') as arquivo:
+                json.dump({'carga': resultado}, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado gravado em {saida}.")
+
+    def conexoes(self, usuario, requisicoes, rotas, saida):
+        if requisicoes < 1:
+            raise CommandError("--requisicoes deve ser maior que zero.")
+        try:
+            resultado = benchmark.conexoes(usuario, requisicoes, rotas)
+        except ValueError as erro:
+            raise CommandError(str(erro))
+        self.stdout.write(f"Banco: {resultado['banco']}, {requisicoes} requisições por modo, health checks: {resultado['health_checks']}.")
+        self.stdout.write(f"{'modo':<12} {'conexões':>9} {'média ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'falhas':>7}")
+        for modo, medida in resultado['modos'].items():
+            self.stdout.write(
+                f"{modo:<12} {medida['conexoes_abertas']:>9} {medida['media_ms']:>9.2f} "
+                f"{medida['p50_ms']:>8.2f} {medida['p95_ms']:>8.2f} {medida['falhas']:>7}"
+            )
+        if 'custo_conexao_ms' in resultado:
+            self.stdout.write(f"Custo de abrir a conexão: {resultado['custo_conexao_ms']:.2f} ms por requisição.")
+        if saida:
+            with open(saida, 'w', encoding='utf-8') as arquivo:
+                json.dump({'conexoes': resultado}, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado gravado em {saida}.")
+
+    def sessoes(self, usuario, repeticoes, aquecimento, saida):
+        try:
+            resultado = benchmark.sessoes(usuario, repeticoes, aquecimento)
+        except ValueError as erro:
+            raise CommandError(str(erro))
+        self.stdout.write(f"Banco: {resultado['banco']}, {repeticoes} ciclos POST evento_adicionar -> GET evento_list por modo.")
+        self.stdout.write(f"{'modo':<24} {'POST':>6} {'GET':>6} {'sessão':>7} {'economia/req':>13} {'ciclo ms':>9} {'falhas':>7}")
+        for modo, medida in resultado['modos'].items():
+            self.stdout.write(
+                f"{modo:<24} {medida['consultas_post']:>6g} {medida['consultas_get']:>6g} {medida['consultas_sessao']:>7g} "
+                f"{medida['economia_por_requisicao']:>13g} {medida['ciclo_ms']:>9.2f} {medida['falhas']:>7}"
+            )
+        if saida:
+            with open(saida, 'w', encoding='utf-8') as arquivo:
+                json.dump({'sessoes': resultado}, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado gravado em {saida}.")
+
+    def transferencia(self, usuario, repeticoes, rotas, saida):
+        try:
+            resultado = benchmark.transferencia(usuario, repeticoes, rotas)
+        except ValueError as erro:
+            raise CommandError(str(erro))
+        self.stdout.write(f"Perfil: {resultado['perfil']} (DEBUG={resultado['debug']}), {repeticoes} requisições por página.")
+        self.stdout.write(
+            f"{'página':<18} {'HTML':>8} {'enviado':>8} {'render ms':>10} {'total ms':>9} {'total s/ cache de templates':>28}"
+        )
+        for nome, medida in resultado['paginas'].items():
+            self.stdout.write(
+                f"{nome:<18} {medida['bytes_html']:>8} {medida['bytes_transferidos']:>8} {medida['render_ms']:>10.2f} "
+                f"{medida['total_ms']:>9.2f} {medida['total_sem_cache_ms']:>28.2f}"
+            )
+        self.stdout.write(f"{'estático':<42} {'original':>8} {'enviado':>8}  cache-control")
+        for url, medida in resultado['estaticos'].items():
+            self.stdout.write(f"{url:<42} {medida['bytes_originais']:>8} {medida['bytes_transferidos']:>8}  {medida['cache_control']}")
+        if saida:
+            with open(saida, 'w', encoding='utf-8') as arquivo:
+                json.dump({'transferencia': resultado}, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado gravado em {saida}.")
@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from pets import exportacao
+
+
+class Command(BaseCommand):
+    help = "Exporta o histórico (pets, eventos, metas e compras) em CSV ou JSONL, lendo o banco em blocos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=exportacao.FORMATOS, default='csv', help="Formato de saída (padrão: csv).")
+        parser.add_argument('--saida', help="Arquivo de destino (padrão: saída padrão).")
+        parser.add_argument('--desde', help="Só registros criados/alterados a partir desta data (AAAA-MM-DD ou ISO 8601).")
+        parser.add_argument('--tutor', action='append', dest='tutores', help="Username do tutor (pode repetir; padrão: todos).")
+        parser.add_argument('--chunk', type=int, default=exportacao.TAMANHO_CHUNK, help=f"Linhas lidas do banco por vez (padrão: {exportacao.TAMANHO_CHUNK}).")
+
+    def handle(self, *args, formato, saida, desde, tutores, chunk, **options):
+        if chunk < 1:
+            raise CommandError("--chunk deve ser maior que zero.")
+        if desde:
+            try:
+                desde = exportacao.interpretar_desde(desde)
+            except ValueError as erro:
+                raise CommandError(str(erro))
+
+        tutor_ids = None
+        if tutores:
+            encontrados = dict(User.objects.filter(username__in=tutores).values_list('username', 'pk'))
+            faltando = sorted(set(tutores) - set(encontrados))
+            if faltando:
+                raise CommandError(f"Tutores não encontrados: {', '.join(faltando)}.")
+            tutor_ids = list(encontrados.values())
+
+        linhas = exportacao.linhas(formato, tutores=tutor_ids, desde=desde, chunk_size=chunk)
+        if saida:
+            with open(saida, 'w', encoding='utf-8', newline='') as arquivo:
+                for bloco in exportacao.em_blocos(linhas):
+                    arquivo.write(bloco)
+            self.stderr.write(self.style.SUCCESS(f"Exportação gravada em {saida}."))
+        else:
+            for bloco in exportacao.em_blocos(linhas):
+                self.stdout.write(bloco, ending='')
@@ -0,0 +1,74 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pets import importacao, tarefas
+
+
+class Command(BaseCommand):
+    help = "Importa históricos de clínicas (CSV ou JSONL) em lotes, com retomada após falha e modo de simulação."
+
+    def add_arguments(self, parser):
+        parser.add_argument('entrada', help="Arquivo .csv ou .jsonl (mesmo formato do export_vetlab; tutor por 'tutor' = username ou 'tutor_id').")
+        parser.add_argument('--formato', choices=importacao.FORMATOS, help="Formato do arquivo (padrão: pela extensão).")
+        parser.add_argument('--lote', type=int, default=importacao.TAMANHO_LOTE, help=f"Registros por lote/transação (padrão: {importacao.TAMANHO_LOTE}).")
+        parser.add_argument('--simular', action='store_true', help="Valida o arquivo inteiro sem gravar nada.")
+        parser.add_argument('--chave', help="Identifica a importação no progresso salvo no banco (padrão: caminho absoluto da entrada).")
+        parser.add_argument('--retomar', action='store_true', help="Continua uma importação interrompida a partir do progresso salvo.")
+        parser.add_argument('--do-zero', action='store_true', help="Descarta o progresso salvo e importa o arquivo inteiro de novo.")
+        parser.add_argument('--segundo-plano', action='store_true', help="Enfileira a importação para o `vetlab_worker`, sem esperar.")
+
+    def handle(self, *args, entrada, formato, lote, simular, chave, retomar, do_zero, segundo_plano, **options):
+        if lote < 1:
+            raise CommandError("--lote deve ser maior que zero.")
+        formato = formato or os.path.splitext(entrada)[1].lstrip('.').lower()
+        if formato not in importacao.FORMATOS:
+            raise CommandError("Não foi possível deduzir o formato pela extensão; use --formato csv|jsonl.")
+        if retomar and do_zero:
+            raise CommandError("Use --retomar ou --do-zero, não os dois.")
+        # Caminho absoluto: o worker (e uma retomada) pode rodar em outro diretório
+        chave = chave or os.path.abspath(entrada)
+
+        anterior = None if simular else importacao.carregar_estado(chave)
+        if anterior and do_zero:
+            importacao.descartar_estado(chave)
+            anterior = None
+        elif anterior and not retomar and not segundo_plano:
+            # Evita importar o mesmo arquivo duas vezes por engano
+            raise CommandError(f"{chave} já foi importado até o registro {anterior['processados']}: use --retomar ou --do-zero.")
+        elif retomar and not anterior:
+            raise CommandError(f"Nada para retomar: não há progresso salvo para {chave}.")
+
+        if segundo_plano:
+            if simular or retomar:
+                raise CommandError("--segundo-plano não combina com --simular ou --retomar (o worker retoma sozinho).")
+            if not os.path.exists(entrada):
+                raise CommandError(f"{entrada} não existe.")
+            if anterior:
+                raise CommandError(f"{chave} já foi importado até o registro {anterior['processados']}: use --do-zero para importar de novo.")
+            tarefa = tarefas.enfileirar('importacao', caminho=os.path.abspath(entrada), formato=formato, lote=lote, chave=chave)
+            self.stdout.write(f"Tarefa #{tarefa.pk} enfileirada.")
+            return
+        if anterior:
+            self.stdout.write(f"Retomando após {anterior['processados']} registros.")
+
+        def ao_confirmar(estado_atual):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"  {estado_atual['processados']} registros confirmados")
+
+        try:
+            importador, segundos = importacao.importar_arquivo(
+                entrada, formato, tamanho_lote=lote, simular=simular, estado=anterior, ao_confirmar=ao_confirmar,
+                chave=None if simular else chave,
+            )
+        except importacao.ErroImportacao as erro:
+            dica = "" if simular else " (o lote com erro não foi gravado; corrija e use --retomar)"
+            raise CommandError(f"Importação interrompida{dica}:\n{erro}")
+        except OSError as erro:
+            raise CommandError(str(erro))
+
+        total = sum(importador.gravados.values())
+        por_segundo = total / segundos if segundos else 0
+        resumo = ', '.join(f"{quantidade} {registro}" for registro, quantidade in importador.gravados.items())
+        verbo = "validados (simulação, nada gravado)" if simular else "importados"
+        self.stdout.write(self.style.SUCCESS(f"{total} registros {verbo} em {segundos:.2f}s ({por_segundo:.0f} registros/s): {resumo}."))
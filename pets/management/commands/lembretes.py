@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pets import lembretes, tarefas
+
+
+class Command(BaseCommand):
+    help = "Enfileira lembretes de eventos próximos/atrasados e envia os pendentes por e-mail (uma vez ou em loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--antecedencia', type=int, default=lembretes.ANTECEDENCIA_DIAS, help=f"Dias de antecedência do aviso (padrão: {lembretes.ANTECEDENCIA_DIAS}).")
+        parser.add_argument('--lote', type=int, default=lembretes.TAMANHO_LOTE, help=f"Máximo de e-mails por rodada (padrão: {lembretes.TAMANHO_LOTE}).")
+        parser.add_argument('--loop', type=int, metavar='SEGUNDOS', help="Fica rodando, repetindo a varredura e o envio a cada SEGUNDOS.")
+        parser.add_argument('--apenas-varrer', action='store_true', help="Só enfileira, sem enviar.")
+        parser.add_argument('--apenas-enviar', action='store_true', help="Só envia o que já está na fila.")
+        parser.add_argument('--segundo-plano', action='store_true', help="Só enfileira varredura + envio para o `vetlab_worker`, sem esperar.")
+
+    def handle(self, *args, antecedencia, lote, loop, apenas_varrer, apenas_enviar, segundo_plano, **options):
+        if antecedencia < 0 or lote < 1:
+            raise CommandError("--antecedencia não pode ser negativa e --lote deve ser maior que zero.")
+        if loop is not None and loop < 1:
+            raise CommandError("--loop deve ser maior que zero.")
+        if segundo_plano:
+            tarefa = tarefas.enfileirar('lembretes', antecedencia=antecedencia, lote=lote)
+            self.stdout.write(f"Tarefa #{tarefa.pk} enfileirada.")
+            return
+
+        while True:
+            if not apenas_enviar:
+                examinados = lembretes.varrer(antecedencia=antecedencia)
+                self.stdout.write(f"Varredura: {examinados} eventos examinados.")
+            if not apenas_varrer:
+                # Esvazia a fila em rodadas de --lote (as adiadas ficam para a próxima execução)
+                while True:
+                    resultado = lembretes.enviar_pendentes(limite=lote)
+                    if any(resultado.values()):
+                        self.stdout.write("Envio: " + ', '.join(f"{quantidade} {situacao}" for situacao, quantidade in resultado.items()))
+                    if resultado['enviado'] + resultado['cancelado'] + resultado['falhou'] < lote:
+                        break
+            if loop is None:
+                break
+            try:
+                time.sleep(loop)
+            except KeyboardInterrupt:
+                break
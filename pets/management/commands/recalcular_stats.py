@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pets.models import Pet, PetStats
+
+
+class Command(BaseCommand):
+    help = "Reconstrói (ou só verifica, com --verificar) os contadores da tabela PetStats em lote."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true', help="Apenas compara os contadores gravados com os reais, sem gravar nada.")
+        parser.add_argument('--lote', type=int, default=1000, help="Quantidade de pets processados por lote (padrão: 1000).")
+        parser.add_argument('--pet', type=int, action='append', dest='pets', help="Restringe a um pet (pode repetir).")
+
+    def handle(self, *args, verificar, lote, pets, **options):
+        if lote < 1:
+            raise CommandError("--lote deve ser maior que zero.")
+
+        base = Pet.objects.order_by('pk')
+        if pets:
+            base = base.filter(pk__in=pets)
+
+        total = divergentes = 0
+        ultimo_pk = 0
+        while True:
+            # Paginação por pk: cada lote é um range scan, sem OFFSET
+            pet_ids = list(base.filter(pk__gt=ultimo_pk).values_list('pk', flat=True)[:lote])
+            if not pet_ids:
+                break
+            ultimo_pk = pet_ids[-1]
+            total += len(pet_ids)
+
+            if verificar:
+                gravados = {s.pet_id: s.como_dict() for s in PetStats.objects.filter(pet_id__in=pet_ids)}
+                for esperado in PetStats.calcular(pet_ids):
+                    atual = gravados.get(esperado.pet_id)
+                    if atual != esperado.como_dict():
+                        divergentes += 1
+                        self.stdout.write(f"Pet {esperado.pet_id}: gravado={atual} esperado={esperado.como_dict()}")
+            else:
+                with transaction.atomic():
+                    PetStats.recalcular(pet_ids)
+
+        if verificar:
+            if divergentes:
+                raise CommandError(f"{divergentes} de {total} pets com contadores divergentes.")
+            self.stdout.write(self.style.SUCCESS(f"Contadores de {total} pets conferidos, nenhuma divergência."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Contadores de {total} pets recalculados."))
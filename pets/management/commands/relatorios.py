@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pets import relatorios, tarefas
+
+
+class Command(BaseCommand):
+    help = "Gera os relatórios agregados da clínica e grava um snapshot de cada (para rodar periodicamente no cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipos', nargs='*', help=f"Relatórios a gerar (padrão: todos). Opções: {', '.join(relatorios.RELATORIOS)}.")
+        parser.add_argument('--manter', type=int, default=relatorios.MANTER, help=f"Snapshots mantidos por tipo (padrão: {relatorios.MANTER}).")
+        parser.add_argument('--segundo-plano', action='store_true', help="Só enfileira a geração para o `vetlab_worker`, sem esperar.")
+
+    def handle(self, *args, tipos, manter, segundo_plano, **options):
+        desconhecidos = set(tipos) - relatorios.RELATORIOS.keys()
+        if desconhecidos:
+            raise CommandError(f"Relatório(s) desconhecido(s): {', '.join(sorted(desconhecidos))}.")
+        if manter < 1:
+            raise CommandError("--manter deve ser maior que zero.")
+
+        if segundo_plano:
+            tarefa = tarefas.enfileirar('relatorios', tipos=tipos or None, manter=manter)
+            self.stdout.write(f"Tarefa #{tarefa.pk} enfileirada.")
+            return
+        for snapshot in relatorios.gerar(tipos, manter=manter):
+            self.stdout.write(f"{snapshot.get_tipo_display()}: {len(snapshot.linhas)} linhas em {snapshot.segundos:.2f}s.")
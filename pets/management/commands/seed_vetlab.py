@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pets import semente
+
+
+class Command(BaseCommand):
+    help = "Gera uma base sintética (tutores × pets × eventos/metas/itens/pesagens) com bulk_create, para benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tutores', type=int, default=100, help="Quantidade de tutores (padrão: 100).")
+        parser.add_argument('--pets', type=int, default=3, help="Pets por tutor (padrão: 3).")
+        parser.add_argument('--eventos', type=int, default=50, help="Eventos por pet (padrão: 50).")
+        parser.add_argument('--metas', type=int, default=5, help="Metas por pet (padrão: 5).")
+        parser.add_argument('--itens', type=int, default=10, help="Itens de compra por pet (padrão: 10).")
+        parser.add_argument('--pesagens', type=int, default=1, help="Pesagens diárias por pet, terminando hoje (padrão: 1).")
+        parser.add_argument('--prefixo', default='bench', help="Prefixo dos usernames gerados (padrão: bench).")
+        parser.add_argument('--semente', type=int, default=42, dest='valor_semente', help="Semente do gerador aleatório (padrão: 42).")
+        parser.add_argument('--lote', type=int, default=semente.TAMANHO_LOTE, help=f"Linhas por bulk_create (padrão: {semente.TAMANHO_LOTE}).")
+        parser.add_argument('--limpar', action='store_true', help="Apaga antes os tutores com o mesmo prefixo (e tudo deles).")
+
+    def handle(self, *args, tutores, pets, eventos, metas, itens, pesagens, prefixo, valor_semente, lote, limpar, **options):
+        if tutores < 1 or pets < 1 or lote < 1:
+            raise CommandError("--tutores, --pets e --lote devem ser maiores que zero.")
+        if min(eventos, metas, itens, pesagens) < 0:
+            raise CommandError("--eventos, --metas, --itens e --pesagens não podem ser negativos.")
+
+        existentes = semente.usuarios(prefixo)
+        if existentes.exists():
+            if not limpar:
+                raise CommandError(f"Já existem tutores '{prefixo}_*'. Use --limpar para recriá-los ou outro --prefixo.")
+            apagados, _ = existentes.delete()
+            self.stdout.write(f"{apagados} linhas antigas apagadas.")
+
+        inicio = time.perf_counter()
+
+        def progresso(criados):
+            self.stdout.write(f"  {criados['tutores']}/{tutores} tutores, {criados['eventos']} eventos...")
+
+        criados = semente.semear(
+            tutores, pets, eventos, metas, itens, pesagens,
+            prefixo=prefixo, semente=valor_semente, tamanho_lote=lote, progresso=progresso,
+        )
+        segundos = time.perf_counter() - inicio
+        total = sum(criados.values())
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f"{quantidade} {tabela}" for tabela, quantidade in criados.items())
+            + f" em {segundos:.1f}s ({total / segundos if segundos else total:.0f} linhas/s). Senha dos tutores: {semente.SENHA}"
+        ))
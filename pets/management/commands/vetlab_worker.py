@@ -0,0 +1,77 @@
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pets import tarefas
+from pets.models import Tarefa
+
+
+class Command(BaseCommand):
+    help = "Executa as tarefas em segundo plano (exportações, lembretes, relatórios, importações) da fila no banco."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help="Tarefas executadas ao mesmo tempo (padrão: 4).")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos entre consultas à fila quando ela está vazia (padrão: 2).")
+        parser.add_argument('--tipo', action='append', choices=[tipo for tipo, _ in Tarefa.TIPOS], help="Só executa tarefas deste tipo (pode repetir).")
+        parser.add_argument('--uma-vez', action='store_true', help="Esvazia a fila (o que já está liberado) e sai, em vez de ficar esperando.")
+
+    def handle(self, *args, threads, intervalo, tipo, uma_vez, **options):
+        if threads < 1 or intervalo <= 0:
+            raise CommandError("--threads e --intervalo devem ser maiores que zero.")
+        trabalhador = tarefas.nome_do_trabalhador()
+        self.parar = False
+        # SIGTERM (deploy/restart): para de reivindicar e termina o que já começou
+        anterior = signal.signal(signal.SIGTERM, self.ao_sinal) if not uma_vez else None
+        self.stdout.write(f"Worker {trabalhador} com {threads} threads.")
+
+        em_andamento = {}
+        try:
+            with ThreadPoolExecutor(threads, thread_name_prefix='vetlab-worker') as pool:
+                proxima_recuperacao = proximo_batimento = 0
+                while not self.parar:
+                    if time.monotonic() >= proximo_batimento:
+                        tarefas.bater(trabalhador, [tarefa.pk for tarefa in em_andamento.values()])
+                        proximo_batimento = time.monotonic() + tarefas.BATIMENTO.total_seconds()
+                    if time.monotonic() >= proxima_recuperacao:
+                        if devolvidas := tarefas.recuperar_abandonadas(em_andamento=[tarefa.pk for tarefa in em_andamento.values()]):
+                            self.stdout.write(f"{devolvidas} tarefas abandonadas devolvidas à fila.")
+                        if apagados := tarefas.limpar_arquivos():
+                            self.stdout.write(f"{apagados} arquivos de exportação expirados apagados.")
+                        proxima_recuperacao = time.monotonic() + 60
+
+                    novas = tarefas.reivindicar(trabalhador, threads - len(em_andamento), tipo) if len(em_andamento) < threads else []
+                    for tarefa in novas:
+                        em_andamento[pool.submit(tarefas.executar_na_thread, tarefa)] = tarefa
+                    if uma_vez and not em_andamento:
+                        break
+                    if em_andamento:
+                        # Volta a reivindicar assim que uma thread fica livre; acorda a cada intervalo para o batimento
+                        prontas, _ = wait(em_andamento, timeout=min(intervalo, tarefas.BATIMENTO.total_seconds()), return_when=FIRST_COMPLETED)
+                        for futuro in prontas:
+                            self.relatar(em_andamento.pop(futuro), futuro)
+                    else:
+                        time.sleep(intervalo)
+                for futuro in list(em_andamento):
+                    self.relatar(em_andamento.pop(futuro), futuro)
+        except KeyboardInterrupt:
+            self.stdout.write("Interrompido; as tarefas em andamento voltam à fila quando o batimento parar.")
+        finally:
+            if anterior is not None:
+                signal.signal(signal.SIGTERM, anterior)
+
+    def ao_sinal(self, *args):
+        self.parar = True
+
+    def relatar(self, tarefa, futuro):
+        descricao = f"{tarefa.get_tipo_display()} #{tarefa.pk} (tentativa {tarefa.tentativas})"
+        try:
+            situacao = futuro.result()
+        except Exception as erro:
+            # Não deu para gravar o desfecho (ex.: banco fora do ar): a tarefa fica
+            # "executando", sem batimento, e volta para a fila pela recuperação de abandonadas
+            self.stderr.write(f"{descricao}: erro ao gravar o desfecho: {erro}")
+            return
+        estilo = self.style.SUCCESS if situacao == 'concluida' else self.style.WARNING
+        self.stdout.write(estilo(f"{descricao}: {situacao}."))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0004_itemcompra_delete_produto_alter_evento_tipo_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['pet', '-data'], name='pets_evento_pet_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemcompra',
+            index=models.Index(fields=['pet', 'comprado', 'criado_em'], name='pets_item_pet_comp_criado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meta',
+            index=models.Index(fields=['pet', 'progresso', 'data_prazo'], name='pets_meta_pet_prog_prazo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['tutor', 'nome'], name='pets_pet_tutor_nome_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def preencher_stats(apps, schema_editor):
+    Pet = apps.get_model('pets', 'Pet')
+    PetStats = apps.get_model('pets', 'PetStats')
+    Evento = apps.get_model('pets', 'Evento')
+    Meta = apps.get_model('pets', 'Meta')
+    ItemCompra = apps.get_model('pets', 'ItemCompra')
+
+    stats = {pk: PetStats(pet_id=pk) for pk in Pet.objects.values_list('pk', flat=True)}
+    for linha in Evento.objects.order_by().values('pet_id').annotate(total=Count('pk'), pendentes=Count('pk', filter=Q(concluido=False))):
+        stats[linha['pet_id']].total_eventos = linha['total']
+        stats[linha['pet_id']].eventos_pendentes = linha['pendentes']
+    for linha in Meta.objects.order_by().values('pet_id').annotate(concluidas=Count('pk', filter=Q(progresso=100)), andamento=Count('pk', filter=Q(progresso__lt=100))):
+        stats[linha['pet_id']].metas_concluidas = linha['concluidas']
+        stats[linha['pet_id']].metas_em_andamento = linha['andamento']
+    for linha in ItemCompra.objects.filter(comprado=False).order_by().values('pet_id').annotate(pendentes=Count('pk')):
+        stats[linha['pet_id']].itens_pendentes = linha['pendentes']
+    PetStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0005_indices_compostos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetStats',
+            fields=[
+                ('pet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='pets.pet')),
+                ('total_eventos', models.PositiveIntegerField(default=0)),
+                ('eventos_pendentes', models.PositiveIntegerField(default=0)),
+                ('metas_concluidas', models.PositiveIntegerField(default=0)),
+                ('metas_em_andamento', models.PositiveIntegerField(default=0)),
+                ('itens_pendentes', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(preencher_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0007_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lembrete',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('proximo', 'Evento próximo'), ('atrasado', 'Evento atrasado')], max_length=20)),
+                ('data_evento', models.DateField()),
+                ('destinatario', models.EmailField(max_length=254)),
+                ('assunto', models.CharField(max_length=255)),
+                ('corpo', models.TextField()),
+                ('situacao', models.CharField(choices=[('pendente', 'Pendente'), ('enviado', 'Enviado'), ('cancelado', 'Cancelado'), ('falhou', 'Falhou')], default='pendente', max_length=20)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('erro', models.TextField(blank=True, default='')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VarreduraLembretes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proximos_ate', models.DateField(blank=True, null=True)),
+                ('atrasados_ate', models.DateField(blank=True, null=True)),
+                ('alterados_desde', models.DateTimeField(blank=True, null=True)),
+                ('executado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['concluido', 'data'], name='pets_evento_concl_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['atualizado_em'], name='pets_evento_atualizado_idx'),
+        ),
+        migrations.AddField(
+            model_name='lembrete',
+            name='evento',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lembretes', to='pets.evento'),
+        ),
+        migrations.AddIndex(
+            model_name='lembrete',
+            index=models.Index(condition=models.Q(('situacao', 'pendente')), fields=['id'], name='pets_lembrete_pendente_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='lembrete',
+            constraint=models.UniqueConstraint(fields=('evento', 'tipo', 'data_evento'), name='pets_lembrete_unico'),
+        ),
+    ]
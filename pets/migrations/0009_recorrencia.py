@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0008_lembretes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExcecaoRecorrencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='dias_semana',
+            field=models.CharField(blank=True, default='', max_length=13),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='intervalo',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='recorrencia',
+            field=models.CharField(blank=True, choices=[('', 'Não se repete'), ('diaria', 'Diária'), ('semanal', 'Semanal'), ('mensal', 'Mensal')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='repetir_ate',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(condition=models.Q(('recorrencia', ''), _negated=True), fields=['data'], name='pets_evento_serie_data_idx'),
+        ),
+        migrations.AddField(
+            model_name='excecaorecorrencia',
+            name='evento',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='excecoes', to='pets.evento'),
+        ),
+        migrations.AddConstraint(
+            model_name='excecaorecorrencia',
+            constraint=models.UniqueConstraint(fields=('evento', 'data'), name='pets_excecao_evento_data_unica'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+from django.db import migrations
+
+# Pesos do bm25 por coluna: (texto, tutor). A coluna `tutor` só filtra.
+FTS5 = [
+    "CREATE VIRTUAL TABLE pets_busca USING fts5(texto, tutor, tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO pets_busca(pets_busca, rank) VALUES ('rank', 'bm25(1.0, 0.0)')",
+]
+
+# (tabela, código no rowid, expressão do texto, expressão do tutor, colunas de texto)
+TABELAS_FTS5 = [
+    ('pets_pet', 0, "{r}.nome || ' ' || {r}.especie || ' ' || coalesce({r}.raca, '')", "{r}.tutor_id", 'nome, especie, raca'),
+    ('pets_evento', 1, "{r}.tipo || ' ' || coalesce({r}.observacoes, '')", "(SELECT tutor_id FROM pets_pet WHERE id = {r}.pet_id)", 'tipo, observacoes'),
+    ('pets_meta', 2, "{r}.descricao", "(SELECT tutor_id FROM pets_pet WHERE id = {r}.pet_id)", 'descricao'),
+    ('pets_itemcompra', 3, "{r}.descricao", "(SELECT tutor_id FROM pets_pet WHERE id = {r}.pet_id)", 'descricao'),
+]
+
+# Devem ser idênticos a pets.busca.TABELAS / vetor(): é a mesma expressão que o planner compara
+CAMPOS_POSTGRES = [
+    ('Pet', 'pets_pet_busca_gin', ('nome', 'especie', 'raca')),
+    ('Evento', 'pets_evento_busca_gin', ('tipo', 'observacoes')),
+    ('Meta', 'pets_meta_busca_gin', ('descricao',)),
+    ('ItemCompra', 'pets_item_busca_gin', ('descricao',)),
+]
+
+
+def _indices_postgres(apps):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+    for model, nome, campos in CAMPOS_POSTGRES:
+        yield apps.get_model('pets', model), GinIndex(SearchVector(*campos, config='portuguese'), name=nome)
+
+
+def criar(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model, indice in _indices_postgres(apps):
+            schema_editor.add_index(model, indice)
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return  # sem FTS5: pets.busca usa o fallback com icontains
+        for sql in FTS5:
+            schema_editor.execute(sql)
+        for tabela, codigo, texto, tutor, colunas in TABELAS_FTS5:
+            novo = {'texto': texto.format(r='NEW'), 'tutor': tutor.format(r='NEW')}
+            schema_editor.execute(
+                f"INSERT INTO pets_busca(rowid, texto, tutor) "
+                f"SELECT t.id * 4 + {codigo}, {texto.format(r='t')}, 't' || {tutor.format(r='t')} FROM {tabela} t"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {tabela}_busca_ai AFTER INSERT ON {tabela} BEGIN "
+                f"INSERT INTO pets_busca(rowid, texto, tutor) VALUES (NEW.id * 4 + {codigo}, {novo['texto']}, 't' || {novo['tutor']}); END"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {tabela}_busca_au AFTER UPDATE OF {colunas} ON {tabela} BEGIN "
+                f"UPDATE pets_busca SET texto = {novo['texto']} WHERE rowid = NEW.id * 4 + {codigo}; END"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {tabela}_busca_ad AFTER DELETE ON {tabela} BEGIN "
+                f"DELETE FROM pets_busca WHERE rowid = OLD.id * 4 + {codigo}; END"
+            )
+
+
+def remover(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model, indice in _indices_postgres(apps):
+            schema_editor.remove_index(model, indice)
+    elif vendor == 'sqlite':
+        for tabela, *_ in TABELAS_FTS5:
+            for sufixo in ('ai', 'au', 'ad'):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {tabela}_busca_{sufixo}")
+        schema_editor.execute("DROP TABLE IF EXISTS pets_busca")
+
+
+class Migration(migrations.Migration):
+    """
+    Índices da busca textual (pets/busca.py): GIN de expressão no PostgreSQL,
+    tabela FTS5 + triggers no SQLite. Nos demais bancos não faz nada.
+    """
+
+    dependencies = [
+        ('pets', '0009_recorrencia'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar, remover),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def registrar_peso_atual(apps, schema_editor):
+    # Ponto de partida do histórico: o peso atual de cada pet, na data da última alteração
+    Pet = apps.get_model('pets', 'Pet')
+    PesoRegistro = apps.get_model('pets', 'PesoRegistro')
+    PesoRegistro.objects.bulk_create(
+        (PesoRegistro(pet_id=pk, peso=peso, registrado_em=atualizado_em)
+         for pk, peso, atualizado_em in Pet.objects.values_list('pk', 'peso', 'atualizado_em').iterator(chunk_size=2000)),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0010_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PesoRegistro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('peso', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('registrado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('pet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pesos', to='pets.pet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['pet', 'registrado_em'], name='pets_peso_pet_data_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_peso_atual, migrations.RunPython.noop),
+    ]
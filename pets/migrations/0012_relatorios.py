@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:58
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0011_pesoregistro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatorioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('vacinas_por_mes', 'Vacinas por mês e espécie'), ('atrasados_por_tutor', 'Eventos atrasados por tutor'), ('metas_por_especie', 'Conclusão de metas por espécie'), ('itens_mais_pedidos', 'Itens de compra mais pedidos')], max_length=30)),
+                ('gerado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('linhas', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('segundos', models.FloatField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo', '-gerado_em'], name='pets_relatorio_tipo_data_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:26
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0012_relatorios'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('exportacao', 'Exportação do histórico'), ('lembretes', 'Varredura e envio de lembretes'), ('relatorios', 'Geração dos relatórios da clínica'), ('importacao', 'Importação em lote')], max_length=30)),
+                ('argumentos', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('situacao', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], default='pendente', max_length=20)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('maximo_tentativas', models.PositiveSmallIntegerField(default=5)),
+                ('executar_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('trabalhador', models.CharField(blank=True, default='', max_length=100)),
+                ('resultado', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('erro', models.TextField(blank=True, default='')),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True)),
+                ('concluida_em', models.DateTimeField(blank=True, null=True)),
+                ('tutor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tarefas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('situacao', 'pendente')), fields=['executar_em', 'id'], name='pets_tarefa_pendente_idx'), models.Index(condition=models.Q(('situacao', 'executando')), fields=['iniciada_em'], name='pets_tarefa_executando_idx')],
+            },
+        ),
+    ]
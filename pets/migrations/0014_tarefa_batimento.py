@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+def preencher_batimento(apps, schema_editor):
+    # Tarefas já em "executando" passam a contar o batimento a partir do início
+    Tarefa = apps.get_model('pets', 'Tarefa')
+    Tarefa.objects.filter(atualizado_em__isnull=True).update(atualizado_em=F('iniciada_em'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0013_tarefas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefa',
+            name='atualizado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(preencher_batimento, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='tarefa',
+            name='pets_tarefa_executando_idx',
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(condition=Q(('situacao', 'executando')), fields=['atualizado_em'], name='pets_tarefa_batimento_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0014_tarefa_batimento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressoImportacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=500, unique=True)),
+                ('processados', models.PositiveIntegerField(default=0)),
+                ('pets', models.JSONField(default=dict)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0015_progresso_importacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lembrete',
+            name='reservado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='lembrete',
+            name='situacao',
+            field=models.CharField(choices=[('pendente', 'Pendente'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('cancelado', 'Cancelado'), ('falhou', 'Falhou')], default='pendente', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='lembrete',
+            index=models.Index(condition=models.Q(('situacao', 'enviando')), fields=['reservado_em'], name='pets_lembrete_enviando_idx'),
+        ),
+    ]
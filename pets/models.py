@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
+
 # ==============================================================================
 # MODELO DO PET
 # ==============================================================================
@@ -12,10 +16,68 @@ class Pet(models.Model):
     raca = models.CharField(max_length=50, blank=True, null=True)
     data_nascimento = models.DateField()
     peso = models.DecimalField(max_digits=5, decimal_places=2)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # pet_list / evento_selecionar_pet: filter(tutor=...) em ordem de nome
+            models.Index(fields=['tutor', 'nome'], name='pets_pet_tutor_nome_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nome} ({self.especie}) - Tutor: {self.tutor.username}"
 
+    @classmethod
+    def carimbo(cls, pk, tutor):
+        """
+        Versão do pet e de tudo o que pendura nele: o maior entre Pet.atualizado_em
+        e PetStats.atualizado_em. Uma consulta por pk; None se o pet não for do tutor.
+        """
+        return cls._maior_data(cls._consulta_carimbo(pk, tutor).first())
+
+    @classmethod
+    async def acarimbo(cls, pk, tutor):
+        """carimbo() para as views assíncronas."""
+        return cls._maior_data(await cls._consulta_carimbo(pk, tutor).afirst())
+
+    @classmethod
+    def _consulta_carimbo(cls, pk, tutor):
+        return cls.objects.filter(pk=pk, tutor=tutor).values_list('atualizado_em', 'stats__atualizado_em')
+
+    @staticmethod
+    def _maior_data(linha):
+        if linha is None:
+            return None
+        return max(data for data in linha if data is not None)
+
+    def obter_stats(self):
+        """Contadores do pet; recalcula na hora se a linha de PetStats ainda não existir."""
+        try:
+            return self.stats
+        except PetStats.DoesNotExist:
+            self.stats = PetStats.recalcular([self.pk])[0]
+            return self.stats
+
+
+class PesoRegistro(models.Model):
+    """
+    Histórico de pesagens do pet (série temporal). Pet.peso continua sendo o
+    peso atual; cada mudança dele grava uma linha aqui (signal em
+    pets/signals.py). O gráfico lê a série já agregada pelo banco (pets/pesos.py).
+    """
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='pesos')
+    peso = models.DecimalField(max_digits=5, decimal_places=2)
+    registrado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Série de um pet por faixa de tempo (range scan + GROUP BY por período)
+            models.Index(fields=['pet', 'registrado_em'], name='pets_peso_pet_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.pet.nome}: {self.peso} kg em {self.registrado_em:%d/%m/%Y}"
+
 # ==============================================================================
 # MODELO DO EVENTO
 # ==============================================================================
@@ -32,10 +94,69 @@ class Evento(models.Model):
     data = models.DateField()
     observacoes = models.TextField(blank=True, null=True)
     concluido = models.BooleanField(default=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    # --- Recorrência (pets/recorrencia.py) ---
+    # Vazio = evento único. Nos recorrentes, `data` é a primeira ocorrência e as
+    # demais são calculadas para a janela exibida; conclusões vão para ExcecaoRecorrencia.
+    RECORRENCIAS = (
+        ('', 'Não se repete'),
+        ('diaria', 'Diária'),
+        ('semanal', 'Semanal'),
+        ('mensal', 'Mensal'),
+    )
+    DIAS_SEMANA = ((0, 'Seg'), (1, 'Ter'), (2, 'Qua'), (3, 'Qui'), (4, 'Sex'), (5, 'Sáb'), (6, 'Dom'))
+    recorrencia = models.CharField(max_length=10, choices=RECORRENCIAS, blank=True, default='')
+    intervalo = models.PositiveSmallIntegerField(default=1)  # a cada N dias/semanas/meses
+    dias_semana = models.CharField(max_length=13, blank=True, default='')  # semanal: "0,2,4" (0 = segunda)
+    repetir_ate = models.DateField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # evento_list / pet_visao_geral: filter(pet=...).order_by('-data')
+            models.Index(fields=['pet', '-data'], name='pets_evento_pet_data_idx'),
+            # Varredura de lembretes (pets/lembretes.py): pendentes por faixa de data, de todos os pets
+            models.Index(fields=['concluido', 'data'], name='pets_evento_concl_data_idx'),
+            # Varredura de lembretes e exportação incremental: alterados desde a última execução
+            models.Index(fields=['atualizado_em'], name='pets_evento_atualizado_idx'),
+            # Varredura de lembretes: séries ativas (índice parcial, só as recorrentes)
+            models.Index(fields=['data'], condition=~Q(recorrencia=''), name='pets_evento_serie_data_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} de {self.pet.nome} em {self.data}"
 
+    def dias_semana_lista(self):
+        return sorted({int(dia) for dia in self.dias_semana.split(',') if dia.strip().isdigit() and int(dia) < 7})
+
+    def descricao_recorrencia(self):
+        if not self.recorrencia:
+            return ''
+        unidades = {'diaria': ('dia', 'dias'), 'semanal': ('semana', 'semanas'), 'mensal': ('mês', 'meses')}[self.recorrencia]
+        texto = f"A cada {self.intervalo} {unidades[1]}" if self.intervalo > 1 else f"A cada {unidades[0]}"
+        if self.recorrencia == 'semanal' and self.dias_semana_lista():
+            nomes = dict(self.DIAS_SEMANA)
+            texto += f" ({', '.join(nomes[dia] for dia in self.dias_semana_lista())})"
+        if self.repetir_ate:
+            texto += f" até {self.repetir_ate:%d/%m/%Y}"
+        return texto
+
+
+class ExcecaoRecorrencia(models.Model):
+    """Ocorrência de um evento recorrente marcada como concluída."""
+    evento = models.ForeignKey(Evento, on_delete=models.CASCADE, related_name='excecoes')
+    data = models.DateField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Também serve de índice para buscar as conclusões de uma janela: (evento, data)
+            models.UniqueConstraint(fields=['evento', 'data'], name='pets_excecao_evento_data_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.evento} — ocorrência de {self.data} concluída"
+
 # ==============================================================================
 # MODELO DA META
 # ==============================================================================
@@ -44,6 +165,13 @@ class Meta(models.Model):
     descricao = models.CharField(max_length=255)
     data_prazo = models.DateField()
     progresso = models.IntegerField(default=0) # 0 a 100
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # meta_list / pet_visao_geral: filter(pet=...).order_by('progresso', 'data_prazo')
+            models.Index(fields=['pet', 'progresso', 'data_prazo'], name='pets_meta_pet_prog_prazo_idx'),
+        ]
 
     def __str__(self):
         return f"Meta para {self.pet.nome}: {self.descricao}"
@@ -60,6 +188,268 @@ class ItemCompra(models.Model):
     descricao = models.CharField(max_length=255)
     criado_em = models.DateTimeField(auto_now_add=True)
     comprado = models.BooleanField(default=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # shop_list_view: filter(pet=..., comprado=...).order_by('criado_em')
+            models.Index(fields=['pet', 'comprado', 'criado_em'], name='pets_item_pet_comp_criado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Comprar '{self.descricao}' para {self.pet.nome}"
+
+
+# ==============================================================================
+# <<< NOVO MODELO: Contadores por Pet >>>
+# ==============================================================================
+class PetStats(models.Model):
+    """
+    Contadores de cada pet mantidos em uma tabela de resumo, para que a visão
+    geral e a lista de pets leiam os números com um lookup em vez de COUNT(*).
+
+    São atualizados incrementalmente pelos signals de pets/signals.py. Escritas
+    que não disparam signals (bulk_create, QuerySet.update) devem chamar
+    PetStats.recalcular() para os pets afetados; `manage.py recalcular_stats`
+    reconstrói ou verifica tudo em lote.
+    """
+    pet = models.OneToOneField(Pet, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_eventos = models.PositiveIntegerField(default=0)
+    eventos_pendentes = models.PositiveIntegerField(default=0)
+    metas_concluidas = models.PositiveIntegerField(default=0)
+    metas_em_andamento = models.PositiveIntegerField(default=0)
+    itens_pendentes = models.PositiveIntegerField(default=0)
+    # Última escrita em qualquer Evento/Meta/ItemCompra do pet (inclusive exclusões);
+    # junto com Pet.atualizado_em forma o carimbo de versão das páginas do pet.
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    CONTADORES = ('total_eventos', 'eventos_pendentes', 'metas_concluidas', 'metas_em_andamento', 'itens_pendentes')
+
+    def __str__(self):
+        return f"Stats de {self.pet_id}"
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in self.CONTADORES}
+
+    @classmethod
+    def calcular(cls, pet_ids):
+        """Conta do zero (3 consultas agrupadas) e devolve instâncias não salvas, na ordem de `pet_ids`."""
+        pet_ids = list(pet_ids)
+        stats = {pk: cls(pet_id=pk) for pk in pet_ids}
+
+        eventos = (
+            Evento.objects.filter(pet_id__in=pet_ids).order_by().values('pet_id')
+            .annotate(total=Count('pk'), pendentes=Count('pk', filter=Q(concluido=False)))
+        )
+        for linha in eventos:
+            stats[linha['pet_id']].total_eventos = linha['total']
+            stats[linha['pet_id']].eventos_pendentes = linha['pendentes']
+
+        metas = (
+            Meta.objects.filter(pet_id__in=pet_ids).order_by().values('pet_id')
+            .annotate(concluidas=Count('pk', filter=Q(progresso=100)), andamento=Count('pk', filter=Q(progresso__lt=100)))
+        )
+        for linha in metas:
+            stats[linha['pet_id']].metas_concluidas = linha['concluidas']
+            stats[linha['pet_id']].metas_em_andamento = linha['andamento']
+
+        itens = (
+            ItemCompra.objects.filter(pet_id__in=pet_ids, comprado=False).order_by().values('pet_id')
+            .annotate(pendentes=Count('pk'))
+        )
+        for linha in itens:
+            stats[linha['pet_id']].itens_pendentes = linha['pendentes']
+
+        return [stats[pk] for pk in pet_ids]
+
+    @classmethod
+    def recalcular(cls, pet_ids):
+        """Recalcula e grava (upsert) os contadores dos pets informados."""
+        stats = cls.calcular(pet_ids)
+        cls.objects.bulk_create(
+            stats, update_conflicts=True, unique_fields=['pet'], update_fields=[*cls.CONTADORES, 'atualizado_em'],
+        )
+        return stats
+
+    @classmethod
+    def aplicar_delta(cls, pet_id, delta):
+        """
+        Soma `delta` ({contador: +-n}) aos contadores do pet e marca atualizado_em,
+        em um único UPDATE (mesmo com delta vazio, para registrar a escrita).
+        Nunca passa de zero para baixo: um delta repetido por engano não vira
+        IntegrityError no PositiveIntegerField (o recalcular_stats corrige).
+        """
+        somas = {
+            campo: Greatest(F(campo) + valor, Value(0)) if valor < 0 else F(campo) + valor
+            for campo, valor in delta.items() if valor
+        }
+        atualizados = cls.objects.filter(pet_id=pet_id).update(atualizado_em=timezone.now(), **somas)
+        if not atualizados:
+            # Pet ainda sem linha de stats (ex.: criado antes da tabela existir)
+            cls.recalcular([pet_id])
+
+
+# ==============================================================================
+# <<< NOVO MODELO: Lembretes (outbox) >>>
+# ==============================================================================
+class Lembrete(models.Model):
+    """
+    Fila de saída dos lembretes de eventos. A varredura (pets/lembretes.py)
+    só insere linhas aqui; o envio por e-mail é um passo separado que consome
+    as pendentes. A restrição única (evento, tipo, data_evento) torna a
+    varredura idempotente: reprocessar a mesma faixa não duplica lembretes.
+    """
+    TIPOS = (
+        ('proximo', 'Evento próximo'),
+        ('atrasado', 'Evento atrasado'),
+    )
+    SITUACOES = (
+        ('pendente', 'Pendente'),
+        ('enviando', 'Enviando'),
+        ('enviado', 'Enviado'),
+        ('cancelado', 'Cancelado'),
+        ('falhou', 'Falhou'),
+    )
+    evento = models.ForeignKey(Evento, on_delete=models.CASCADE, related_name='lembretes')
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    data_evento = models.DateField()
+    destinatario = models.EmailField()
+    assunto = models.CharField(max_length=255)
+    corpo = models.TextField()
+    situacao = models.CharField(max_length=20, choices=SITUACOES, default='pendente')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    erro = models.TextField(blank=True, default='')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    # Quando o envio reservou a linha ("enviando"); reserva antiga = envio interrompido
+    reservado_em = models.DateTimeField(blank=True, null=True)
+    enviado_em = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['evento', 'tipo', 'data_evento'], name='pets_lembrete_unico'),
+        ]
+        indexes = [
+            # Envio: só as pendentes, em ordem de chegada (índice parcial, fica pequeno)
+            models.Index(fields=['id'], condition=Q(situacao='pendente'), name='pets_lembrete_pendente_idx'),
+            # Devolução à fila das que ficaram presas em "enviando" (processo morto)
+            models.Index(fields=['reservado_em'], condition=Q(situacao='enviando'), name='pets_lembrete_enviando_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.assunto} ({self.get_situacao_display()})"
+
+
+class VarreduraLembretes(models.Model):
+    """
+    Marca d'água da varredura de lembretes (linha única, pk=1): até que data
+    os eventos próximos/atrasados já foram enfileirados e desde quando procurar
+    eventos alterados. Atualizada na mesma transação que insere os lembretes.
+    """
+    proximos_ate = models.DateField(blank=True, null=True)
+    atrasados_ate = models.DateField(blank=True, null=True)
+    alterados_desde = models.DateTimeField(blank=True, null=True)
+    executado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Varredura de lembretes (próximos até {self.proximos_ate}, atrasados até {self.atrasados_ate})"
+
+
+# ==============================================================================
+# <<< NOVO MODELO: Relatórios da clínica (snapshots) >>>
+# ==============================================================================
+class RelatorioSnapshot(models.Model):
+    """
+    Resultado de um relatório agregado da clínica (pets/relatorios.py), gerado
+    periodicamente por `manage.py relatorios`. A página de relatórios só lê o
+    snapshot mais recente de cada tipo; as consultas com GROUP BY sobre as
+    tabelas inteiras rodam no comando, fora da requisição.
+    """
+    TIPOS = (
+        ('vacinas_por_mes', 'Vacinas por mês e espécie'),
+        ('atrasados_por_tutor', 'Eventos atrasados por tutor'),
+        ('metas_por_especie', 'Conclusão de metas por espécie'),
+        ('itens_mais_pedidos', 'Itens de compra mais pedidos'),
+    )
+    tipo = models.CharField(max_length=30, choices=TIPOS)
+    gerado_em = models.DateTimeField(default=timezone.now)
+    linhas = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    segundos = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            # Último snapshot de cada tipo / limpeza dos antigos
+            models.Index(fields=['tipo', '-gerado_em'], name='pets_relatorio_tipo_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} ({self.gerado_em:%d/%m/%Y %H:%M})"
+
+
+# ==============================================================================
+# <<< NOVO MODELO: Tarefas em segundo plano (fila no banco) >>>
+# ==============================================================================
+class Tarefa(models.Model):
+    """
+    Trabalho lento (exportações, lembretes, relatórios, importações) enfileirado
+    pelas views e comandos e executado fora da requisição por
+    `manage.py vetlab_worker` (pets/tarefas.py). Falhas voltam para a fila com
+    espera crescente até `maximo_tentativas`.
+    """
+    TIPOS = (
+        ('exportacao', 'Exportação do histórico'),
+        ('lembretes', 'Varredura e envio de lembretes'),
+        ('relatorios', 'Geração dos relatórios da clínica'),
+        ('importacao', 'Importação em lote'),
+    )
+    SITUACOES = (
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('falhou', 'Falhou'),
+    )
+    tipo = models.CharField(max_length=30, choices=TIPOS)
+    tutor = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='tarefas')
+    argumentos = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    situacao = models.CharField(max_length=20, choices=SITUACOES, default='pendente')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    maximo_tentativas = models.PositiveSmallIntegerField(default=5)
+    executar_em = models.DateTimeField(default=timezone.now)
+    trabalhador = models.CharField(max_length=100, blank=True, default='')
+    resultado = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    erro = models.TextField(blank=True, default='')
+    criada_em = models.DateTimeField(auto_now_add=True)
+    iniciada_em = models.DateTimeField(blank=True, null=True)
+    # Batimento: o worker renova enquanto a tarefa roda; parado há muito tempo = worker morto
+    atualizado_em = models.DateTimeField(blank=True, null=True)
+    concluida_em = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Worker: pendentes já liberadas, em ordem (índice parcial, fica pequeno)
+            models.Index(fields=['executar_em', 'id'], condition=Q(situacao='pendente'), name='pets_tarefa_pendente_idx'),
+            # Recuperação das que ficaram presas em "executando" (worker morto)
+            models.Index(fields=['atualizado_em'], condition=Q(situacao='executando'), name='pets_tarefa_batimento_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_situacao_display()})"
+
+
+# ==============================================================================
+# <<< NOVO MODELO: Progresso das importações em lote >>>
+# ==============================================================================
+class ProgressoImportacao(models.Model):
+    """
+    Até onde uma importação (`manage.py import_vetlab`, pets/importacao.py)
+    chegou. É gravado na mesma transação de cada lote: ou o lote e o progresso
+    ficam, ou nenhum dos dois, e a retomada nunca grava um lote duas vezes.
+    """
+    # Identifica a importação; por padrão, o caminho absoluto do arquivo
+    chave = models.CharField(max_length=500, unique=True)
+    processados = models.PositiveIntegerField(default=0)
+    # id de origem do pet -> pk gravado, para os registros dos lotes seguintes
+    pets = models.JSONField(default=dict)
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Comprar '{self.descricao}' para {self.pet.nome}"
\ No newline at end of file
+        return f"{self.chave} ({self.processados} registros)"
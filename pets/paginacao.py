@@ -0,0 +1,124 @@
+# ==============================================================================
+# PAGINAÇÃO POR CURSOR (KEYSET)
+# ==============================================================================
+# Em vez de OFFSET (que fica mais lento a cada página), o cursor guarda os
+# valores da ordenação do último item exibido e a próxima página começa com um
+# filtro "depois de (data, id)". Com os índices compostos por pet o banco faz
+# só um range scan, então o custo de uma página não depende de quão fundo o
+# histórico vai.
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+TAMANHO_PAGINA = 20
+
+
+class Pagina:
+    def __init__(self, itens, proximo_cursor, url_proxima, cursor_atual):
+        self.itens = itens
+        self.proximo_cursor = proximo_cursor
+        self.url_proxima = url_proxima
+        self.cursor_atual = cursor_atual
+
+    @property
+    def tem_mais(self):
+        return self.proximo_cursor is not None
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+
+def _campos(ordenacao):
+    return [(campo.lstrip('-'), campo.startswith('-')) for campo in ordenacao]
+
+
+def _serializar(valor):
+    # isoformat() preserva os microssegundos (o DjangoJSONEncoder os trunca)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não suportado no cursor: {type(valor).__name__}")
+
+
+def codificar_cursor(obj, ordenacao):
+    # Aceita instâncias de model ou linhas de .values() (usadas pela API)
+    if isinstance(obj, dict):
+        valores = [obj[nome] for nome, _ in _campos(ordenacao)]
+    else:
+        valores = [getattr(obj, nome) for nome, _ in _campos(ordenacao)]
+    dados = json.dumps(valores, default=_serializar).encode()
+    return base64.urlsafe_b64encode(dados).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, model, ordenacao):
+    """Devolve os valores do cursor já convertidos, ou None se ele for inválido."""
+    campos = _campos(ordenacao)
+    try:
+        dados = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valores = json.loads(dados)
+        if not isinstance(valores, list) or len(valores) != len(campos):
+            return None
+        return [model._meta.get_field(nome).to_python(valor) for (nome, _), valor in zip(campos, valores)]
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        return None
+
+
+def filtro_apos(ordenacao, valores):
+    """Q equivalente a "(a, b, id) > (va, vb, vid)" respeitando a direção de cada coluna."""
+    campos = _campos(ordenacao)
+    condicao = None
+    for (nome, desc), valor in reversed(list(zip(campos, valores))):
+        estrito = Q(**{f"{nome}__{'lt' if desc else 'gt'}": valor})
+        condicao = estrito if condicao is None else estrito | (Q(**{nome: valor}) & condicao)
+
+    # Limite inclusivo na primeira coluna: dá ao banco um ponto de partida no índice
+    nome, desc = campos[0]
+    limite = Q(**{f"{nome}__{'lte' if desc else 'gte'}": valores[0]})
+    return limite & condicao
+
+
+def paginar(request, queryset, ordenacao, parametro='cursor', tamanho=TAMANHO_PAGINA):
+    """
+    Pagina `queryset` pela `ordenacao` (que deve terminar em uma coluna única,
+    normalmente 'id') usando o cursor lido de request.GET[parametro].
+    """
+    queryset, cursor = _filtrar(request, queryset, ordenacao, parametro)
+    return _pagina(request, list(queryset[:tamanho + 1]), ordenacao, parametro, tamanho, cursor)
+
+
+async def apaginar(request, queryset, ordenacao, parametro='cursor', tamanho=TAMANHO_PAGINA):
+    """paginar() para as views assíncronas."""
+    queryset, cursor = _filtrar(request, queryset, ordenacao, parametro)
+    itens = [obj async for obj in queryset[:tamanho + 1]]
+    return _pagina(request, itens, ordenacao, parametro, tamanho, cursor)
+
+
+def _filtrar(request, queryset, ordenacao, parametro):
+    queryset = queryset.order_by(*ordenacao)
+    cursor = request.GET.get(parametro)
+    if cursor:
+        valores = decodificar_cursor(cursor, queryset.model, ordenacao)
+        if valores is None:
+            # Cursor inválido ou adulterado: volta para a primeira página
+            cursor = None
+        else:
+            queryset = queryset.filter(filtro_apos(ordenacao, valores))
+    return queryset, cursor
+
+
+def _pagina(request, itens, ordenacao, parametro, tamanho, cursor):
+    proximo_cursor = url_proxima = None
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        proximo_cursor = codificar_cursor(itens[-1], ordenacao)
+        params = request.GET.copy()
+        params[parametro] = proximo_cursor
+        url_proxima = f"?{params.urlencode()}"
+
+    return Pagina(itens, proximo_cursor, url_proxima, cursor)
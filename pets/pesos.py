@@ -0,0 +1,71 @@
+# ==============================================================================
+# HISTÓRICO DE PESO (SÉRIE PARA O GRÁFICO)
+# ==============================================================================
+# O gráfico da visão geral nunca recebe a série inteira: anos de pesagens
+# diárias viram no máximo `pontos` pontos. Quando há mais registros que isso,
+# o próprio banco agrupa por período (dia, semana, mês, ...) com
+# GROUP BY + MIN/MAX/AVG, escolhendo o menor período que cabe no limite. São
+# duas consultas sobre o índice (pet, registrado_em): um resumo da faixa e a
+# série (bruta ou agregada); o Python só formata as linhas já reduzidas.
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter, TruncWeek, TruncYear
+
+from .models import PesoRegistro
+
+PONTOS_PADRAO = 200
+PONTOS_MAXIMO = 1000
+
+# (nome, função de truncamento, duração aproximada em dias), do menor para o maior
+PERIODOS = (
+    ('dia', TruncDay, 1),
+    ('semana', TruncWeek, 7),
+    ('mes', TruncMonth, 30.44),
+    ('trimestre', TruncQuarter, 91.31),
+    ('ano', TruncYear, 365.25),
+)
+
+
+def _periodo(primeiro, ultimo, pontos):
+    dias = (ultimo - primeiro).total_seconds() / 86400
+    for nome, truncar, duracao in PERIODOS:
+        # +1: a faixa raramente começa no início de um período
+        if dias / duracao + 1 <= pontos:
+            return nome, truncar
+    return PERIODOS[-1][:2]
+
+
+def _ponto(inicio, minimo, maximo, media, quantidade):
+    return {
+        'inicio': inicio,
+        'minimo': round(float(minimo), 2),
+        'maximo': round(float(maximo), 2),
+        'media': round(float(media), 2),
+        'quantidade': quantidade,
+    }
+
+
+def serie(pet, inicio=None, fim=None, pontos=PONTOS_PADRAO):
+    """
+    {'periodo': None | 'dia' | 'semana' | ..., 'pontos': [...]} da faixa
+    [inicio, fim] (datetimes; None = sem limite). Cada ponto traz mínimo,
+    máximo e média do período; sem agregação, um ponto por pesagem.
+    """
+    registros = PesoRegistro.objects.filter(pet=pet)
+    if inicio is not None:
+        registros = registros.filter(registrado_em__gte=inicio)
+    if fim is not None:
+        registros = registros.filter(registrado_em__lte=fim)
+
+    resumo = registros.aggregate(quantidade=Count('pk'), primeiro=Min('registrado_em'), ultimo=Max('registrado_em'))
+    if resumo['quantidade'] <= pontos:
+        linhas = registros.order_by('registrado_em', 'pk').values_list('registrado_em', 'peso')
+        return {'periodo': None, 'pontos': [_ponto(data, peso, peso, peso, 1) for data, peso in linhas]}
+
+    periodo, truncar = _periodo(resumo['primeiro'], resumo['ultimo'], pontos)
+    linhas = (
+        registros.annotate(periodo=truncar('registrado_em')).values('periodo')
+        .annotate(minimo=Min('peso'), maximo=Max('peso'), media=Avg('peso'), quantidade=Count('pk'))
+        .order_by('periodo')
+        .values_list('periodo', 'minimo', 'maximo', 'media', 'quantidade')
+    )
+    return {'periodo': periodo, 'pontos': [_ponto(*linha) for linha in linhas]}
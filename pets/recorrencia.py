@@ -0,0 +1,136 @@
+# ==============================================================================
+# EVENTOS RECORRENTES (EXPANSÃO SOB DEMANDA)
+# ==============================================================================
+# Um evento recorrente é UMA linha de Evento com a regra (recorrencia,
+# intervalo, dias_semana, repetir_ate); `data` é a primeira ocorrência. As
+# ocorrências nunca são gravadas: são calculadas em Python só para a janela de
+# datas que está sendo exibida. Ocorrências concluídas ficam em
+# ExcecaoRecorrencia (evento, data), buscadas de uma vez para a janela.
+import calendar
+from datetime import timedelta
+
+from django.db.models import Prefetch, Q
+
+from .models import Evento, ExcecaoRecorrencia
+
+UM_DIA = timedelta(days=1)
+UMA_SEMANA = timedelta(days=7)
+
+
+def _somar_meses(data, meses, dia):
+    ano, mes = divmod(data.month - 1 + meses, 12)
+    ano, mes = data.year + ano, mes + 1
+    # Dia 31 em mês de 30 dias (ou 29/30/31 em fevereiro) cai no último dia do mês
+    return data.replace(year=ano, month=mes, day=min(dia, calendar.monthrange(ano, mes)[1]))
+
+
+def datas(evento, inicio, fim):
+    """
+    Datas das ocorrências de `evento` em [inicio, fim], em ordem. Pula direto
+    para a primeira ocorrência da janela: o custo depende do tamanho da janela,
+    não de há quanto tempo a série começou.
+    """
+    if evento.repetir_ate and evento.repetir_ate < fim:
+        fim = evento.repetir_ate
+    inicio = max(inicio, evento.data)
+    if not evento.recorrencia:
+        if inicio <= evento.data <= fim:
+            yield evento.data
+        return
+    if inicio > fim:
+        return
+
+    passo = max(evento.intervalo, 1)
+    if evento.recorrencia == 'diaria':
+        atual = evento.data + timedelta(days=-(-(inicio - evento.data).days // passo) * passo)
+        while atual <= fim:
+            yield atual
+            atual += timedelta(days=passo)
+
+    elif evento.recorrencia == 'semanal':
+        dias = evento.dias_semana_lista() or [evento.data.weekday()]
+        primeira_semana = evento.data - timedelta(days=evento.data.weekday())
+        semanas = (inicio - primeira_semana).days // 7
+        semana = primeira_semana + UMA_SEMANA * (semanas // passo * passo)
+        while semana <= fim:
+            for dia in dias:
+                atual = semana + timedelta(days=dia)
+                if inicio <= atual <= fim:
+                    yield atual
+            semana += UMA_SEMANA * passo
+
+    elif evento.recorrencia == 'mensal':
+        meses = (inicio.year - evento.data.year) * 12 + inicio.month - evento.data.month
+        indice = max(meses, 0) // passo * passo
+        while True:
+            atual = _somar_meses(evento.data, indice, evento.data.day)
+            if atual > fim:
+                break
+            if atual >= inicio:
+                yield atual
+            indice += passo
+
+
+class Ocorrencia:
+    """Uma ocorrência calculada de um evento recorrente (não existe no banco)."""
+
+    def __init__(self, evento, data, concluido):
+        self.evento = evento
+        self.data = data
+        self.concluido = concluido
+
+    @property
+    def pk(self):
+        return self.evento.pk
+
+    @property
+    def pet(self):
+        return self.evento.pet
+
+    @property
+    def observacoes(self):
+        return self.evento.observacoes
+
+    def get_tipo_display(self):
+        return self.evento.get_tipo_display()
+
+    def __repr__(self):
+        return f"<Ocorrencia {self.evento.pk} {self.data}>"
+
+
+def series_na_janela(queryset, inicio, fim):
+    """
+    Eventos recorrentes de `queryset` com alguma ocorrência possível em
+    [inicio, fim], já com as conclusões da janela (2 consultas no total).
+    """
+    return (
+        queryset.exclude(recorrencia='')
+        .filter(Q(repetir_ate__isnull=True) | Q(repetir_ate__gte=inicio), data__lte=fim)
+        .prefetch_related(Prefetch(
+            'excecoes', queryset=ExcecaoRecorrencia.objects.filter(data__range=(inicio, fim)), to_attr='excecoes_janela',
+        ))
+    )
+
+
+def expandir(series, inicio, fim):
+    """Ocorrências das séries (de series_na_janela) em [inicio, fim], por data."""
+    ocorrencias = []
+    for evento in series:
+        concluidas = {excecao.data for excecao in getattr(evento, 'excecoes_janela', ())}
+        ocorrencias.extend(Ocorrencia(evento, data, data in concluidas) for data in datas(evento, inicio, fim))
+    ocorrencias.sort(key=lambda ocorrencia: (ocorrencia.data, ocorrencia.evento.pk))
+    return ocorrencias
+
+
+def ocorrencias_do_pet(pet, inicio, fim):
+    return expandir(series_na_janela(Evento.objects.filter(pet=pet), inicio, fim), inicio, fim)
+
+
+async def aocorrencias_do_pet(pet, inicio, fim):
+    """ocorrencias_do_pet() para as views assíncronas (`pet` pode ser o pk)."""
+    series = [evento async for evento in series_na_janela(Evento.objects.filter(pet=pet), inicio, fim)]
+    return expandir(series, inicio, fim)
+
+
+def e_ocorrencia(evento, data):
+    return next(datas(evento, data, data), None) == data
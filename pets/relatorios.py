@@ -0,0 +1,124 @@
+# ==============================================================================
+# RELATÓRIOS DA CLÍNICA (AGREGADOS EM SQL, GUARDADOS COMO SNAPSHOTS)
+# ==============================================================================
+# Cada relatório é UMA consulta com GROUP BY sobre as tabelas de todos os
+# tutores; o banco devolve só as linhas agregadas. `gerar()` roda as consultas
+# (pelo comando `manage.py relatorios`, no cron) e grava o resultado em
+# RelatorioSnapshot; a página de relatórios lê apenas o snapshot mais recente
+# de cada tipo, sem tocar em Evento/Meta/ItemCompra.
+#
+# Eventos recorrentes entram como uma linha (a série), pela data de início.
+import time
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q, Value
+from django.db.models.functions import Lower, Trim, TruncMonth
+from django.utils import timezone
+
+from .models import Evento, ItemCompra, Meta, RelatorioSnapshot
+
+MESES_VACINAS = 12
+LIMITE_TUTORES = 50
+LIMITE_ITENS = 30
+# Snapshots mantidos por tipo (os mais antigos são apagados a cada geração)
+MANTER = 30
+
+
+def vacinas_por_mes(hoje):
+    ano, mes = divmod(hoje.year * 12 + hoje.month - MESES_VACINAS, 12)
+    inicio = date(ano, mes + 1, 1)  # primeiro dia de MESES_VACINAS meses atrás, contando o atual
+    linhas = (
+        Evento.objects.filter(tipo='vacina', data__range=(inicio, hoje))
+        .annotate(mes=TruncMonth('data'))
+        .values('mes', 'pet__especie')
+        .annotate(total=Count('pk'), concluidas=Count('pk', filter=Q(concluido=True)))
+        .order_by('mes', 'pet__especie')
+    )
+    return [
+        {'mes': linha['mes'].strftime('%Y-%m'), 'especie': linha['pet__especie'], 'total': linha['total'], 'concluidas': linha['concluidas']}
+        for linha in linhas
+    ]
+
+
+def atrasados_por_tutor(hoje):
+    linhas = (
+        # Value() mantém a comparação usável pelo índice (concluido, data)
+        Evento.objects.filter(concluido=Value(False), recorrencia='', data__lt=hoje)
+        .values('pet__tutor_id', 'pet__tutor__username')
+        .annotate(total=Count('pk'), pets=Count('pet', distinct=True), mais_antigo=Min('data'))
+        .order_by('-total', 'pet__tutor__username')[:LIMITE_TUTORES]
+    )
+    return [
+        {
+            'tutor_id': linha['pet__tutor_id'], 'tutor': linha['pet__tutor__username'],
+            'total': linha['total'], 'pets': linha['pets'], 'mais_antigo': linha['mais_antigo'],
+        }
+        for linha in linhas
+    ]
+
+
+def metas_por_especie(hoje):
+    linhas = (
+        Meta.objects.values('pet__especie')
+        .annotate(
+            total=Count('pk'),
+            concluidas=Count('pk', filter=Q(progresso=100)),
+            vencidas=Count('pk', filter=Q(progresso__lt=100, data_prazo__lt=hoje)),
+            progresso_medio=Avg('progresso'),
+        )
+        .order_by('-total', 'pet__especie')
+    )
+    return [
+        {
+            'especie': linha['pet__especie'], 'total': linha['total'], 'concluidas': linha['concluidas'],
+            'vencidas': linha['vencidas'], 'taxa_conclusao': round(100 * linha['concluidas'] / linha['total'], 1),
+            'progresso_medio': round(float(linha['progresso_medio']), 1),
+        }
+        for linha in linhas
+    ]
+
+
+def itens_mais_pedidos(hoje):
+    linhas = (
+        # Agrupa "Ração " e "ração" juntos
+        ItemCompra.objects.annotate(item=Lower(Trim('descricao')))
+        .values('item')
+        .annotate(total=Count('pk'), comprados=Count('pk', filter=Q(comprado=True)), pets=Count('pet', distinct=True), ultimo=Max('criado_em'))
+        .order_by('-total', 'item')[:LIMITE_ITENS]
+    )
+    return [
+        {'item': linha['item'], 'total': linha['total'], 'comprados': linha['comprados'], 'pets': linha['pets'], 'ultimo': linha['ultimo']}
+        for linha in linhas
+    ]
+
+
+RELATORIOS = {
+    'vacinas_por_mes': vacinas_por_mes,
+    'atrasados_por_tutor': atrasados_por_tutor,
+    'metas_por_especie': metas_por_especie,
+    'itens_mais_pedidos': itens_mais_pedidos,
+}
+
+
+def gerar(tipos=None, hoje=None, manter=MANTER):
+    """Roda os relatórios `tipos` (todos por padrão) e grava um snapshot de cada; devolve os snapshots."""
+    hoje = hoje or timezone.localdate()
+    snapshots = []
+    for tipo in tipos or RELATORIOS:
+        inicio = time.perf_counter()
+        linhas = RELATORIOS[tipo](hoje)
+        snapshots.append(RelatorioSnapshot(tipo=tipo, linhas=linhas, segundos=time.perf_counter() - inicio))
+
+    with transaction.atomic():
+        RelatorioSnapshot.objects.bulk_create(snapshots)
+        for snapshot in snapshots:
+            antigos = RelatorioSnapshot.objects.filter(tipo=snapshot.tipo).order_by('-gerado_em', '-pk')[manter:]
+            RelatorioSnapshot.objects.filter(pk__in=list(antigos.values_list('pk', flat=True))).delete()
+    return snapshots
+
+
+def mais_recentes():
+    """{tipo: snapshot mais recente}, em uma consulta."""
+    ultimos = RelatorioSnapshot.objects.values('tipo').annotate(ultimo=Max('pk')).values('ultimo')
+    return {snapshot.tipo: snapshot for snapshot in RelatorioSnapshot.objects.filter(pk__in=ultimos)}
@@ -0,0 +1,130 @@
+# ==============================================================================
+# GERADOR DE DADOS PARA BENCHMARK (`manage.py seed_vetlab`)
+# ==============================================================================
+# Cria tutores × pets × eventos/metas/itens/pesagens sintéticos, sempre com
+# bulk_create, em blocos de tutores (cada bloco numa transação), então a
+# memória não cresce com o tamanho total. Tudo sai de um random.Random com
+# semente fixa: a mesma linha de comando gera os mesmos dados, e os números de
+# benchmarks em execuções diferentes são comparáveis.
+#
+# Como bulk_create não dispara signals, PetStats e o histórico de peso são
+# gravados à mão em cada bloco (como na importação, pets/importacao.py). Os
+# tutores são novos, então não há cache deles a invalidar.
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Evento, ItemCompra, Meta, PesoRegistro, Pet, PetStats
+
+TAMANHO_LOTE = 5000
+SENHA = 'vetlab123'
+
+ESPECIES = (('Cão', ('Labrador', 'Vira-lata', 'Poodle', 'Bulldog', None)), ('Gato', ('Siamês', 'Persa', 'SRD', None)), ('Coelho', (None,)))
+NOMES = ('Rex', 'Mia', 'Thor', 'Luna', 'Bidu', 'Nina', 'Bolt', 'Mel', 'Fred', 'Amora', 'Toby', 'Pipoca')
+TIPOS = [tipo for tipo, _ in Evento.TIPOS_EVENTO]
+OBSERVACOES = (
+    '', '', 'Dose anual', 'Reforço da vacina', 'Alergia alimentar, trocar ração', 'Retorno em 15 dias',
+    'Otite no ouvido esquerdo', 'Banho e tosa completos', 'Vermífugo de rotina', 'Exame de sangue em jejum',
+)
+METAS = ('Perder peso', 'Passear todos os dias', 'Escovar os dentes', 'Treinar comandos', 'Trocar a ração')
+ITENS = ('Ração', 'Areia', 'Petisco', 'Shampoo', 'Vermífugo', 'Brinquedo', 'Coleira', 'Antipulgas')
+
+# Janela das datas dos eventos, relativa a hoje
+DIAS_PASSADO = 3 * 365
+DIAS_FUTURO = 90
+
+
+def usuarios(prefixo):
+    return User.objects.filter(username__startswith=f'{prefixo}_')
+
+
+def semear(tutores, pets_por_tutor, eventos_por_pet, metas_por_pet=0, itens_por_pet=0, pesagens_por_pet=0,
+           prefixo='bench', semente=42, tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """Gera os dados; devolve {tabela: linhas criadas}. `progresso(criados)` é chamado após cada bloco."""
+    aleatorio = random.Random(semente)
+    hoje = timezone.localdate()
+    agora = timezone.now()
+    senha = make_password(SENHA)  # um hash só: PBKDF2 por usuário dominaria o tempo
+    criados = dict.fromkeys(('tutores', 'pets', 'eventos', 'metas', 'itens', 'pesagens'), 0)
+
+    # Bloco de tutores cujos pets cabem num lote
+    por_bloco = max(1, tamanho_lote // max(pets_por_tutor, 1))
+    for inicio in range(0, tutores, por_bloco):
+        with transaction.atomic():
+            novos = User.objects.bulk_create(
+                [User(username=f'{prefixo}_{i:06d}', email=f'{prefixo}_{i:06d}@vetlab.local', password=senha)
+                 for i in range(inicio, min(inicio + por_bloco, tutores))],
+                batch_size=tamanho_lote,
+            )
+            if novos[0].pk is None:
+                # Banco sem RETURNING no bulk_create: busca os ids
+                novos = list(usuarios(prefixo).filter(username__in=[u.username for u in novos]))
+
+            pets = []
+            for tutor in novos:
+                for _ in range(pets_por_tutor):
+                    especie, racas = aleatorio.choice(ESPECIES)
+                    pets.append(Pet(
+                        tutor_id=tutor.pk, nome=aleatorio.choice(NOMES), especie=especie, raca=aleatorio.choice(racas),
+                        data_nascimento=hoje - timedelta(days=aleatorio.randint(60, 15 * 365)),
+                        peso=round(aleatorio.uniform(2, 40), 2),
+                    ))
+            pets = Pet.objects.bulk_create(pets, batch_size=tamanho_lote)
+            if pets and pets[0].pk is None:
+                pets = list(Pet.objects.filter(tutor_id__in=[u.pk for u in novos]))
+
+            criados['eventos'] += _em_lotes(Evento, (_evento(aleatorio, pet, hoje) for pet in pets for _ in range(eventos_por_pet)), tamanho_lote)
+            criados['metas'] += _em_lotes(Meta, (
+                Meta(pet_id=pet.pk, descricao=aleatorio.choice(METAS), data_prazo=hoje + timedelta(days=aleatorio.randint(-180, 365)),
+                     progresso=aleatorio.choice((0, 25, 50, 75, 100)))
+                for pet in pets for _ in range(metas_por_pet)
+            ), tamanho_lote)
+            criados['itens'] += _em_lotes(ItemCompra, (
+                ItemCompra(pet_id=pet.pk, descricao=aleatorio.choice(ITENS), comprado=aleatorio.random() < 0.5)
+                for pet in pets for _ in range(itens_por_pet)
+            ), tamanho_lote)
+            # Hoje o peso atual (como o signal faria) e, para trás, uma pesagem por dia em torno dele
+            criados['pesagens'] += _em_lotes(PesoRegistro, (
+                PesoRegistro(
+                    pet_id=pet.pk, registrado_em=agora - timedelta(days=dia),
+                    peso=pet.peso if dia == 0 else round(float(pet.peso) * aleatorio.uniform(0.9, 1.1), 2),
+                )
+                for pet in pets for dia in range(max(pesagens_por_pet, 1))
+            ), tamanho_lote)
+
+            PetStats.recalcular([pet.pk for pet in pets])
+        criados['tutores'] += len(novos)
+        criados['pets'] += len(pets)
+        if progresso:
+            progresso(criados)
+    return criados
+
+
+def _evento(aleatorio, pet, hoje):
+    data = hoje + timedelta(days=aleatorio.randint(-DIAS_PASSADO, DIAS_FUTURO))
+    evento = Evento(
+        pet_id=pet.pk, tipo=aleatorio.choice(TIPOS), data=data, observacoes=aleatorio.choice(OBSERVACOES),
+        concluido=data < hoje and aleatorio.random() < 0.85,
+    )
+    if aleatorio.random() < 0.01:
+        evento.recorrencia, evento.intervalo, evento.concluido = 'semanal', aleatorio.choice((1, 2, 4)), False
+    return evento
+
+
+def _em_lotes(model, objetos, tamanho_lote):
+    total = 0
+    lote = []
+    for obj in objetos:
+        lote.append(obj)
+        if len(lote) >= tamanho_lote:
+            model.objects.bulk_create(lote, batch_size=tamanho_lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        model.objects.bulk_create(lote, batch_size=tamanho_lote)
+        total += len(lote)
+    return total
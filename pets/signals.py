@@ -0,0 +1,154 @@
+# ==============================================================================
+# SIGNALS: CONTADORES DO PetStats E INVALIDAÇÃO DO CACHE
+# ==============================================================================
+# Cada Evento/Meta/ItemCompra "contribui" com alguns contadores do seu pet.
+# Guardamos a contribuição original ao carregar a instância (post_init) e, ao
+# salvar ou apagar, aplicamos só a diferença com um UPDATE ... SET x = x + n.
+# Na mesma passada, as gerações de cache do tutor e do(s) pet(s) são incrementadas.
+# Mudanças em Pet.peso viram uma linha de PesoRegistro (histórico de peso).
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .cache import invalidar
+from .models import Evento, ItemCompra, Meta, PesoRegistro, Pet, PetStats
+
+
+def _contribuicao(instance):
+    if isinstance(instance, Evento):
+        return {'total_eventos': 1, 'eventos_pendentes': int(not instance.concluido)}
+    if isinstance(instance, Meta):
+        concluida = int(instance.progresso) == 100
+        return {'metas_concluidas': int(concluida), 'metas_em_andamento': int(not concluida)}
+    return {'itens_pendentes': int(not instance.comprado)}
+
+
+CAMPOS_CONTRIBUICAO = {'pet_id', 'concluido', 'progresso', 'comprado'}
+DESCONHECIDO = object()
+
+
+def _guardar_estado(instance):
+    if not instance.pk:
+        instance._stats_original = None
+    elif CAMPOS_CONTRIBUICAO & instance.get_deferred_fields():
+        # Carregado com .only()/.defer(): ler o campo aqui custaria uma consulta por instância
+        instance._stats_original = DESCONHECIDO
+    else:
+        instance._stats_original = (instance.pet_id, _contribuicao(instance))
+
+
+def _subtrair(a, b):
+    return {campo: a.get(campo, 0) - b.get(campo, 0) for campo in a.keys() | b.keys()}
+
+
+def _apagando_pet(origin):
+    return isinstance(origin, Pet) or (isinstance(origin, QuerySet) and origin.model is Pet)
+
+
+def _invalidar_cache(instance, pet_ids):
+    tutores = {}
+    if type(instance).pet.is_cached(instance):
+        tutores[instance.pet_id] = instance.pet.tutor_id
+    faltando = set(pet_ids) - tutores.keys()
+    if faltando:
+        tutores.update(Pet.objects.filter(pk__in=faltando).values_list('pk', 'tutor_id'))
+
+    def executar():
+        for pet_id in set(pet_ids):
+            invalidar(tutor_id=tutores.get(pet_id), pet_id=pet_id)
+
+    # Agora, e de novo após o commit: uma leitura concorrente feita antes do
+    # commit poderia cachear o estado antigo sob a geração recém-incrementada.
+    executar()
+    transaction.on_commit(executar)
+
+
+@receiver(post_init, sender=Evento)
+@receiver(post_init, sender=Meta)
+@receiver(post_init, sender=ItemCompra)
+def registrar_contribuicao(sender, instance, **kwargs):
+    _guardar_estado(instance)
+
+
+@receiver(post_save, sender=Evento)
+@receiver(post_save, sender=Meta)
+@receiver(post_save, sender=ItemCompra)
+def atualizar_stats_ao_salvar(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    nova = _contribuicao(instance)
+    original = None if created else getattr(instance, '_stats_original', None)
+    pets_afetados = [instance.pet_id]
+    if isinstance(original, tuple):
+        pets_afetados.append(original[0])
+
+    if original is DESCONHECIDO:
+        PetStats.recalcular([instance.pet_id])
+    elif original is None:
+        PetStats.aplicar_delta(instance.pet_id, nova)
+    else:
+        pet_id_original, contribuicao_original = original
+        if pet_id_original == instance.pet_id:
+            PetStats.aplicar_delta(instance.pet_id, _subtrair(nova, contribuicao_original))
+        else:
+            PetStats.aplicar_delta(pet_id_original, _subtrair({}, contribuicao_original))
+            PetStats.aplicar_delta(instance.pet_id, nova)
+    _guardar_estado(instance)
+    _invalidar_cache(instance, pets_afetados)
+
+
+@receiver(post_delete, sender=Evento)
+@receiver(post_delete, sender=Meta)
+@receiver(post_delete, sender=ItemCompra)
+def atualizar_stats_ao_apagar(sender, instance, origin=None, **kwargs):
+    # Apagando o próprio pet: a linha de stats vai junto no CASCADE e o
+    # post_delete do Pet invalida o cache uma vez só
+    if _apagando_pet(origin):
+        return
+    original = getattr(instance, '_stats_original', None)
+    if original is DESCONHECIDO:
+        PetStats.recalcular([instance.pet_id])
+    else:
+        pet_id, contribuicao = original or (instance.pet_id, _contribuicao(instance))
+        PetStats.aplicar_delta(pet_id, _subtrair({}, contribuicao))
+    _invalidar_cache(instance, [instance.pet_id])
+
+
+# --- Histórico de peso ---
+
+@receiver(post_init, sender=Pet)
+def guardar_peso_original(sender, instance, **kwargs):
+    instance._peso_original = DESCONHECIDO if 'peso' in instance.get_deferred_fields() else instance.peso
+
+
+@receiver(post_save, sender=Pet)
+def registrar_peso(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'peso' not in update_fields):
+        return
+    original = None if created else instance._peso_original
+    # Com o peso adiado (.only/.defer) só sabemos que ele foi gravado, não se mudou
+    if original is DESCONHECIDO or original is None or Decimal(original) != Decimal(instance.peso):
+        PesoRegistro.objects.create(pet=instance, peso=instance.peso)
+    instance._peso_original = instance.peso
+
+
+@receiver(post_save, sender=Pet)
+def criar_stats_do_pet(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        PetStats.objects.create(pet=instance)
+
+
+@receiver(post_save, sender=Pet)
+@receiver(post_delete, sender=Pet)
+def invalidar_cache_do_pet(sender, instance, **kwargs):
+    # Copia os ids: depois do delete o Django zera instance.pk
+    tutor_id, pet_id = instance.tutor_id, instance.pk
+
+    def executar():
+        invalidar(tutor_id=tutor_id, pet_id=pet_id)
+
+    executar()
+    transaction.on_commit(executar)
@@ -0,0 +1,46 @@
+// Gráfico do histórico de peso da visão geral. A série vem pronta da API
+// (/api/v1/pets/<id>/pesos/), já reduzida pelo servidor: aqui só desenhamos
+// a faixa mínimo–máximo de cada período e a linha da média.
+(function () {
+    const svg = document.getElementById('grafico-peso');
+    const legenda = document.getElementById('grafico-peso-legenda');
+    if (!svg) return;
+
+    const LARGURA = 600, ALTURA = 200, MARGEM = 10;
+    const NOMES_PERIODO = {dia: 'dia', semana: 'semana', mes: 'mês', trimestre: 'trimestre', ano: 'ano'};
+
+    function elemento(nome, atributos) {
+        const el = document.createElementNS('http://www.w3.org/2000/svg', nome);
+        Object.entries(atributos).forEach(([chave, valor]) => el.setAttribute(chave, valor));
+        return el;
+    }
+
+    fetch(svg.dataset.url, {credentials: 'same-origin'})
+        .then((resposta) => resposta.json())
+        .then((dados) => {
+            const pontos = dados.pontos || [];
+            if (pontos.length === 0) {
+                legenda.textContent = 'Nenhuma pesagem registrada.';
+                return;
+            }
+            const tempos = pontos.map((p) => Date.parse(p.inicio));
+            const t0 = tempos[0], t1 = tempos[tempos.length - 1];
+            const minimo = Math.min(...pontos.map((p) => p.minimo));
+            const maximo = Math.max(...pontos.map((p) => p.maximo));
+            const folga = (maximo - minimo) * 0.1 || 1;
+
+            const x = (t) => MARGEM + (t1 === t0 ? 0.5 : (t - t0) / (t1 - t0)) * (LARGURA - 2 * MARGEM);
+            const y = (peso) => ALTURA - MARGEM - (peso - minimo + folga) / (maximo - minimo + 2 * folga) * (ALTURA - 2 * MARGEM);
+
+            const topo = pontos.map((p, i) => `${x(tempos[i])},${y(p.maximo)}`);
+            const base = pontos.map((p, i) => `${x(tempos[i])},${y(p.minimo)}`).reverse();
+            svg.appendChild(elemento('polygon', {class: 'faixa', points: topo.concat(base).join(' ')}));
+            svg.appendChild(elemento('polyline', {class: 'media', points: pontos.map((p, i) => `${x(tempos[i])},${y(p.media)}`).join(' ')}));
+
+            const data = (t) => new Date(t).toLocaleDateString('pt-BR');
+            let texto = `${data(t0)} a ${data(t1)} · mín. ${minimo} kg · máx. ${maximo} kg`;
+            if (dados.periodo) texto += ` · média por ${NOMES_PERIODO[dados.periodo]}`;
+            legenda.textContent = texto;
+        })
+        .catch(() => { legenda.textContent = 'Não foi possível carregar o histórico de peso.'; });
+})();
@@ -0,0 +1,219 @@
+# ==============================================================================
+# TAREFAS EM SEGUNDO PLANO (FILA NO BANCO + `manage.py vetlab_worker`)
+# ==============================================================================
+# Exportações, lembretes, relatórios e importações não cabem no ciclo de uma
+# requisição: a view só chama enfileirar(), que grava uma linha em Tarefa, e
+# responde na hora. O worker (pets/management/commands/vetlab_worker.py)
+# reivindica as pendentes e roda cada uma em um pool de threads.
+#
+# - Reivindicação: no PostgreSQL, SELECT ... FOR UPDATE SKIP LOCKED — vários
+#   workers dividem a fila sem esperar um pelo outro. No SQLite (sem lock de
+#   linha), um UPDATE condicional único: as escritas são serializadas pelo
+#   banco, então cada tarefa só pode ser marcada por um worker.
+# - Falhas: a tarefa volta para "pendente" com espera exponencial (com
+#   variação aleatória) até `maximo_tentativas`; FalhaDefinitiva encerra na hora
+#   (erro nos dados, repetir não adianta).
+# - Batimento: enquanto roda a tarefa, o worker renova `atualizado_em` a cada
+#   BATIMENTO. Worker que morre no meio deixa a tarefa em "executando" sem
+#   batimento: depois de TEMPO_SEM_BATIMENTO ela volta para a fila (entrega
+#   "pelo menos uma vez", por isso cada executor é idempotente). Tarefa longa
+#   de worker vivo nunca é devolvida, por mais que demore.
+# - Os arquivos das exportações ficam VALIDADE_ARQUIVOS na pasta e depois são
+#   apagados pelo worker (limpar_arquivos).
+import os
+import random
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import exportacao, importacao, lembretes, relatorios
+from .models import Tarefa
+
+MAXIMO_TENTATIVAS = 5
+ESPERA_BASE = timedelta(seconds=30)
+ESPERA_MAXIMA = timedelta(hours=1)
+BATIMENTO = timedelta(seconds=30)
+TEMPO_SEM_BATIMENTO = timedelta(minutes=5)
+VALIDADE_ARQUIVOS = timedelta(days=7)
+
+# tipo -> função(tarefa, **argumentos) que devolve o resultado (JSON)
+EXECUTORES = {}
+
+
+class FalhaDefinitiva(Exception):
+    """Erro que não se resolve tentando de novo: a tarefa falha sem novas tentativas."""
+
+
+def executor(tipo):
+    def registrar(funcao):
+        EXECUTORES[tipo] = funcao
+        return funcao
+    return registrar
+
+
+def nome_do_trabalhador():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enfileirar(tipo, tutor=None, maximo_tentativas=MAXIMO_TENTATIVAS, **argumentos):
+    """Grava a tarefa na fila e devolve-a; o worker a executa depois do commit."""
+    if tipo not in EXECUTORES:
+        raise ValueError(f"Tipo de tarefa desconhecido: {tipo}")
+    return Tarefa.objects.create(tipo=tipo, tutor=tutor, argumentos=argumentos, maximo_tentativas=maximo_tentativas)
+
+
+def espera(tentativas):
+    """Atraso antes da próxima tentativa: dobra a cada falha, com até +50% de variação."""
+    segundos = min(ESPERA_BASE.total_seconds() * 2 ** (tentativas - 1), ESPERA_MAXIMA.total_seconds())
+    # A variação evita que tarefas que falharam juntas voltem todas no mesmo instante
+    return timedelta(seconds=segundos * random.uniform(1, 1.5))
+
+
+def reivindicar(trabalhador, limite, tipos=None):
+    """Marca até `limite` tarefas liberadas como "executando" por `trabalhador` e devolve-as."""
+    agora = timezone.now()
+    pendentes = Tarefa.objects.filter(situacao='pendente', executar_em__lte=agora).order_by('executar_em', 'id')
+    if tipos:
+        pendentes = pendentes.filter(tipo__in=tipos)
+    marcar = {'situacao': 'executando', 'trabalhador': trabalhador, 'iniciada_em': agora, 'atualizado_em': agora, 'tentativas': F('tentativas') + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(pendentes.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limite])
+            Tarefa.objects.filter(pk__in=ids).update(**marcar)
+    else:
+        # Um único UPDATE ... WHERE id IN (SELECT ...): o que outro worker marcou antes já não está pendente
+        Tarefa.objects.filter(pk__in=pendentes.values('pk')[:limite], situacao='pendente').update(**marcar)
+    return list(Tarefa.objects.filter(situacao='executando', trabalhador=trabalhador, iniciada_em=agora).order_by('executar_em', 'id'))
+
+
+def executar(tarefa):
+    """Roda a tarefa reivindicada e grava o desfecho; devolve a situação final."""
+    try:
+        resultado = EXECUTORES[tarefa.tipo](tarefa, **tarefa.argumentos)
+    except Exception as erro:
+        definitiva = isinstance(erro, FalhaDefinitiva) or tarefa.tipo not in EXECUTORES
+        tarefa.erro = f"{type(erro).__name__}: {erro}"[:2000]
+        if definitiva or tarefa.tentativas >= tarefa.maximo_tentativas:
+            tarefa.situacao, tarefa.concluida_em = 'falhou', timezone.now()
+        else:
+            tarefa.situacao, tarefa.executar_em = 'pendente', timezone.now() + espera(tarefa.tentativas)
+    else:
+        tarefa.situacao, tarefa.resultado, tarefa.erro, tarefa.concluida_em = 'concluida', resultado, '', timezone.now()
+
+    # Condicional: se a tarefa foi dada como abandonada e devolvida à fila, não sobrescreve
+    Tarefa.objects.filter(pk=tarefa.pk, situacao='executando', trabalhador=tarefa.trabalhador).update(
+        situacao=tarefa.situacao, resultado=tarefa.resultado, erro=tarefa.erro,
+        executar_em=tarefa.executar_em, concluida_em=tarefa.concluida_em,
+    )
+    return tarefa.situacao
+
+
+def executar_na_thread(tarefa):
+    """executar() para o pool do worker: cada thread tem sua conexão, fechada/reciclada ao fim."""
+    try:
+        return executar(tarefa)
+    finally:
+        close_old_connections()
+
+
+def bater(trabalhador, ids):
+    """Renova o batimento das tarefas que `trabalhador` ainda está executando."""
+    if not ids:
+        return 0
+    return Tarefa.objects.filter(pk__in=ids, situacao='executando', trabalhador=trabalhador).update(atualizado_em=timezone.now())
+
+
+def recuperar_abandonadas(tempo_sem_batimento=TEMPO_SEM_BATIMENTO, em_andamento=()):
+    """
+    Devolve à fila (ou dá como falhas) as tarefas "executando" sem batimento há
+    mais de `tempo_sem_batimento`. As de `em_andamento` (rodando neste worker)
+    nunca são devolvidas.
+    """
+    agora = timezone.now()
+    presas = Tarefa.objects.filter(situacao='executando', atualizado_em__lt=agora - tempo_sem_batimento).exclude(pk__in=em_andamento)
+    falhas = presas.filter(tentativas__gte=F('maximo_tentativas')).update(
+        situacao='falhou', concluida_em=agora, erro="Worker parou de responder.",
+    )
+    devolvidas = presas.update(situacao='pendente', executar_em=agora, erro="Worker interrompido; tarefa devolvida à fila.")
+    return devolvidas + falhas
+
+
+# --- Executores ---
+
+def caminho_do_arquivo(nome):
+    return os.path.join(settings.VETLAB_ARQUIVOS_TAREFAS, nome)
+
+
+def arquivo_expira_em(tarefa):
+    return tarefa.concluida_em + VALIDADE_ARQUIVOS
+
+
+def limpar_arquivos(validade=VALIDADE_ARQUIVOS):
+    """Apaga da pasta das tarefas os arquivos com mais de `validade`; devolve quantos."""
+    limite = (timezone.now() - validade).timestamp()
+    apagados = 0
+    try:
+        entradas = list(os.scandir(settings.VETLAB_ARQUIVOS_TAREFAS))
+    except FileNotFoundError:
+        return 0
+    for entrada in entradas:
+        if entrada.is_file() and entrada.stat().st_mtime < limite:
+            try:
+                os.remove(entrada.path)
+            except FileNotFoundError:  # outro worker apagou antes
+                continue
+            apagados += 1
+    return apagados
+
+
+@executor('exportacao')
+def _exportacao(tarefa, formato='csv', desde=None):
+    """Mesmo conteúdo de exportar_view, gravado em arquivo para o tutor baixar depois."""
+    if formato not in exportacao.FORMATOS:
+        raise FalhaDefinitiva(f"Formato desconhecido: {formato}")
+    desde = exportacao.interpretar_desde(desde) if desde else None
+    os.makedirs(settings.VETLAB_ARQUIVOS_TAREFAS, exist_ok=True)
+    nome = f'exportacao-{tarefa.pk}.{formato}'
+    temporario = caminho_do_arquivo(f'{nome}.parcial')
+    with open(temporario, 'w', encoding='utf-8', newline='') as arquivo:
+        for bloco in exportacao.em_blocos(exportacao.linhas(formato, tutores=[tarefa.tutor_id], desde=desde)):
+            arquivo.write(bloco)
+    # Só aparece completo: uma nova tentativa sobrescreve o parcial
+    os.replace(temporario, caminho_do_arquivo(nome))
+    return {'arquivo': nome, 'bytes': os.path.getsize(caminho_do_arquivo(nome))}
+
+
+@executor('lembretes')
+def _lembretes(tarefa, antecedencia=lembretes.ANTECEDENCIA_DIAS, lote=lembretes.TAMANHO_LOTE):
+    examinados = lembretes.varrer(antecedencia=antecedencia)
+    envio = {'enviado': 0, 'cancelado': 0, 'falhou': 0, 'adiado': 0}
+    while True:
+        rodada = lembretes.enviar_pendentes(limite=lote)
+        for situacao, quantidade in rodada.items():
+            envio[situacao] += quantidade
+        if rodada['enviado'] + rodada['cancelado'] + rodada['falhou'] < lote:
+            break
+    return {'examinados': examinados, **envio}
+
+
+@executor('relatorios')
+def _relatorios(tarefa, tipos=None, manter=relatorios.MANTER):
+    return {snapshot.tipo: len(snapshot.linhas) for snapshot in relatorios.gerar(tipos, manter=manter)}
+
+
+@executor('importacao')
+def _importacao(tarefa, caminho, formato, lote=importacao.TAMANHO_LOTE, chave=None):
+    # O progresso salvo com cada lote faz a nova tentativa continuar do último lote confirmado
+    chave = chave or caminho
+    try:
+        importador, segundos = importacao.importar_arquivo(
+            caminho, formato, tamanho_lote=lote, estado=importacao.carregar_estado(chave), chave=chave,
+        )
+    except (importacao.ErroImportacao, FileNotFoundError) as erro:
+        raise FalhaDefinitiva(str(erro))
+    return {'gravados': importador.gravados, 'segundos': round(segundos, 2)}
@@ -1,21 +1,55 @@
+import csv
+import json
 import os
+import subprocess
+import sys
+import tempfile
 import time
-from datetime import date
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.conf import settings
 from django.contrib.staticfiles.testing import StaticLiveServerTestCase
 from django.contrib.auth.models import User
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException
+from django.contrib.messages import get_messages
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Value
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+
+# Selenium é opcional: os testes E2E (navegador) só rodam com VETLAB_E2E=1.
+# O resto da suíte usa o Client de testes e roda com `manage.py test --parallel`.
+try:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait, Select
+    from selenium.webdriver.support import expected_conditions as EC
+    from webdriver_manager.chrome import ChromeDriverManager
+    from selenium.common.exceptions import TimeoutException
+    SELENIUM_DISPONIVEL = True
+except ImportError:
+    SELENIUM_DISPONIVEL = False
+RODAR_E2E = SELENIUM_DISPONIVEL and os.environ.get('VETLAB_E2E') == '1'
 
 # Modelos
-from pets.models import Pet, Evento, Meta, ItemCompra
+from pets import benchmark, busca, checks, exportacao, importacao, instrumentacao, lembretes, pesos, recorrencia, relatorios, semente, tarefas, views
+from pets.models import Pet, Evento, Meta, ItemCompra, PetStats, Lembrete, VarreduraLembretes, ExcecaoRecorrencia, PesoRegistro, RelatorioSnapshot, Tarefa
 
 
+@tag('e2e')
+@skipUnless(RODAR_E2E, "Testes E2E desligados (defina VETLAB_E2E=1 com selenium e webdriver-manager instalados).")
 class BaseE2ETestCase(StaticLiveServerTestCase):
 
     @classmethod
@@ -38,8 +72,6 @@ class BaseE2ETestCase(StaticLiveServerTestCase):
     @classmethod
     def tearDownClass(cls):
         print("\nTestes concluídos. Fechando o navegador.")
-        if not (os.environ.get('CI') == 'true' or os.environ.get('GITHUB_ACTIONS') == 'true'):
-            time.sleep(3)
         cls.driver.quit()
         super().tearDownClass()
 
@@ -56,7 +88,6 @@ class BaseE2ETestCase(StaticLiveServerTestCase):
 
         self.wait.until(EC.text_to_be_present_in_element((By.TAG_NAME, 'h1'), "LISTA DE PETS"))
         print(f"\nUsuário '{self.username}' logado para o teste.")
-        time.sleep(0.4)
 
     # --- Helpers ---
     def set_date_by_js(self, element, yyyy_mm_dd):
@@ -435,4 +466,1945 @@ class TesteHistoriaVisaoGeral(BaseE2ETestCase):
             time.sleep(0.6)
         
         except TimeoutException as e:
-            self.debug_and_reraise(e)
\ No newline at end of file
+            self.debug_and_reraise(e)
+
+
+# ===============================================
+# VIEWS PELO CLIENT DE TESTES (SEM NAVEGADOR)
+# ===============================================
+# Mesmas histórias dos testes E2E acima (validação, posse, redirecionamentos e
+# mensagens), em processo: rodam em segundos e em paralelo. Os orçamentos de
+# consultas incluem sessão + usuário (2) do login.
+
+def _mensagens(resposta):
+    """Mensagens da requisição; consumidas, como o navegador faria ao seguir o redirecionamento."""
+    mensagens = [(m.level_tag, m.message) for m in get_messages(resposta.wsgi_request)]
+    resposta.client.cookies.pop('messages', None)
+    return mensagens
+
+
+class TesteViewsAutenticacao(TestCase):
+
+    def test_cadastro_loga_e_redireciona(self):
+        resposta = self.client.post('/pets/cadastro/', {'username': 'novo_tutor', 'password': 'segredo123', 'password2': 'segredo123'})
+        self.assertRedirects(resposta, '/pets/', fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('success', 'Cadastro realizado com sucesso! Você já está logado.')])
+        self.assertEqual(self.client.get('/pets/').status_code, 200)
+
+    def test_cadastro_com_senhas_diferentes_ou_usuario_repetido(self):
+        resposta = self.client.post('/pets/cadastro/', {'username': 'novo_tutor', 'password': 'a', 'password2': 'b'})
+        self.assertRedirects(resposta, '/pets/cadastro/', fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('error', 'As senhas não coincidem!')])
+
+        User.objects.create_user(username='ja_existe', password='testpass123')
+        resposta = self.client.post('/pets/cadastro/', {'username': 'ja_existe', 'password': 'x', 'password2': 'x'})
+        self.assertEqual(_mensagens(resposta), [('error', 'Este nome de usuário já existe.')])
+        self.assertEqual(User.objects.filter(username='ja_existe').count(), 1)
+
+    def test_login_logout(self):
+        User.objects.create_user(username='tutor_login', password='testpass123')
+        resposta = self.client.post('/pets/login/', {'username': 'tutor_login', 'password': 'errada'})
+        self.assertRedirects(resposta, '/pets/login/', fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('error', 'Usuário ou senha inválidos.')])
+
+        resposta = self.client.post('/pets/login/', {'username': 'tutor_login', 'password': 'testpass123'})
+        self.assertRedirects(resposta, '/pets/', fetch_redirect_response=False)
+        self.assertRedirects(self.client.get('/pets/logout/'), '/pets/home/', fetch_redirect_response=False)
+        self.assertRedirects(self.client.get('/pets/'), '/pets/login/?next=/pets/', fetch_redirect_response=False)
+
+    def test_paginas_protegidas_exigem_login(self):
+        for url in ['/pets/', '/pets/new/', '/pets/1/visao-geral/', '/pets/1/eventos/', '/pets/agenda/', '/pets/busca/']:
+            self.assertRedirects(self.client.get(url), f'/pets/login/?next={url}', fetch_redirect_response=False)
+
+
+class TesteViewsPets(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_views_pets', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="PetGerencia", especie="Coelho", data_nascimento=date(2023, 5, 1), peso=1.8)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def dados(self, **campos):
+        return {'nome': 'Bolinha', 'especie': 'Gato', 'raca': '', 'data_nascimento': '2021-08-01', 'peso': '5.1', **campos}
+
+    def test_cadastro_bem_sucedido(self):
+        with self.assertNumQueries(7):
+            resposta = self.client.post('/pets/new/', self.dados())
+        self.assertRedirects(resposta, '/pets/', fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('success', "Pet 'Bolinha' adicionado com sucesso!")])
+        pet = Pet.objects.get(nome='Bolinha')
+        self.assertEqual((pet.tutor, pet.raca, pet.peso), (self.user, None, Decimal('5.10')))  # raca '' vira None
+        self.assertTrue(PetStats.objects.filter(pet=pet).exists())
+        self.assertContains(self.client.get('/pets/'), 'Bolinha')
+
+    def test_cadastro_invalido_mantem_formulario(self):
+        casos = [
+            (self.dados(nome=''), "Os campos Nome, Espécie, Data de Nascimento e Peso são obrigatórios."),
+            (self.dados(peso='-1'), "O peso deve ser um valor positivo."),
+            (self.dados(peso='abc'), "O valor do peso é inválido."),
+        ]
+        for dados, erro in casos:
+            with self.subTest(erro=erro):
+                with self.assertNumQueries(2):
+                    resposta = self.client.post('/pets/new/', dados)
+                self.assertEqual(resposta.status_code, 200)
+                self.assertContains(resposta, 'CADASTRO DO PET')
+                self.assertEqual(_mensagens(resposta), [('error', erro)])
+        self.assertContains(resposta, 'value="Bolinha"')  # o que foi digitado volta no formulário
+        self.assertFalse(Pet.objects.filter(nome='Bolinha').exists())
+
+    def test_edicao(self):
+        self.assertContains(self.client.get(f'/pets/{self.pet.pk}/edit/'), 'value="PetGerencia"')
+        with self.assertNumQueries(7):
+            resposta = self.client.post(f'/pets/{self.pet.pk}/edit/', self.dados(nome='PetEditado', peso='2'))
+        self.assertRedirects(resposta, '/pets/', fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('success', "Dados de 'PetEditado' atualizados com sucesso!")])
+        self.pet.refresh_from_db()
+        self.assertEqual((self.pet.nome, self.pet.peso), ('PetEditado', Decimal('2.00')))
+
+        resposta = self.client.post(f'/pets/{self.pet.pk}/edit/', self.dados(peso='0'))
+        self.assertEqual(_mensagens(resposta), [('error', "O peso deve ser um valor positivo.")])
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.nome, 'PetEditado')
+
+    def test_exclusao_pede_confirmacao(self):
+        self.assertContains(self.client.get(f'/pets/{self.pet.pk}/delete/'), 'TEM CERTEZA?')
+        self.assertTrue(Pet.objects.filter(pk=self.pet.pk).exists())
+        with self.assertNumQueries(9):
+            resposta = self.client.post(f'/pets/{self.pet.pk}/delete/')
+        self.assertRedirects(resposta, '/pets/', fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('success', "Pet 'PetGerencia' removido com sucesso.")])
+        self.assertFalse(Pet.objects.filter(pk=self.pet.pk).exists())
+
+    def test_visao_geral(self):
+        Evento.objects.create(pet=self.pet, tipo='consulta', data=date(2024, 10, 10), observacoes='Checkup')
+        Meta.objects.create(pet=self.pet, descricao='Comprar novo filtro', data_prazo=date(2025, 12, 31), progresso=50)
+        Meta.objects.create(pet=self.pet, descricao='Limpar o casco', data_prazo=date(2024, 1, 1), progresso=100)
+        resposta = self.client.get(f'/pets/{self.pet.pk}/visao-geral/')
+        self.assertContains(resposta, 'Visão Geral: PetGerencia')
+        self.assertContains(resposta, '1.80 kg')
+        self.assertEqual(resposta.context['pet'].stats.metas_concluidas, 1)
+        self.assertContains(resposta, 'Checkup')
+        self.assertContains(resposta, 'Comprar novo filtro')
+
+
+class TesteViewsEventos(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_views_eventos', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="PetEventos", especie="Papagaio", data_nascimento=date(2024, 1, 1), peso=0.8)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_adicionar(self):
+        with self.assertNumQueries(7):
+            resposta = self.client.post(f'/pets/{self.pet.pk}/eventos/adicionar/', {'tipo': 'consulta', 'data': '2025-11-20', 'observacoes': ''})
+        self.assertRedirects(resposta, f'/pets/{self.pet.pk}/eventos/', fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('success', 'Evento adicionado!')])
+        evento = Evento.objects.get(pet=self.pet)
+        self.assertIsNone(evento.observacoes)  # '' vira None
+
+    def test_adicionar_sem_campos_obrigatorios(self):
+        with self.assertNumQueries(3):
+            resposta = self.client.post(f'/pets/{self.pet.pk}/eventos/adicionar/', {'tipo': 'consulta', 'observacoes': 'Sem data'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(_mensagens(resposta), [('error', 'Os campos Tipo de Evento e Data são obrigatórios.')])
+        self.assertContains(resposta, 'Sem data')
+        self.assertFalse(Evento.objects.exists())
+
+    def test_editar_e_excluir(self):
+        evento = Evento.objects.create(pet=self.pet, tipo='consulta', data=date(2025, 1, 1), observacoes='Antes')
+        resposta = self.client.post(f'/pets/eventos/{evento.pk}/editar/', {'tipo': 'vacina', 'data': '2025-02-01', 'observacoes': 'Depois'})
+        self.assertRedirects(resposta, f'/pets/{self.pet.pk}/eventos/', fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('success', 'Evento atualizado com sucesso!')])
+        evento.refresh_from_db()
+        self.assertEqual((evento.tipo, evento.data, evento.observacoes), ('vacina', date(2025, 2, 1), 'Depois'))
+
+        self.assertEqual(self.client.get(f'/pets/eventos/{evento.pk}/excluir/').status_code, 200)
+        self.assertTrue(Evento.objects.filter(pk=evento.pk).exists())
+        with self.assertNumQueries(11):  # inclui a releitura travada (SELECT ... FOR UPDATE) antes do DELETE
+            resposta = self.client.post(f'/pets/eventos/{evento.pk}/excluir/')
+        self.assertEqual(_mensagens(resposta), [('success', "Evento 'Vacina' removido com sucesso.")])
+        self.assertFalse(Evento.objects.filter(pk=evento.pk).exists())
+
+    def test_concluir(self):
+        evento = Evento.objects.create(pet=self.pet, tipo='medicamento', data=date(2025, 10, 10), observacoes='Remédio X')
+        with self.assertNumQueries(8):
+            resposta = self.client.get(f'/pets/eventos/{evento.pk}/concluir/')
+        self.assertRedirects(resposta, f'/pets/{self.pet.pk}/eventos/', fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('success', 'Evento marcado como concluído!')])
+        self.assertContains(self.client.get(f'/pets/{self.pet.pk}/eventos/'), 'concluido')
+
+        resposta = self.client.get(f'/pets/eventos/{evento.pk}/concluir/')
+        self.assertEqual(_mensagens(resposta), [('warning', 'Esse evento já foi concluído.')])
+
+    def test_selecionar_pet(self):
+        outro = User.objects.create_user(username='outro_selecionar', password='testpass123')
+        alheio = Pet.objects.create(tutor=outro, nome="Alheio", especie="Cão", data_nascimento=date(2020, 1, 1), peso=5)
+        self.assertNotContains(self.client.get('/pets/eventos/selecionar-pet/'), 'Alheio')
+
+        resposta = self.client.post('/pets/eventos/selecionar-pet/', {})
+        self.assertEqual(_mensagens(resposta), [('error', 'Você precisa selecionar um pet.')])
+        resposta = self.client.post('/pets/eventos/selecionar-pet/', {'pet_selecionado': alheio.pk})
+        self.assertEqual(_mensagens(resposta), [('error', 'Pet inválido selecionado.')])
+        resposta = self.client.post('/pets/eventos/selecionar-pet/', {'pet_selecionado': self.pet.pk})
+        self.assertRedirects(resposta, f'/pets/{self.pet.pk}/eventos/adicionar/', fetch_redirect_response=False)
+
+        self.client.force_login(outro)
+        alheio.delete()
+        resposta = self.client.get('/pets/eventos/selecionar-pet/')
+        self.assertTemplateUsed(resposta, 'pets/evento_sem_pets.html')
+
+
+class TesteViewsMetasCompras(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_views_metas', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="PetMetas", especie="Gato", data_nascimento=date(2020, 2, 14), peso=6)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_adicionar_meta(self):
+        url = f'/pets/{self.pet.pk}/metas/'
+        with self.assertNumQueries(7):
+            resposta = self.client.post(url, {'descricao': 'Manter a caixa de areia limpa', 'data_prazo': '2026-03-01'})
+        self.assertRedirects(resposta, url, fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('success', 'Meta adicionada!')])
+        self.assertContains(self.client.get(url), 'Manter a caixa de areia limpa')
+
+        resposta = self.client.post(url, {'descricao': 'Sem prazo'})
+        self.assertEqual(_mensagens(resposta), [('error', 'Preencha a descrição e a data para adicionar a meta.')])
+        self.assertEqual(Meta.objects.filter(pet=self.pet).count(), 1)
+
+    def test_progresso_da_meta(self):
+        meta = Meta.objects.create(pet=self.pet, descricao='Perder peso', data_prazo=date(2026, 1, 1), progresso=50)
+        url = f'/pets/metas/{meta.pk}/atualizar-progresso/'
+        casos = [
+            ('0', ('error', 'O progresso não pode ser 0%. Defina um valor maior.')),
+            ('150', ('error', 'O progresso deve estar entre 1 e 100.')),
+            ('abc', ('error', 'Valor de progresso inválido.')),
+        ]
+        for valor, mensagem in casos:
+            with self.subTest(valor=valor):
+                resposta = self.client.post(url, {'progresso': valor})
+                self.assertRedirects(resposta, f'/pets/{self.pet.pk}/visao-geral/', fetch_redirect_response=False)
+                self.assertEqual(_mensagens(resposta), [mensagem])
+        meta.refresh_from_db()
+        self.assertEqual(meta.progresso, 50)
+
+        with self.assertNumQueries(8):
+            resposta = self.client.post(url, {'progresso': '100'})
+        self.assertEqual(_mensagens(resposta), [('success', 'Progresso da meta atualizado!')])
+        self.assertEqual(PetStats.objects.get(pet=self.pet).metas_concluidas, 1)
+
+    def test_remover_meta_so_por_post(self):
+        meta = Meta.objects.create(pet=self.pet, descricao='Escovar os dentes', data_prazo=date(2026, 1, 1))
+        url = f'/pets/metas/{meta.pk}/remover/'
+        resposta = self.client.get(url)
+        self.assertEqual(_mensagens(resposta), [('error', 'Requisição inválida para remover meta.')])
+        self.assertTrue(Meta.objects.filter(pk=meta.pk).exists())
+
+        resposta = self.client.post(url)
+        self.assertRedirects(resposta, f'/pets/{self.pet.pk}/metas/', fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('success', 'Meta removida com sucesso!')])
+        self.assertFalse(Meta.objects.filter(pk=meta.pk).exists())
+
+    def test_lista_de_compras(self):
+        url = f'/pets/{self.pet.pk}/compras/'
+        resposta = self.client.post(url, {'descricao': ''})
+        self.assertEqual(_mensagens(resposta), [('error', 'Você precisa digitar o nome do item.')])
+        with self.assertNumQueries(7):
+            resposta = self.client.post(url, {'descricao': 'Ração Nova 10kg'})
+        self.assertRedirects(resposta, url, fetch_redirect_response=False)
+        self.assertEqual(_mensagens(resposta), [('success', 'Item adicionado à lista de compras!')])
+
+        item = ItemCompra.objects.get(pet=self.pet)
+        with self.assertNumQueries(8):
+            resposta = self.client.get(f'/pets/compras/{item.pk}/marcar/')
+        self.assertEqual(_mensagens(resposta), [('success', "Item 'Ração Nova 10kg' marcado como comprado!")])
+        self.assertEqual(list(self.client.get(url).context['itens_comprados']), [item])
+        resposta = self.client.get(f'/pets/compras/{item.pk}/marcar/')
+        self.assertEqual(_mensagens(resposta), [('info', "Item 'Ração Nova 10kg' movido de volta para a lista.")])
+
+        self.assertEqual(self.client.get(f'/pets/compras/{item.pk}/remover/').status_code, 200)
+        resposta = self.client.post(f'/pets/compras/{item.pk}/remover/')
+        self.assertEqual(_mensagens(resposta), [('success', "Item 'Ração Nova 10kg' removido da lista.")])
+        self.assertFalse(ItemCompra.objects.exists())
+
+
+class TesteViewsPosse(TestCase):
+    """Nenhuma rota por pet/evento/meta/item deixa outro tutor ver ou alterar os dados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dono = User.objects.create_user(username='dono_posse', password='testpass123')
+        cls.intruso = User.objects.create_user(username='intruso_posse', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.dono, nome="PetAlheio", especie="Cão", data_nascimento=date(2020, 1, 1), peso=9)
+        cls.evento = Evento.objects.create(pet=cls.pet, tipo='vacina', data=date(2025, 1, 1))
+        cls.meta = Meta.objects.create(pet=cls.pet, descricao='Meta alheia', data_prazo=date(2026, 1, 1), progresso=10)
+        cls.item = ItemCompra.objects.create(pet=cls.pet, descricao='Item alheio')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.intruso)
+
+    def test_rotas_do_pet_de_outro_tutor_dao_404(self):
+        urls = [
+            f'/pets/{self.pet.pk}/edit/', f'/pets/{self.pet.pk}/delete/', f'/pets/{self.pet.pk}/visao-geral/',
+            f'/pets/{self.pet.pk}/eventos/', f'/pets/{self.pet.pk}/eventos/adicionar/', f'/pets/{self.pet.pk}/metas/',
+            f'/pets/{self.pet.pk}/compras/', f'/pets/eventos/{self.evento.pk}/editar/',
+            f'/pets/eventos/{self.evento.pk}/excluir/', f'/pets/eventos/{self.evento.pk}/concluir/',
+            f'/pets/metas/{self.meta.pk}/atualizar-progresso/', f'/pets/metas/{self.meta.pk}/remover/',
+            f'/pets/compras/{self.item.pk}/marcar/', f'/pets/compras/{self.item.pk}/remover/',
+        ]
+        dados = {'nome': 'Hack', 'especie': 'X', 'data_nascimento': '2020-01-01', 'peso': '1', 'tipo': 'vacina',
+                 'data': '2025-01-01', 'descricao': 'Hack', 'data_prazo': '2026-01-01', 'progresso': '100'}
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+                self.assertEqual(self.client.post(url, dados).status_code, 404)
+
+        self.pet.refresh_from_db()
+        self.evento.refresh_from_db()
+        self.meta.refresh_from_db()
+        self.item.refresh_from_db()
+        self.assertEqual((self.pet.nome, self.evento.concluido, self.meta.progresso, self.item.comprado), ('PetAlheio', False, 10, False))
+        self.assertEqual((Evento.objects.count(), Meta.objects.count(), ItemCompra.objects.count()), (1, 1, 1))
+
+    def test_lista_e_lote_so_mostram_os_proprios_pets(self):
+        self.assertNotContains(self.client.get('/pets/'), 'PetAlheio')
+        resposta = self.client.post(f'/pets/{self.pet.pk}/compras/lote/', {'itens': 'Ração\nAreia'})
+        self.assertEqual(_mensagens(resposta), [('error', f'Pets inválidos: {self.pet.pk}.')])
+        self.assertEqual(ItemCompra.objects.filter(pet=self.pet).count(), 1)
+
+
+# ===============================================
+# PERFORMANCE: ÍNDICES COMPOSTOS
+# ===============================================
+class TesteIndicesCompostos(TestCase):
+    """Confere no plano de execução que as consultas das views usam os índices compostos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_indices', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="PetIndice", especie="Cão", data_nascimento=date(2020, 1, 1), peso=10)
+
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f"Plano de execução não verificado para o banco '{connection.vendor}'.")
+        if connection.vendor == 'postgresql':
+            # Com tabelas pequenas o planner prefere seq scan + sort; desligamos para ver o índice escolhido.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("SET LOCAL enable_sort = off")
+
+    def assertUsaIndice(self, queryset, nome_indice):
+        plano = queryset.explain()
+        self.assertIn(nome_indice, plano)
+        # O índice também precisa cobrir a ordenação (sem sort depois do filtro)
+        self.assertNotIn('TEMP B-TREE', plano)
+        self.assertNotIn('Sort Key', plano)
+
+    def test_evento_list_usa_indice_pet_data(self):
+        self.assertUsaIndice(Evento.objects.filter(pet=self.pet).order_by('-data'), 'pets_evento_pet_data_idx')
+
+    def test_meta_list_usa_indice_pet_progresso_prazo(self):
+        self.assertUsaIndice(Meta.objects.filter(pet=self.pet).order_by('progresso', 'data_prazo'), 'pets_meta_pet_prog_prazo_idx')
+
+    def test_lista_compras_usa_indice_pet_comprado_criado(self):
+        self.assertUsaIndice(ItemCompra.objects.filter(pet=self.pet, comprado=Value(False)).order_by('criado_em'), 'pets_item_pet_comp_criado_idx')
+        self.assertUsaIndice(ItemCompra.objects.filter(pet=self.pet, comprado=Value(True)).order_by('-criado_em'), 'pets_item_pet_comp_criado_idx')
+
+    def test_pet_list_usa_indice_tutor_nome(self):
+        self.assertUsaIndice(Pet.objects.filter(tutor=self.user).order_by('nome'), 'pets_pet_tutor_nome_idx')
+
+
+# ===============================================
+# PERFORMANCE: PAGINAÇÃO POR CURSOR
+# ===============================================
+class TestePaginacaoCursor(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_paginacao', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="PetPaginado", especie="Gato", data_nascimento=date(2019, 3, 1), peso=4)
+        # Várias datas repetidas para exercitar o desempate pelo id
+        Evento.objects.bulk_create([
+            Evento(pet=cls.pet, tipo='medicamento', data=date(2024, 1, 1 + i // 3)) for i in range(45)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def percorrer(self, url, chave, parametro='cursor'):
+        vistos, params = [], {}
+        while True:
+            resposta = self.client.get(url, params)
+            self.assertEqual(resposta.status_code, 200)
+            pagina = resposta.context[chave]
+            vistos.extend(item.pk for item in pagina)
+            if not pagina.tem_mais:
+                return vistos
+            params = {parametro: pagina.proximo_cursor}
+
+    def test_eventos_paginados_sem_repetir_nem_pular(self):
+        url = f'/pets/{self.pet.pk}/eventos/'
+        vistos = self.percorrer(url, 'eventos')
+        esperado = list(Evento.objects.filter(pet=self.pet).order_by('-data', 'id').values_list('pk', flat=True))
+        self.assertEqual(vistos, esperado)
+
+        resposta = self.client.get(url)
+        self.assertEqual(len(resposta.context['eventos']), 20)
+        self.assertContains(resposta, 'Carregar mais eventos')
+
+    def test_cursor_invalido_volta_para_primeira_pagina(self):
+        resposta = self.client.get(f'/pets/{self.pet.pk}/eventos/', {'cursor': 'nao-e-um-cursor'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIsNone(resposta.context['eventos'].cursor_atual)
+        self.assertEqual(len(resposta.context['eventos']), 20)
+
+    def test_paginas_seguintes_nao_dependem_da_profundidade(self):
+        url = f'/pets/{self.pet.pk}/eventos/'
+        cursor = self.client.get(url).context['eventos'].proximo_cursor
+        # sessão + usuário + carimbo (ETag) + pet + uma única consulta da página
+        with self.assertNumQueries(5):
+            self.client.get(url, {'cursor': cursor})
+
+    def test_metas_paginadas(self):
+        Meta.objects.bulk_create([
+            Meta(pet=self.pet, descricao=f"Meta {i}", data_prazo=date(2025, 1, 1 + i % 5), progresso=(i % 4) * 25)
+            for i in range(30)
+        ])
+        vistos = self.percorrer(f'/pets/{self.pet.pk}/metas/', 'metas')
+        esperado = list(Meta.objects.filter(pet=self.pet).order_by('progresso', 'data_prazo', 'id').values_list('pk', flat=True))
+        self.assertEqual(vistos, esperado)
+
+    def test_lista_compras_com_cursores_independentes(self):
+        for i in range(50):
+            ItemCompra.objects.create(pet=self.pet, descricao=f"Item {i}", comprado=i % 2 == 0)
+        url = f'/pets/{self.pet.pk}/compras/'
+        a_comprar = self.percorrer(url, 'itens_nao_comprados', 'cursor_a_comprar')
+        comprados = self.percorrer(url, 'itens_comprados', 'cursor_comprados')
+        self.assertEqual(a_comprar, list(ItemCompra.objects.filter(pet=self.pet, comprado=False).order_by('criado_em', 'id').values_list('pk', flat=True)))
+        self.assertEqual(comprados, list(ItemCompra.objects.filter(pet=self.pet, comprado=True).order_by('-criado_em', '-id').values_list('pk', flat=True)))
+
+
+# ===============================================
+# PERFORMANCE: VISÃO GERAL EM POUCAS CONSULTAS
+# ===============================================
+class TesteVisaoGeralConsultas(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_visao', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="PetVisao", especie="Cão", data_nascimento=date(2018, 6, 1), peso=12)
+        Evento.objects.bulk_create([Evento(pet=cls.pet, tipo='consulta', data=date(2024, 5, i + 1)) for i in range(8)])
+        Meta.objects.bulk_create([
+            Meta(pet=cls.pet, descricao="Concluída", data_prazo=date(2025, 1, 1), progresso=100),
+            Meta(pet=cls.pet, descricao="Concluída 2", data_prazo=date(2025, 1, 2), progresso=100),
+            Meta(pet=cls.pet, descricao="Andamento", data_prazo=date(2025, 2, 1), progresso=40),
+        ])
+        PetStats.recalcular([cls.pet.pk])  # bulk_create não dispara os signals
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_orcamento_de_consultas(self):
+        # sessão + usuário + carimbo (ETag) + pet com stats + últimos eventos + metas em andamento
+        # + séries recorrentes da semana (as conclusões só são buscadas se houver séries)
+        with self.assertNumQueries(7):
+            resposta = self.client.get(f'/pets/{self.pet.pk}/visao-geral/')
+        self.assertEqual(resposta.context['total_eventos'], 8)
+        self.assertEqual(resposta.context['metas_concluidas'], 2)
+        self.assertEqual(len(resposta.context['eventos']), 5)
+        self.assertEqual([m.descricao for m in resposta.context['metas']], ["Andamento"])
+
+    def test_pet_sem_registros_tem_o_mesmo_orcamento(self):
+        vazio = Pet.objects.create(tutor=self.user, nome="Vazio", especie="Gato", data_nascimento=date(2022, 1, 1), peso=3)
+        with self.assertNumQueries(7):
+            resposta = self.client.get(f'/pets/{vazio.pk}/visao-geral/')
+        self.assertEqual(resposta.context['total_eventos'], 0)
+        self.assertEqual(resposta.context['metas_concluidas'], 0)
+        self.assertContains(resposta, 'Esse pet ainda não possui registros de eventos ou metas.')
+
+    def test_pet_de_outro_tutor_retorna_404(self):
+        outro = User.objects.create_user(username='outro_tutor_visao', password='testpass123')
+        pet_alheio = Pet.objects.create(tutor=outro, nome="Alheio", especie="Cão", data_nascimento=date(2020, 1, 1), peso=8)
+        self.assertEqual(self.client.get(f'/pets/{pet_alheio.pk}/visao-geral/').status_code, 404)
+
+
+# ===============================================
+# PERFORMANCE: CONTADORES DO PetStats
+# ===============================================
+class TestePetStats(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_stats', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="PetStats", especie="Cão", data_nascimento=date(2021, 2, 2), peso=7)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertStatsCorretos(self, pet=None):
+        pet = pet or self.pet
+        gravado = PetStats.objects.get(pet=pet).como_dict()
+        self.assertEqual(gravado, PetStats.calcular([pet.pk])[0].como_dict())
+        return gravado
+
+    def test_stats_criado_junto_com_o_pet(self):
+        self.assertEqual(self.assertStatsCorretos(), dict.fromkeys(PetStats.CONTADORES, 0))
+
+    def test_fluxo_de_eventos_pelas_views(self):
+        self.client.post(f'/pets/{self.pet.pk}/eventos/adicionar/', {'tipo': 'vacina', 'data': '2025-03-01'})
+        self.client.post(f'/pets/{self.pet.pk}/eventos/adicionar/', {'tipo': 'consulta', 'data': '2025-03-02'})
+        evento = Evento.objects.filter(pet=self.pet).first()
+        self.client.get(f'/pets/eventos/{evento.pk}/concluir/')
+        stats = self.assertStatsCorretos()
+        self.assertEqual((stats['total_eventos'], stats['eventos_pendentes']), (2, 1))
+
+        self.client.post(f'/pets/eventos/{evento.pk}/excluir/')
+        stats = self.assertStatsCorretos()
+        self.assertEqual((stats['total_eventos'], stats['eventos_pendentes']), (1, 1))
+
+    def test_fluxo_de_metas_e_compras_pelas_views(self):
+        self.client.post(f'/pets/{self.pet.pk}/metas/', {'descricao': 'Passear', 'data_prazo': '2025-06-01'})
+        meta = Meta.objects.get(pet=self.pet)
+        self.client.post(f'/pets/metas/{meta.pk}/atualizar-progresso/', {'progresso': 100})
+        self.client.post(f'/pets/{self.pet.pk}/compras/', {'descricao': 'Ração'})
+        item = ItemCompra.objects.get(pet=self.pet)
+        self.client.get(f'/pets/compras/{item.pk}/marcar/')
+        stats = self.assertStatsCorretos()
+        self.assertEqual((stats['metas_concluidas'], stats['metas_em_andamento'], stats['itens_pendentes']), (1, 0, 0))
+
+        self.client.get(f'/pets/compras/{item.pk}/marcar/')
+        self.client.post(f'/pets/metas/{meta.pk}/remover/')
+        stats = self.assertStatsCorretos()
+        self.assertEqual((stats['metas_concluidas'], stats['itens_pendentes']), (0, 1))
+
+    def ler_antes_de_outra_requisicao(self, obsoleto):
+        # A view lê a linha (get_object_or_404) antes de outra requisição gravar;
+        # só a primeira busca devolve a cópia antiga, a releitura travada vai ao banco
+        buscas = iter([obsoleto])
+        return mock.patch.object(views, 'get_object_or_404', side_effect=lambda *a, **k: next(buscas, None) or get_object_or_404(*a, **k))
+
+    def test_escritas_concorrentes_nao_desviam_os_contadores(self):
+        item = ItemCompra.objects.create(pet=self.pet, descricao='Ração')
+        obsoleto = ItemCompra.objects.get(pk=item.pk)
+        self.client.get(f'/pets/compras/{item.pk}/marcar/')
+        with self.ler_antes_de_outra_requisicao(obsoleto):
+            self.client.get(f'/pets/compras/{item.pk}/marcar/')
+        self.assertFalse(ItemCompra.objects.get(pk=item.pk).comprado)
+        self.assertEqual(self.assertStatsCorretos()['itens_pendentes'], 1)
+
+        # Clique duplo no excluir: o segundo DELETE não acha a linha e não desconta de novo
+        self.client.post(f'/pets/compras/{item.pk}/remover/')
+        with self.ler_antes_de_outra_requisicao(obsoleto):
+            self.assertEqual(self.client.post(f'/pets/compras/{item.pk}/remover/').status_code, 404)
+        ItemCompra.objects.create(pet=self.pet, descricao='Areia')
+        self.assertEqual(self.assertStatsCorretos()['itens_pendentes'], 1)
+
+    def test_delta_nunca_deixa_contador_negativo(self):
+        PetStats.aplicar_delta(self.pet.pk, {'itens_pendentes': -1, 'total_eventos': -2})
+        self.assertEqual(self.assertStatsCorretos(), dict.fromkeys(PetStats.CONTADORES, 0))
+
+    def test_troca_de_pet_move_os_contadores(self):
+        outro = Pet.objects.create(tutor=self.user, nome="Outro", especie="Gato", data_nascimento=date(2021, 2, 2), peso=3)
+        evento = Evento.objects.create(pet=self.pet, tipo='vacina', data=date(2025, 1, 1))
+        evento.pet = outro
+        evento.save()
+        self.assertEqual(self.assertStatsCorretos()['total_eventos'], 0)
+        self.assertEqual(self.assertStatsCorretos(outro)['total_eventos'], 1)
+
+    def test_instancia_com_campos_adiados_recalcula(self):
+        evento = Evento.objects.create(pet=self.pet, tipo='vacina', data=date(2025, 1, 1))
+        adiado = Evento.objects.only('pk', 'data').get(pk=evento.pk)
+        adiado.concluido = True
+        adiado.save()
+        self.assertEqual(self.assertStatsCorretos()['eventos_pendentes'], 0)
+
+    def test_apagar_pet_remove_stats_em_cascata(self):
+        Evento.objects.create(pet=self.pet, tipo='vacina', data=date(2025, 1, 1))
+        self.client.post(f'/pets/{self.pet.pk}/delete/')
+        self.assertFalse(PetStats.objects.filter(pet_id=self.pet.pk).exists())
+
+    def test_comando_verifica_e_reconstroi(self):
+        # bulk_create não dispara signals: os contadores ficam desatualizados
+        Evento.objects.bulk_create([Evento(pet=self.pet, tipo='vacina', data=date(2025, 1, d)) for d in range(1, 4)])
+        with self.assertRaises(CommandError):
+            call_command('recalcular_stats', '--verificar', stdout=StringIO())
+        call_command('recalcular_stats', '--lote', '1', stdout=StringIO())
+        call_command('recalcular_stats', '--verificar', stdout=StringIO())
+        self.assertEqual(self.assertStatsCorretos()['total_eventos'], 3)
+
+
+# ===============================================
+# PERFORMANCE: LISTA DE PETS COM RESUMO
+# ===============================================
+class TesteListaPetsResumo(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_lista', password='testpass123')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def criar_pet(self, nome):
+        pet = Pet.objects.create(tutor=self.user, nome=nome, especie="Cão", data_nascimento=date(2020, 1, 1), peso=5)
+        Evento.objects.create(pet=pet, tipo='vacina', data=date(2000, 1, 1))  # passado: não é o próximo
+        Evento.objects.create(pet=pet, tipo='consulta', data=date(2999, 5, 1))
+        Evento.objects.create(pet=pet, tipo='vacina', data=date(2999, 1, 1), concluido=True)
+        Meta.objects.create(pet=pet, descricao="Meta", data_prazo=date(2999, 1, 1), progresso=30)
+        ItemCompra.objects.create(pet=pet, descricao="Ração")
+        return pet
+
+    def test_consultas_constantes_com_muitos_pets(self):
+        self.criar_pet("Alfa")
+        with self.assertNumQueries(3):  # sessão + usuário + pets anotados
+            self.client.get('/pets/')
+        for i in range(10):
+            self.criar_pet(f"Pet {i}")
+        with self.assertNumQueries(3):
+            resposta = self.client.get('/pets/')
+        self.assertEqual(len(resposta.context['pets']), 11)
+
+    def test_badges_do_resumo(self):
+        self.criar_pet("Alfa")
+        resposta = self.client.get('/pets/')
+        pet = resposta.context['pets'][0]
+        self.assertEqual(pet.proximo_evento, date(2999, 5, 1))
+        self.assertEqual((pet.stats.eventos_pendentes, pet.stats.metas_em_andamento, pet.stats.itens_pendentes), (2, 1, 1))
+        self.assertContains(resposta, 'Próximo evento: 01/05/2999')
+        self.assertContains(resposta, '2 eventos pendentes')
+        self.assertContains(resposta, '1 meta ativa')
+
+    def test_pets_sem_stats_sao_recalculados_em_lote(self):
+        Pet.objects.bulk_create([
+            Pet(tutor=self.user, nome=f"Lote {i}", especie="Gato", data_nascimento=date(2020, 1, 1), peso=3) for i in range(5)
+        ])
+        # + 3 consultas agrupadas do cálculo + 1 upsert, independentemente de quantos faltam
+        with self.assertNumQueries(7):
+            resposta = self.client.get('/pets/')
+        self.assertEqual(PetStats.objects.filter(pet__tutor=self.user).count(), 5)
+        self.assertContains(resposta, '0 eventos pendentes', count=5)
+
+
+# ===============================================
+# PERFORMANCE: CACHE POR TUTOR / PET
+# ===============================================
+class TesteCachePaginas(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_cache', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="PetCache", especie="Cão", data_nascimento=date(2020, 1, 1), peso=9)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_segunda_visita_nao_consulta_o_banco(self):
+        self.client.get('/pets/')
+        with self.assertNumQueries(2):  # só sessão + usuário
+            self.assertEqual(self.client.get('/pets/').status_code, 200)
+        for url in [f'/pets/{self.pet.pk}/visao-geral/', f'/pets/{self.pet.pk}/eventos/', f'/pets/{self.pet.pk}/metas/']:
+            self.client.get(url)
+            with self.assertNumQueries(3):  # sessão + usuário + carimbo do GET condicional
+                resposta = self.client.get(url)
+            self.assertEqual(resposta.status_code, 200)
+
+    def test_escrita_invalida_paginas_do_pet_e_do_tutor(self):
+        self.client.get(f'/pets/{self.pet.pk}/eventos/')
+        self.client.get('/pets/')
+        self.client.post(f'/pets/{self.pet.pk}/eventos/adicionar/', {'tipo': 'vacina', 'data': '2999-01-01'})
+        self.assertContains(self.client.get(f'/pets/{self.pet.pk}/eventos/'), 'Vacina')
+        self.assertContains(self.client.get('/pets/'), 'Próximo evento: 01/01/2999')
+
+        evento = Evento.objects.get(pet=self.pet)
+        self.client.post(f'/pets/eventos/{evento.pk}/excluir/')
+        self.assertContains(self.client.get(f'/pets/{self.pet.pk}/eventos/'), 'Nenhum evento cadastrado para este pet.')
+
+    def test_edicao_do_pet_invalida_cache(self):
+        self.client.get(f'/pets/{self.pet.pk}/visao-geral/')
+        Pet.objects.filter(pk=self.pet.pk).update(nome="Sem signal")  # update() não invalida...
+        self.assertContains(self.client.get(f'/pets/{self.pet.pk}/visao-geral/'), 'PetCache')
+        pet = Pet.objects.get(pk=self.pet.pk)
+        pet.nome = "Renomeado"
+        pet.save()  # ...save() invalida
+        self.assertContains(self.client.get(f'/pets/{self.pet.pk}/visao-geral/'), 'Renomeado')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_sem_cache_compartilhado_nada_fica_velho(self):
+        # Escrita feita por outro processo (sem passar pelos signals deste): sem cache, a página já mostra
+        self.client.get(f'/pets/{self.pet.pk}/visao-geral/')
+        Pet.objects.filter(pk=self.pet.pk).update(nome="Outro processo")
+        self.assertContains(self.client.get(f'/pets/{self.pet.pk}/visao-geral/'), 'Outro processo')
+
+    def test_check_de_deploy_avisa_sem_cache_compartilhado(self):
+        with override_settings(PRODUCAO=True):
+            self.assertEqual([aviso.id for aviso in checks.cache_compartilhado(None)], ['pets.W001'])
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}):
+                self.assertEqual(checks.cache_compartilhado(None), [])
+        self.assertEqual(checks.cache_compartilhado(None), [])
+
+    def test_cache_separado_por_tutor(self):
+        self.client.get(f'/pets/{self.pet.pk}/visao-geral/')
+        outro = User.objects.create_user(username='intruso_cache', password='testpass123')
+        self.client.force_login(outro)
+        self.assertEqual(self.client.get(f'/pets/{self.pet.pk}/visao-geral/').status_code, 404)
+
+    def test_pet_apagado_deixa_de_ser_servido(self):
+        self.client.get(f'/pets/{self.pet.pk}/eventos/')
+        self.client.post(f'/pets/{self.pet.pk}/delete/')
+        self.assertEqual(self.client.get(f'/pets/{self.pet.pk}/eventos/').status_code, 404)
+
+
+# ===============================================
+# PERFORMANCE: GET CONDICIONAL (304)
+# ===============================================
+class TesteGetCondicional(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_304', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="Pet304", especie="Cão", data_nascimento=date(2020, 1, 1), peso=9)
+        Evento.objects.create(pet=cls.pet, tipo='vacina', data=date(2025, 1, 1))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.urls = [
+            f'/pets/{self.pet.pk}/visao-geral/', f'/pets/{self.pet.pk}/eventos/',
+            f'/pets/{self.pet.pk}/metas/', f'/pets/{self.pet.pk}/compras/',
+        ]
+
+    def test_if_none_match_responde_304_sem_renderizar(self):
+        for url in self.urls:
+            etag = self.client.get(url).headers['ETag']
+            # sessão + usuário + carimbo do pet; nenhuma lista, nenhum template
+            with self.assertNumQueries(3):
+                resposta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resposta.status_code, 304, url)
+            self.assertEqual(resposta.templates, [])
+            self.assertEqual(resposta.content, b'')
+
+    def test_if_modified_since_responde_304(self):
+        for url in self.urls:
+            ultima = self.client.get(url).headers['Last-Modified']
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=ultima).status_code, 304, url)
+
+    def test_escrita_em_evento_muda_o_etag(self):
+        url = f'/pets/{self.pet.pk}/eventos/'
+        etag = self.client.get(url).headers['ETag']
+        evento = Evento.objects.get(pet=self.pet)
+        evento.observacoes = "Reforço"
+        evento.save()
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, "Reforço")
+
+    def test_exclusao_de_evento_muda_o_etag(self):
+        url = f'/pets/{self.pet.pk}/visao-geral/'
+        etag = self.client.get(url).headers['ETag']
+        Evento.objects.get(pet=self.pet).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_mensagem_pendente_impede_304(self):
+        url = f'/pets/{self.pet.pk}/metas/'
+        etag = self.client.get(url).headers['ETag']
+        self.client.post(url, {'descricao': ''})  # validação falha e redireciona com mensagem
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, 'Preencha a descrição e a data')
+
+    def test_pet_de_outro_tutor_nao_responde_304(self):
+        url = f'/pets/{self.pet.pk}/eventos/'
+        etag = self.client.get(url).headers['ETag']
+        outro = User.objects.create_user(username='intruso_304', password='testpass123')
+        self.client.force_login(outro)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+# ===============================================
+# API JSON v1
+# ===============================================
+class TesteApiV1(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_api', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="PetApi", especie="Cão", data_nascimento=date(2020, 1, 1), peso=9)
+        for dia in range(1, 31):
+            Evento.objects.create(pet=cls.pet, tipo='vacina' if dia % 2 else 'consulta', data=date(2025, 1, dia), concluido=dia > 20)
+        Meta.objects.create(pet=cls.pet, descricao="Correr", data_prazo=date(2025, 6, 1), progresso=100)
+        Meta.objects.create(pet=cls.pet, descricao="Dieta", data_prazo=date(2025, 7, 1), progresso=50)
+        ItemCompra.objects.create(pet=cls.pet, descricao="Ração")
+        ItemCompra.objects.create(pet=cls.pet, descricao="Coleira", comprado=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_exige_autenticacao(self):
+        self.client.logout()
+        resposta = self.client.get('/api/v1/pets/')
+        self.assertEqual(resposta.status_code, 401)
+        self.assertIn('erro', resposta.json())
+
+    def test_somente_leitura(self):
+        self.assertEqual(self.client.post('/api/v1/pets/').status_code, 405)
+
+    def test_lista_e_detalhe_de_pets(self):
+        dados = self.client.get('/api/v1/pets/').json()
+        self.assertEqual([p['nome'] for p in dados['resultados']], ["PetApi"])
+        self.assertIsNone(dados['proximo'])
+
+        detalhe = self.client.get(f'/api/v1/pets/{self.pet.pk}/').json()
+        self.assertEqual(detalhe['stats']['total_eventos'], 30)
+        self.assertEqual(detalhe['stats']['itens_pendentes'], 1)
+
+    def test_pet_de_outro_tutor_retorna_404_json(self):
+        outro = User.objects.create_user(username='intruso_api', password='testpass123')
+        self.client.force_login(outro)
+        for url in (f'/api/v1/pets/{self.pet.pk}/', f'/api/v1/pets/{self.pet.pk}/eventos/'):
+            resposta = self.client.get(url)
+            self.assertEqual(resposta.status_code, 404)
+            self.assertEqual(resposta.json(), {'erro': 'Não encontrado.'})
+
+    def test_fields_devolve_so_as_colunas_pedidas(self):
+        dados = self.client.get(f'/api/v1/pets/{self.pet.pk}/eventos/', {'fields': 'tipo', 'limite': 5}).json()
+        self.assertEqual(len(dados['resultados']), 5)
+        self.assertEqual(set(dados['resultados'][0]), {'tipo'})
+
+        resposta = self.client.get(f'/api/v1/pets/{self.pet.pk}/eventos/', {'fields': 'tipo,senha'})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_paginacao_por_cursor_percorre_tudo(self):
+        url, params, vistos = f'/api/v1/pets/{self.pet.pk}/eventos/', {'limite': 7, 'fields': 'id'}, []
+        while url:
+            dados = self.client.get(url, params).json()
+            vistos.extend(e['id'] for e in dados['resultados'])
+            url, params = dados['proximo'], None
+        esperado = list(Evento.objects.filter(pet=self.pet).order_by('-data', 'id').values_list('pk', flat=True))
+        self.assertEqual(vistos, esperado)
+
+    def test_filtros_de_eventos(self):
+        url = f'/api/v1/pets/{self.pet.pk}/eventos/'
+        dados = self.client.get(url, {'tipo': 'vacina', 'concluido': 'false', 'data_de': '2025-01-05', 'data_ate': '2025-01-15', 'limite': 100}).json()
+        self.assertEqual([e['data'] for e in dados['resultados']], ['2025-01-15', '2025-01-13', '2025-01-11', '2025-01-09', '2025-01-07', '2025-01-05'])
+        self.assertEqual(self.client.get(url, {'tipo': 'banho'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'data_de': 'ontem'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limite': 1000}).status_code, 400)
+
+    def test_filtros_de_metas_e_compras(self):
+        metas = self.client.get(f'/api/v1/pets/{self.pet.pk}/metas/', {'concluida': 'true'}).json()
+        self.assertEqual([m['descricao'] for m in metas['resultados']], ["Correr"])
+        compras = self.client.get(f'/api/v1/pets/{self.pet.pk}/compras/', {'comprado': '0'}).json()
+        self.assertEqual([i['descricao'] for i in compras['resultados']], ["Ração"])
+
+    def test_orcamento_de_consultas_da_lista(self):
+        # sessão + usuário + checagem de dono + página
+        with self.assertNumQueries(4):
+            self.client.get(f'/api/v1/pets/{self.pet.pk}/eventos/')
+
+
+# ===============================================
+# PERFORMANCE: ESCRITAS EM LOTE
+# ===============================================
+class TesteEscritasEmLote(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_lote', password='testpass123')
+        cls.pets = [
+            Pet.objects.create(tutor=cls.user, nome=f"Lote {i}", especie="Cão", data_nascimento=date(2020, 1, 1), peso=5)
+            for i in range(12)
+        ]
+        outro = User.objects.create_user(username='outro_lote', password='testpass123')
+        cls.pet_alheio = Pet.objects.create(tutor=outro, nome="Alheio", especie="Gato", data_nascimento=date(2020, 1, 1), peso=3)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def postar_campanha(self, pets):
+        return self.client.post('/pets/eventos/lote/', {
+            'pets': [pet.pk for pet in pets], 'tipo': 'vacina', 'data': '2025-09-01', 'observacoes': 'Campanha',
+        })
+
+    def test_campanha_para_varios_pets_com_consultas_constantes(self):
+        with CaptureQueriesContext(connection) as poucos:
+            self.postar_campanha(self.pets[:2])
+        with CaptureQueriesContext(connection) as muitos:
+            resposta = self.postar_campanha(self.pets[2:])
+        self.assertRedirects(resposta, '/pets/', fetch_redirect_response=False)
+        self.assertEqual(len(poucos), len(muitos))
+        self.assertEqual(Evento.objects.filter(observacoes='Campanha').count(), 12)
+        self.assertEqual(PetStats.objects.get(pet=self.pets[5]).total_eventos, 1)
+
+    def test_pet_de_outro_tutor_invalida_o_lote_inteiro(self):
+        resposta = self.postar_campanha([self.pets[0], self.pet_alheio])
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, 'Pets inválidos')
+        self.assertFalse(Evento.objects.exists())
+
+    def test_varios_itens_na_lista_de_compras(self):
+        pet = self.pets[0]
+        self.client.post(f'/pets/{pet.pk}/compras/lote/', {'itens': 'Ração\n\nAreia\n  Petisco  \n'})
+        self.assertEqual(sorted(ItemCompra.objects.filter(pet=pet).values_list('descricao', flat=True)), ['Areia', 'Petisco', 'Ração'])
+        self.assertEqual(PetStats.objects.get(pet=pet).itens_pendentes, 3)
+
+    def test_api_cria_e_atualiza_eventos(self):
+        corpo = {'eventos': [{'pet': pet.pk, 'tipo': 'medicamento', 'data': '2025-02-01'} for pet in self.pets[:3]]}
+        resposta = self.client.post('/api/v1/eventos/lote/', corpo, content_type='application/json')
+        self.assertEqual(resposta.status_code, 201)
+        ids = resposta.json()['criados']
+        self.assertEqual(len(ids), 3)
+
+        corpo = {'eventos': [{'id': pk, 'concluido': True} for pk in ids]}
+        resposta = self.client.patch('/api/v1/eventos/lote/', corpo, content_type='application/json')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(Evento.objects.filter(concluido=True).count(), 3)
+        stats = PetStats.objects.get(pet=self.pets[0])
+        self.assertEqual((stats.total_eventos, stats.eventos_pendentes), (1, 0))
+
+    def test_api_valida_o_lote(self):
+        resposta = self.client.post('/api/v1/eventos/lote/', {'eventos': [
+            {'pet': self.pets[0].pk, 'tipo': 'banho', 'data': '2025-02-01'},
+            {'pet': self.pets[0].pk, 'tipo': 'vacina', 'data': 'amanhã'},
+        ]}, content_type='application/json')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(len(resposta.json()['detalhes']), 2)
+        self.assertEqual(self.client.post('/api/v1/eventos/lote/', 'não é json', content_type='application/json').status_code, 400)
+
+        item = ItemCompra.objects.create(pet=self.pet_alheio, descricao="Do outro")
+        resposta = self.client.patch('/api/v1/compras/lote/', {'itens': [{'id': item.pk, 'comprado': True}]}, content_type='application/json')
+        self.assertEqual(resposta.status_code, 400)
+        item.refresh_from_db()
+        self.assertFalse(item.comprado)
+
+    def test_api_atualiza_itens(self):
+        pet = self.pets[0]
+        itens = [ItemCompra.objects.create(pet=pet, descricao=f"Item {i}") for i in range(3)]
+        resposta = self.client.patch('/api/v1/compras/lote/', {'itens': [{'id': i.pk, 'comprado': True} for i in itens]}, content_type='application/json')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(PetStats.objects.get(pet=pet).itens_pendentes, 0)
+
+
+# ===============================================
+# EXPORTAÇÃO DO HISTÓRICO (CSV / JSONL)
+# ===============================================
+class TesteExportacao(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_export', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="Rex", especie="Cão", data_nascimento=date(2020, 1, 1), peso=12)
+        Evento.objects.create(pet=cls.pet, tipo='vacina', data=date(2025, 3, 1), observacoes="Dose, anual")
+        Meta.objects.create(pet=cls.pet, descricao="Caminhar", data_prazo=date(2025, 6, 1), progresso=40)
+        ItemCompra.objects.create(pet=cls.pet, descricao="Ração")
+        outro = User.objects.create_user(username='outro_export', password='testpass123')
+        Pet.objects.create(tutor=outro, nome="Alheio", especie="Gato", data_nascimento=date(2020, 1, 1), peso=3)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def baixar(self, **params):
+        resposta = self.client.get('/pets/exportar/', params)
+        self.assertTrue(resposta.streaming)
+        return resposta, b''.join(resposta.streaming_content).decode()
+
+    def test_csv_com_todo_o_historico_do_tutor(self):
+        resposta, conteudo = self.baixar(formato='csv')
+        self.assertEqual(resposta['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment;', resposta['Content-Disposition'])
+        linhas = list(csv.DictReader(StringIO(conteudo)))
+        self.assertEqual([linha['registro'] for linha in linhas], ['pet', 'evento', 'meta', 'item_compra'])
+        self.assertEqual(linhas[1]['observacoes'], "Dose, anual")
+        self.assertNotIn('Alheio', conteudo)
+
+    def test_jsonl_incremental_com_desde(self):
+        Evento.objects.filter(pet=self.pet).update(atualizado_em=timezone.now() - timedelta(days=10))
+        _, conteudo = self.baixar(formato='jsonl', desde=(timezone.localdate() - timedelta(days=1)).isoformat())
+        registros = [json.loads(linha) for linha in conteudo.splitlines()]
+        self.assertEqual([r['registro'] for r in registros], ['pet', 'meta', 'item_compra'])
+        self.assertEqual(registros[2]['descricao'], "Ração")
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/pets/exportar/', {'formato': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get('/pets/exportar/', {'desde': 'ontem'}).status_code, 400)
+
+    def test_comando_export_vetlab(self):
+        saida = StringIO()
+        call_command('export_vetlab', '--formato', 'jsonl', '--tutor', 'tutor_export', '--chunk', '1', stdout=saida)
+        registros = [json.loads(linha) for linha in saida.getvalue().splitlines()]
+        self.assertEqual(len(registros), 4)
+        self.assertTrue(all(r['tutor_id'] == self.user.pk for r in registros))
+        with self.assertRaises(CommandError):
+            call_command('export_vetlab', '--tutor', 'ninguem', stdout=StringIO())
+
+
+# ===============================================
+# IMPORTAÇÃO EM LOTE
+# ===============================================
+class TesteImportacao(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='clinica', password='testpass123')
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+
+    def arquivo(self, nome, registros):
+        caminho = os.path.join(self.pasta, nome)
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.writelines(json.dumps(registro) + '\n' for registro in registros)
+        return caminho
+
+    def registros(self, pets=3, prefixo='L'):
+        for i in range(pets):
+            yield {'registro': 'pet', 'id': f'{prefixo}{i}', 'tutor': 'clinica', 'nome': f'Legado {i}', 'especie': 'Cão', 'data_nascimento': '2019-05-01', 'peso': '8.50'}
+            yield {'registro': 'evento', 'pet_id': f'{prefixo}{i}', 'tipo': 'vacina', 'data': '2024-01-10', 'concluido': True}
+            yield {'registro': 'meta', 'pet_id': f'{prefixo}{i}', 'descricao': 'Perder peso', 'data_prazo': '2024-12-31', 'progresso': 100}
+
+    def importar(self, *args):
+        saida = StringIO()
+        call_command('import_vetlab', *args, stdout=saida)
+        return saida.getvalue()
+
+    def test_importa_csv_com_tutor_por_username(self):
+        caminho = os.path.join(self.pasta, 'clinica.csv')
+        with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+            escritor = csv.DictWriter(arquivo, fieldnames=['registro', 'id', 'tutor', 'pet_id', 'nome', 'especie', 'raca', 'data_nascimento', 'peso', 'tipo', 'data', 'concluido'])
+            escritor.writeheader()
+            escritor.writerow({'registro': 'pet', 'id': '7', 'tutor': 'clinica', 'nome': 'Bolt', 'especie': 'Cão', 'data_nascimento': '2018-02-03', 'peso': '20'})
+            escritor.writerow({'registro': 'evento', 'pet_id': '7', 'tipo': 'consulta', 'data': '2024-03-04', 'concluido': 'False'})
+
+        saida = self.importar(caminho, '--lote', '1')
+        self.assertIn('registros/s', saida)
+        pet = Pet.objects.get(tutor=self.user, nome='Bolt')
+        self.assertIsNone(pet.raca)
+        self.assertEqual(pet.eventos.get().tipo, 'consulta')
+        self.assertEqual((pet.stats.total_eventos, pet.stats.eventos_pendentes), (1, 1))
+        self.assertEqual(list(pet.pesos.values_list('peso', flat=True)), [20])
+
+    def test_consultas_por_lote_nao_crescem_com_o_tamanho(self):
+        with CaptureQueriesContext(connection) as pequeno:
+            self.importar(self.arquivo('a.jsonl', self.registros(pets=2)), '--lote', '100')
+        with CaptureQueriesContext(connection) as grande:
+            self.importar(self.arquivo('b.jsonl', self.registros(pets=30, prefixo='B')), '--lote', '100')
+        self.assertEqual(len(pequeno), len(grande))
+        self.assertEqual(Pet.objects.count(), 32)
+
+    def test_simulacao_nao_grava(self):
+        saida = self.importar(self.arquivo('c.jsonl', self.registros()), '--simular')
+        self.assertIn('simulação', saida)
+        self.assertFalse(Pet.objects.exists())
+
+    def test_falha_e_retomada(self):
+        registros = list(self.registros())
+        registros[7]['tipo'] = 'tosa'  # inválido, cai no terceiro lote
+        caminho = self.arquivo('d.jsonl', registros)
+        with self.assertRaisesMessage(CommandError, "Registro 8: tipo"):
+            self.importar(caminho, '--lote', '3')
+        self.assertEqual(Pet.objects.count(), 2)
+        self.assertEqual(Evento.objects.count(), 2)
+
+        with self.assertRaises(CommandError):
+            self.importar(caminho, '--lote', '3')  # sem --retomar não reimporta
+
+        registros[7]['tipo'] = 'higiene'
+        self.arquivo('d.jsonl', registros)
+        self.importar(caminho, '--lote', '3', '--retomar')
+        self.assertEqual(Pet.objects.count(), 3)
+        self.assertEqual(Evento.objects.count(), 3)
+        self.assertEqual(Meta.objects.filter(pet__nome='Legado 2').count(), 1)
+
+        self.importar(caminho, '--lote', '3', '--do-zero')
+        self.assertEqual(Pet.objects.count(), 6)
+
+    def test_queda_depois_do_commit_nao_duplica_o_lote(self):
+        caminho = self.arquivo('e.jsonl', self.registros())
+
+        def cair(estado):
+            raise KeyboardInterrupt  # processo morto logo depois do commit do primeiro lote
+
+        with self.assertRaises(KeyboardInterrupt):
+            importacao.importar_arquivo(caminho, 'jsonl', tamanho_lote=3, ao_confirmar=cair, chave=os.path.abspath(caminho))
+        self.assertEqual(Pet.objects.count(), 1)
+        self.importar(caminho, '--lote', '3', '--retomar')
+        self.assertEqual((Pet.objects.count(), Evento.objects.count(), Meta.objects.count()), (3, 3, 3))
+
+    def test_ida_e_volta_com_a_exportacao(self):
+        pet = Pet.objects.create(tutor=self.user, nome="Bolt", especie="Cão", raca="SRD", data_nascimento=date(2018, 2, 3), peso=20)
+        Evento.objects.create(pet=pet, tipo='vacina', data=date(2024, 3, 4), observacoes="Dose, anual", concluido=True)
+        Evento.objects.create(pet=pet, tipo='medicamento', data=date(2024, 3, 5), recorrencia='semanal', dias_semana='0,3')
+        Meta.objects.create(pet=pet, descricao="Passear", data_prazo=date(2024, 6, 1), progresso=40)
+        ItemCompra.objects.create(pet=pet, descricao="Ração")
+        campos = lambda: (
+            list(Pet.objects.values_list('tutor_id', 'nome', 'raca', 'peso')),
+            list(Evento.objects.order_by('data').values_list('tipo', 'data', 'observacoes', 'concluido', 'recorrencia', 'dias_semana')),
+            list(Meta.objects.values_list('descricao', 'progresso')),
+            list(ItemCompra.objects.values_list('descricao', 'comprado')),
+        )
+        original = campos()
+        for formato in exportacao.FORMATOS:
+            with self.subTest(formato=formato):
+                caminho = os.path.join(self.pasta, f'backup.{formato}')
+                with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+                    arquivo.writelines(exportacao.linhas(formato, tutores=[self.user.pk]))
+                Pet.objects.all().delete()
+                self.importar(caminho)
+                self.assertEqual(campos(), original)
+
+
+# ===============================================
+# LEMBRETES DE EVENTOS
+# ===============================================
+class TesteLembretes(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_lembrete', password='testpass123', email='tutor@example.com')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="Thor", especie="Cão", data_nascimento=date(2020, 1, 1), peso=10)
+        sem_email = User.objects.create_user(username='sem_email', password='testpass123')
+        cls.pet_sem_email = Pet.objects.create(tutor=sem_email, nome="Mia", especie="Gato", data_nascimento=date(2020, 1, 1), peso=4)
+
+    def setUp(self):
+        self.hoje = timezone.localdate()
+
+    def evento(self, dias, pet=None, **extra):
+        return Evento.objects.create(pet=pet or self.pet, tipo='vacina', data=self.hoje + timedelta(days=dias), **extra)
+
+    def test_enfileira_proximos_e_atrasados_e_envia(self):
+        proximo = self.evento(2)
+        atrasado = self.evento(-5)
+        self.evento(10)                          # fora da antecedência
+        self.evento(-1, concluido=True)          # concluído
+        self.evento(1, pet=self.pet_sem_email)   # tutor sem e-mail
+
+        lembretes.varrer()
+        self.assertEqual(
+            set(Lembrete.objects.values_list('evento_id', 'tipo')),
+            {(proximo.pk, 'proximo'), (atrasado.pk, 'atrasado')},
+        )
+        resultado = lembretes.enviar_pendentes()
+        self.assertEqual(resultado['enviado'], 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, ['tutor@example.com'])
+        self.assertFalse(Lembrete.objects.filter(situacao='pendente').exists())
+
+    def test_varredura_idempotente_e_incremental(self):
+        self.evento(1)
+        lembretes.varrer()
+        # Reiniciar do zero (sem marca d'água) não duplica a fila
+        VarreduraLembretes.objects.all().delete()
+        lembretes.varrer()
+        self.assertEqual(Lembrete.objects.count(), 1)
+
+        # Execução seguinte: só os dias novos e os eventos alterados
+        novo = self.evento(0)
+        with CaptureQueriesContext(connection) as consultas:
+            lembretes.varrer()
+        self.assertTrue(Lembrete.objects.filter(evento=novo).exists())
+        self.assertTrue(all("'pets_evento'" not in q['sql'] or 'atualizado_em' in q['sql'] for q in consultas.captured_queries))
+
+        # Dia seguinte: o evento de amanhã vira "hoje" (já enfileirado), o de ontem fica atrasado
+        lembretes.varrer(hoje=self.hoje + timedelta(days=2))
+        self.assertEqual(Lembrete.objects.filter(tipo='atrasado').count(), 2)
+        self.assertEqual(Lembrete.objects.count(), 4)
+
+    def test_cancela_evento_concluido_antes_do_envio(self):
+        evento = self.evento(1)
+        lembretes.varrer()
+        evento.concluido = True
+        evento.save()
+        self.assertEqual(lembretes.enviar_pendentes()['cancelado'], 1)
+        self.assertEqual(mail.outbox, [])
+
+    def test_comando(self):
+        self.evento(3)
+        saida = StringIO()
+        call_command('lembretes', stdout=saida)
+        self.assertIn('1 enviado', saida.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_envia_fora_da_transacao_da_reserva(self):
+        self.evento(1)
+        lembretes.varrer()
+        blocos = len(connection.atomic_blocks)  # os do próprio TestCase
+        durante_o_envio = []
+
+        def enviar(mensagem, *args, **kwargs):
+            durante_o_envio.append((len(connection.atomic_blocks), Lembrete.objects.get().situacao))
+            return 1
+
+        with mock.patch.object(mail.EmailMessage, 'send', enviar):
+            self.assertEqual(lembretes.enviar_pendentes()['enviado'], 1)
+        self.assertEqual(durante_o_envio, [(blocos, 'enviando')])
+        self.assertEqual(Lembrete.objects.get().situacao, 'enviado')
+
+    def test_reserva_abandonada_volta_para_a_fila(self):
+        self.evento(1)
+        self.evento(2)
+        lembretes.varrer()
+        abandonado, em_andamento = Lembrete.objects.order_by('id')
+        agora = timezone.now()
+        Lembrete.objects.filter(pk=abandonado.pk).update(situacao='enviando', reservado_em=agora - lembretes.PRAZO_RESERVA - timedelta(minutes=1))
+        Lembrete.objects.filter(pk=em_andamento.pk).update(situacao='enviando', reservado_em=agora)
+        self.assertEqual(lembretes.enviar_pendentes()['enviado'], 1)
+        self.assertEqual(
+            dict(Lembrete.objects.values_list('pk', 'situacao')),
+            {abandonado.pk: 'enviado', em_andamento.pk: 'enviando'},
+        )
+
+
+# ===============================================
+# EVENTOS RECORRENTES
+# ===============================================
+class TesteEventosRecorrentes(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_recorrente', password='testpass123', email='rec@example.com')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="Luna", especie="Gata", data_nascimento=date(2021, 1, 1), peso=4)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def serie(self, **regra):
+        dados = {'pet': self.pet, 'tipo': 'medicamento', 'data': date(2024, 1, 31), 'recorrencia': 'diaria', **regra}
+        return Evento.objects.create(**dados)
+
+    def test_expansao_diaria_so_na_janela(self):
+        evento = self.serie(data=date(2020, 1, 1), intervalo=3, repetir_ate=date(2025, 12, 31))
+        self.assertEqual(
+            list(recorrencia.datas(evento, date(2024, 6, 1), date(2024, 6, 10))),
+            [date(2024, 6, 2), date(2024, 6, 5), date(2024, 6, 8)],
+        )
+        self.assertEqual(list(recorrencia.datas(evento, date(2026, 1, 1), date(2026, 1, 31))), [])
+
+    def test_expansao_semanal_e_mensal(self):
+        semanal = self.serie(data=date(2024, 1, 1), recorrencia='semanal', intervalo=2, dias_semana='0,3')
+        self.assertEqual(
+            list(recorrencia.datas(semanal, date(2024, 1, 1), date(2024, 1, 21))),
+            [date(2024, 1, 1), date(2024, 1, 4), date(2024, 1, 15), date(2024, 1, 18)],
+        )
+        mensal = self.serie(recorrencia='mensal')
+        self.assertEqual(
+            list(recorrencia.datas(mensal, date(2024, 2, 1), date(2024, 4, 30))),
+            [date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)],
+        )
+
+    def test_serie_e_uma_linha_e_lista_mostra_a_janela(self):
+        hoje = date.today()
+        resposta = self.client.post(f'/pets/{self.pet.pk}/eventos/adicionar/', {
+            'tipo': 'medicamento', 'data': (hoje - timedelta(days=1800)).isoformat(), 'recorrencia': 'diaria', 'intervalo': '1',
+        })
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(Evento.objects.filter(pet=self.pet).count(), 1)
+
+        resposta = self.client.get(f'/pets/{self.pet.pk}/eventos/')
+        self.assertEqual([o.data for o in resposta.context['ocorrencias']], [hoje + timedelta(days=i) for i in range(14)])
+
+    def test_concluir_ocorrencia_grava_excecao(self):
+        evento = self.serie(data=date.today())
+        amanha = date.today() + timedelta(days=1)
+        resposta = self.client.get(f'/pets/eventos/{evento.pk}/concluir/?data={amanha.isoformat()}')
+        self.assertEqual(resposta.status_code, 302)
+        self.assertTrue(ExcecaoRecorrencia.objects.filter(evento=evento, data=amanha).exists())
+        evento.refresh_from_db()
+        self.assertFalse(evento.concluido)
+
+        ocorrencias = self.client.get(f'/pets/{self.pet.pk}/eventos/').context['ocorrencias']
+        self.assertEqual([o.concluido for o in ocorrencias[:3]], [False, True, False])
+
+        # Data fora da regra não é aceita
+        self.client.get(f'/pets/eventos/{evento.pk}/concluir/?data=2000-01-01')
+        self.assertEqual(ExcecaoRecorrencia.objects.count(), 1)
+
+    def test_janela_nos_extremos_do_calendario(self):
+        self.serie(data=date(1950, 1, 1), recorrencia='semanal', intervalo=52)
+        for de, inicio in (('9999-12-31', views.DATA_MAXIMA), ('0001-01-01', views.DATA_MINIMA)):
+            resposta = self.client.get(f'/pets/{self.pet.pk}/eventos/?de={de}')
+            self.assertEqual(resposta.status_code, 200)
+            self.assertEqual(resposta.context['janela_inicio'], inicio)
+
+    def test_lembretes_das_ocorrencias(self):
+        evento = self.serie(data=date.today() - timedelta(days=400), recorrencia='diaria')
+        ExcecaoRecorrencia.objects.create(evento=evento, data=date.today() + timedelta(days=1))
+        lembretes.varrer(antecedencia=2)
+        datas_proximas = sorted(Lembrete.objects.filter(tipo='proximo').values_list('data_evento', flat=True))
+        self.assertEqual(datas_proximas, [date.today(), date.today() + timedelta(days=2)])
+        self.assertEqual(lembretes.enviar_pendentes()['enviado'], Lembrete.objects.count())
+
+
+# ===============================================
+# AGENDA E FEED iCALENDAR
+# ===============================================
+class TesteAgenda(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_agenda', password='testpass123')
+        cls.hoje = date.today()
+        cls.pets = [
+            Pet.objects.create(tutor=cls.user, nome=nome, especie="Cão", data_nascimento=date(2020, 1, 1), peso=8)
+            for nome in ("Apolo", "Bidu", "Cacau")
+        ]
+        for i, pet in enumerate(cls.pets):
+            Evento.objects.create(pet=pet, tipo='vacina', data=cls.hoje + timedelta(days=i), observacoes="Dose; reforço, anual")
+            Evento.objects.create(pet=pet, tipo='consulta', data=cls.hoje + timedelta(days=200))
+        Evento.objects.create(pet=cls.pets[0], tipo='medicamento', data=cls.hoje, recorrencia='semanal')
+        outro = User.objects.create_user(username='outro_agenda', password='testpass123')
+        alheio = Pet.objects.create(tutor=outro, nome="Alheio", especie="Gato", data_nascimento=date(2020, 1, 1), peso=3)
+        Evento.objects.create(pet=alheio, tipo='vacina', data=cls.hoje)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_agenda_de_todos_os_pets_em_uma_consulta_por_faixa(self):
+        # sessão + usuário + eventos únicos (JOIN pet) + séries (JOIN pet) + conclusões das séries
+        with self.assertNumQueries(5), CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get('/pets/agenda/')
+        unicos = consultas.captured_queries[2]['sql']
+        self.assertIn('INNER JOIN "pets_pet"', unicos)
+        self.assertIn('BETWEEN', unicos)
+        itens = resposta.context['itens']
+        self.assertEqual([(item.data, item.pet.nome) for item in itens[:4]], [
+            (self.hoje, "Apolo"), (self.hoje, "Apolo"), (self.hoje + timedelta(days=1), "Bidu"), (self.hoje + timedelta(days=2), "Cacau"),
+        ])
+        self.assertEqual(len(itens), 3 + 5)  # 3 vacinas + 5 semanas da série em 30 dias
+        self.assertNotContains(resposta, "Alheio")
+
+    def test_feed_ics_com_token_e_get_condicional(self):
+        url = self.client.get('/pets/agenda/').context['url_feed']
+        self.client.logout()
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        conteudo = b''.join(resposta.streaming_content).decode()
+        self.assertTrue(conteudo.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(conteudo.count('BEGIN:VEVENT'), 7)
+        self.assertIn('RRULE:FREQ=WEEKLY;INTERVAL=1', conteudo)
+        self.assertIn('DESCRIPTION:Dose\; reforço\\, anual', conteudo)
+        self.assertNotIn('Alheio', conteudo)
+
+        with self.assertNumQueries(2):  # token (usuário) + carimbo
+            nao_modificado = self.client.get(url, HTTP_IF_NONE_MATCH=resposta['ETag'])
+        self.assertEqual(nao_modificado.status_code, 304)
+
+        Evento.objects.filter(pet=self.pets[1]).first().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=resposta['ETag']).status_code, 200)
+
+    def test_agenda_nos_extremos_do_calendario(self):
+        for consulta in ('de=0001-01-01', 'de=9999-12-30', 'de=9999-12-31&ate=9999-12-31', 'de=2024-01-01&ate=9999-12-31'):
+            resposta = self.client.get(f'/pets/agenda/?{consulta}')
+            self.assertEqual(resposta.status_code, 200, consulta)
+            self.assertLess(resposta.context['fim'] - resposta.context['inicio'], timedelta(days=views.JANELA_AGENDA_MAXIMA))
+
+    def test_token_invalido(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/pets/agenda/calendario.ics?token=1-abc').status_code, 403)
+        self.assertEqual(self.client.get('/pets/agenda/calendario.ics').status_code, 403)
+
+
+# ===============================================
+# BUSCA TEXTUAL
+# ===============================================
+class TesteBusca(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_busca', password='testpass123')
+        cls.rex = Pet.objects.create(tutor=cls.user, nome="Rex", especie="Cão", raca="Labrador", data_nascimento=date(2020, 1, 1), peso=20)
+        cls.mia = Pet.objects.create(tutor=cls.user, nome="Mia", especie="Gato", data_nascimento=date(2021, 1, 1), peso=4)
+        cls.evento = Evento.objects.create(
+            pet=cls.rex, tipo='consulta', data=date(2025, 3, 1),
+            observacoes="Alergia alimentar, trocar ração. Voltar se a alergia piorar.",
+        )
+        Evento.objects.create(pet=cls.mia, tipo='consulta', data=date(2025, 3, 2), observacoes="Suspeita de alergia")
+        Meta.objects.create(pet=cls.mia, descricao="Perder peso com ração light", data_prazo=date(2025, 12, 1))
+        ItemCompra.objects.create(pet=cls.rex, descricao="Ração hipoalergênica")
+        outro = User.objects.create_user(username='outro_busca', password='testpass123')
+        alheio = Pet.objects.create(tutor=outro, nome="Thor", especie="Cão", data_nascimento=date(2020, 1, 1), peso=30)
+        Evento.objects.create(pet=alheio, tipo='consulta', data=date(2025, 3, 1), observacoes="Alergia grave")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_resultados_do_tutor_ordenados_por_relevancia(self):
+        resultados = busca.buscar(self.user, "alergia")
+        self.assertEqual([r.objeto for r in resultados], [self.evento, Evento.objects.get(pet=self.mia)])
+        self.assertIn('<mark>', resultados[0].trecho_html)
+
+    def test_prefixo_acentos_e_varias_tabelas(self):
+        registros = {r.registro for r in busca.buscar(self.user, "racao")}
+        self.assertEqual(registros, {'evento', 'meta', 'item_compra'})
+        self.assertEqual([r.objeto for r in busca.buscar(self.user, "labra")], [self.rex])
+
+    def test_indice_acompanha_alteracoes_e_exclusoes(self):
+        self.evento.observacoes = "Otite no ouvido esquerdo"
+        self.evento.save()
+        self.assertEqual([r.objeto for r in busca.buscar(self.user, "otite")], [self.evento])
+        self.assertNotIn(self.evento, [r.objeto for r in busca.buscar(self.user, "alergia")])
+        self.rex.delete()
+        self.assertEqual(busca.buscar(self.user, "otite"), [])
+
+    def test_pagina_e_api(self):
+        resposta = self.client.get('/pets/busca/', {'q': 'alergia'})
+        self.assertContains(resposta, '<mark>Alergia</mark>', html=False)
+        self.assertNotContains(resposta, "Thor")
+        dados = self.client.get('/api/v1/busca/', {'q': 'alergia', 'limite': 1}).json()['resultados']
+        self.assertEqual(len(dados), 1)
+        self.assertEqual((dados[0]['tipo'], dados[0]['id'], dados[0]['pet_id']), ('evento', self.evento.pk, self.rex.pk))
+        self.assertEqual(self.client.get('/api/v1/busca/').status_code, 400)
+
+    def test_sintaxe_do_fts5_nao_escapa_da_consulta(self):
+        self.assertEqual(busca.buscar(self.user, '" OR tutor : *'), [])
+        self.assertEqual(len(busca.buscar(self.user, 'alergia" OR "thor')), 0)
+
+
+# ===============================================
+# HISTÓRICO DE PESO
+# ===============================================
+class TestePesos(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_peso', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="Bolt", especie="Cão", data_nascimento=date(2020, 1, 1), peso=10)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def editar(self, peso):
+        return self.client.post(f'/pets/{self.pet.pk}/edit/', {
+            'nome': 'Bolt', 'especie': 'Cão', 'data_nascimento': '2020-01-01', 'peso': peso,
+        })
+
+    def test_registra_so_quando_o_peso_muda(self):
+        self.assertEqual(list(self.pet.pesos.values_list('peso', flat=True)), [10])
+        self.editar('10.00')
+        self.editar('11.5')
+        self.pet.refresh_from_db()
+        self.pet.nome = "Bolt II"
+        self.pet.save(update_fields=['nome'])
+        self.assertEqual([float(p) for p in self.pet.pesos.order_by('pk').values_list('peso', flat=True)], [10, 11.5])
+
+    def test_anos_de_pesagens_diarias_viram_poucos_pontos_agregados_no_banco(self):
+        inicio = timezone.make_aware(timezone.datetime(2022, 1, 3, 8))
+        PesoRegistro.objects.bulk_create(
+            PesoRegistro(pet=self.pet, peso=10 + (dia % 7), registrado_em=inicio + timedelta(days=dia))
+            for dia in range(3 * 365)
+        )
+        with self.assertNumQueries(2), CaptureQueriesContext(connection) as consultas:
+            dados = pesos.serie(self.pet, inicio=inicio, fim=inicio + timedelta(days=3 * 365), pontos=200)
+        self.assertIn('GROUP BY', consultas.captured_queries[1]['sql'])
+        self.assertEqual(dados['periodo'], 'semana')
+        self.assertLessEqual(len(dados['pontos']), 200)
+        # 2022-01-03 é uma segunda-feira: a primeira semana tem os pesos 10..16
+        self.assertEqual(
+            {chave: dados['pontos'][0][chave] for chave in ('minimo', 'maximo', 'media', 'quantidade')},
+            {'minimo': 10, 'maximo': 16, 'media': 13, 'quantidade': 7},
+        )
+
+    def test_endpoint_do_grafico(self):
+        self.editar('12')
+        dados = self.client.get(f'/api/v1/pets/{self.pet.pk}/pesos/').json()
+        self.assertIsNone(dados['periodo'])
+        self.assertEqual([p['media'] for p in dados['pontos']], [10, 12])
+        self.assertEqual(self.client.get(f'/api/v1/pets/{self.pet.pk}/pesos/', {'pontos': 1}).status_code, 400)
+        outro = User.objects.create_user(username='outro_peso', password='testpass123')
+        self.client.force_login(outro)
+        self.assertEqual(self.client.get(f'/api/v1/pets/{self.pet.pk}/pesos/').status_code, 404)
+
+
+# ===============================================
+# RELATÓRIOS DA CLÍNICA
+# ===============================================
+class TesteRelatorios(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoje = date(2025, 6, 15)
+        cls.equipe = User.objects.create_user(username='clinica_rel', password='testpass123', is_staff=True)
+        cls.ana = User.objects.create_user(username='ana', password='testpass123')
+        cls.bia = User.objects.create_user(username='bia', password='testpass123')
+        cao = Pet.objects.create(tutor=cls.ana, nome="Rex", especie="Cão", data_nascimento=date(2020, 1, 1), peso=20)
+        gato = Pet.objects.create(tutor=cls.bia, nome="Mia", especie="Gato", data_nascimento=date(2020, 1, 1), peso=4)
+        for pet, data in ((cao, date(2025, 5, 2)), (cao, date(2025, 5, 20)), (gato, date(2025, 5, 3)), (gato, date(2025, 6, 1))):
+            Evento.objects.create(pet=pet, tipo='vacina', data=data, concluido=True)
+        Evento.objects.create(pet=cao, tipo='consulta', data=date(2025, 6, 1))
+        Evento.objects.create(pet=cao, tipo='banho', data=date(2025, 6, 10))
+        Evento.objects.create(pet=gato, tipo='consulta', data=date(2025, 6, 14))
+        Meta.objects.create(pet=cao, descricao="Perder peso", data_prazo=date(2025, 1, 1), progresso=100)
+        Meta.objects.create(pet=cao, descricao="Passear", data_prazo=date(2025, 1, 1), progresso=50)
+        ItemCompra.objects.create(pet=cao, descricao="Ração", comprado=True)
+        ItemCompra.objects.create(pet=gato, descricao="ração ")
+        ItemCompra.objects.create(pet=gato, descricao="Areia")
+
+    def linhas(self, tipo):
+        return relatorios.RELATORIOS[tipo](self.hoje)
+
+    def test_agregados_agrupados_no_banco(self):
+        with self.assertNumQueries(1), CaptureQueriesContext(connection) as consultas:
+            vacinas = self.linhas('vacinas_por_mes')
+        self.assertIn('GROUP BY', consultas.captured_queries[0]['sql'])
+        self.assertEqual([(l['mes'], l['especie'], l['total']) for l in vacinas], [
+            ('2025-05', 'Cão', 2), ('2025-05', 'Gato', 1), ('2025-06', 'Gato', 1),
+        ])
+        self.assertEqual([(l['tutor'], l['total'], l['mais_antigo']) for l in self.linhas('atrasados_por_tutor')], [
+            ('ana', 2, date(2025, 6, 1)), ('bia', 1, date(2025, 6, 14)),
+        ])
+        metas = self.linhas('metas_por_especie')
+        self.assertEqual((metas[0]['especie'], metas[0]['taxa_conclusao'], metas[0]['vencidas'], metas[0]['progresso_medio']), ("Cão", 50.0, 1, 75.0))
+        self.assertEqual([(l['item'], l['total'], l['comprados']) for l in self.linhas('itens_mais_pedidos')], [
+            ('ração', 2, 1), ('areia', 1, 0),
+        ])
+
+    def test_pagina_le_so_os_snapshots(self):
+        call_command('relatorios', '--manter', '1', stdout=StringIO())
+        call_command('relatorios', '--manter', '1', stdout=StringIO())
+        self.assertEqual(RelatorioSnapshot.objects.count(), len(relatorios.RELATORIOS))
+
+        self.client.force_login(self.equipe)
+        # sessão + usuário + snapshots mais recentes
+        with self.assertNumQueries(3), CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get('/pets/relatorios/')
+        self.assertFalse(any('pets_evento' in consulta['sql'] for consulta in consultas.captured_queries))
+        self.assertContains(resposta, "Vacinas por mês e espécie")
+        self.assertContains(resposta, "areia")
+
+        self.client.force_login(self.ana)
+        self.assertEqual(self.client.get('/pets/relatorios/').status_code, 403)
+
+
+# ===============================================
+# INSTRUMENTAÇÃO (SERVER-TIMING, /metrics, N+1)
+# ===============================================
+class TesteInstrumentacao(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_metricas', password='testpass123')
+        cls.equipe = User.objects.create_user(username='equipe_metricas', password='testpass123', is_staff=True)
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="Nina", especie="Gato", data_nascimento=date(2021, 1, 1), peso=4)
+
+    def setUp(self):
+        cache.clear()
+        instrumentacao.registro.limpar()
+        self.client.force_login(self.user)
+
+    def test_server_timing_com_consultas_banco_e_template(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(f'/pets/{self.pet.pk}/visao-geral/')
+        cabecalho = resposta['Server-Timing']
+        self.assertIn(f'desc="{len(consultas)} consultas"', cabecalho)
+        self.assertRegex(cabecalho, r'tpl;dur=\d+\.\d')
+        self.assertRegex(cabecalho, r'total;dur=\d+\.\d')
+
+    def test_metricas_prometheus_por_rota(self):
+        self.client.get(f'/pets/{self.pet.pk}/visao-geral/')
+        self.client.get(f'/pets/{self.pet.pk}/eventos/')
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+        self.client.force_login(self.equipe)
+        texto = self.client.get('/metrics').content.decode()
+        self.assertIn('vetlab_requisicoes_total{view="pet_visao_geral",metodo="GET",status="2xx"} 1', texto)
+        self.assertIn('vetlab_requisicao_segundos_count{view="evento_list"} 1', texto)
+        self.assertIn('vetlab_requisicao_segundos_bucket{view="evento_list",le="+Inf"} 1', texto)
+        self.assertIn('# TYPE vetlab_db_consultas_total counter', texto)
+
+        with self.settings(VETLAB_METRICAS_TOKEN='segredo'):
+            self.client.logout()
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo').status_code, 200)
+
+    def test_metricas_grandes_sem_notacao_cientifica(self):
+        self.client.get(f'/pets/{self.pet.pk}/eventos/')
+        somas = instrumentacao.registro.somas['evento_list']
+        somas['consultas'], somas['total'] = 1234567, 98765.4321
+        texto = instrumentacao.registro.texto_prometheus()
+        self.assertIn('vetlab_db_consultas_total{view="evento_list"} 1234567\n', texto)
+        self.assertIn('vetlab_requisicao_segundos_sum{view="evento_list"} 98765.4321\n', texto)
+        self.assertIn('le="0.005"', texto)
+        self.assertNotIn('e+', texto)
+
+    def test_consultas_repetidas_geram_aviso_de_n_mais_1(self):
+        def view_com_n_mais_1(request):
+            for evento in Evento.objects.filter(pet__tutor=request.user):
+                evento.pet.nome  # sem select_related: uma consulta por evento
+            return HttpResponse('ok')
+
+        for dia in range(6):
+            Evento.objects.create(pet=self.pet, tipo='banho', data=date(2025, 1, 1) + timedelta(days=dia))
+        middleware = instrumentacao.InstrumentacaoMiddleware(view_com_n_mais_1)
+        requisicao = RequestFactory().get('/n-mais-1/')
+        requisicao.user = self.user
+        with self.assertLogs('pets.instrumentacao', 'WARNING') as logs:
+            middleware(requisicao)
+        self.assertIn('mesma consulta executada 6 vezes', logs.output[0])
+        self.assertIn('pets_pet', logs.output[0])
+
+
+# ===============================================
+# BASE SINTÉTICA E BENCHMARK
+# ===============================================
+class TesteBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.criados = semente.semear(2, 2, 30, metas_por_pet=1, itens_por_pet=2, pesagens_por_pet=3, prefixo='teste', tamanho_lote=3)
+        cls.tutor = User.objects.get(username='teste_000000')
+
+    def test_seed_em_lotes_e_deterministico(self):
+        self.assertEqual(self.criados, {'tutores': 2, 'pets': 4, 'eventos': 120, 'metas': 4, 'itens': 8, 'pesagens': 12})
+        for stats in PetStats.objects.filter(pet__tutor__username__startswith='teste_'):
+            self.assertEqual(stats.como_dict(), PetStats.calcular([stats.pet_id])[0].como_dict())
+        semente.semear(2, 2, 30, metas_por_pet=1, itens_por_pet=2, pesagens_por_pet=3, prefixo='outro', tamanho_lote=3)
+
+        def eventos(prefixo):
+            return list(Evento.objects.filter(pet__tutor__username__startswith=prefixo).order_by('pk').values_list('tipo', 'data', 'concluido'))
+        self.assertEqual(eventos('teste_'), eventos('outro_'))
+
+    def test_todas_as_rotas_medidas_sem_alterar_a_base(self):
+        antes = list(Evento.objects.order_by('pk').values_list('concluido', flat=True))
+        resultado = benchmark.executar(self.tutor, repeticoes=2, aquecimento=0)
+        nomes = {nome for nome, _ in benchmark.rotas(benchmark.alvos(self.tutor))} - benchmark.SO_EQUIPE
+        self.assertEqual(set(resultado['rotas']), nomes)
+        self.assertIn('evento_concluir', nomes)
+        self.assertNotIn('logout', nomes)
+        for nome, medida in resultado['rotas'].items():
+            self.assertLess(medida['status'], 500, nome)
+            self.assertGreater(medida['consultas'], 0, nome)
+        self.assertEqual(list(Evento.objects.order_by('pk').values_list('concluido', flat=True)), antes)
+        json.dumps(resultado)
+
+    def test_comparacao_com_baseline(self):
+        baseline = {'rotas': {'pet_list': {'consultas': 4, 'p95_ms': 10.0}, 'agenda': {'consultas': 4, 'p95_ms': 10.0}}}
+        atual = {'rotas': {'pet_list': {'consultas': 5, 'p95_ms': 10.5}, 'agenda': {'consultas': 4, 'p95_ms': 30.0}, 'busca': {'consultas': 9, 'p95_ms': 1.0}}}
+        regressoes = benchmark.comparar(atual, baseline, tolerancia=0.25)
+        self.assertEqual(len(regressoes), 2)
+        self.assertIn('pet_list: 5 consultas (antes 4)', regressoes[0])
+        self.assertIn('agenda: p95 30.0 ms', regressoes[1])
+
+    def test_ajuda_do_comando(self):
+        saida = StringIO()
+        with self.assertRaises(SystemExit), mock.patch('sys.stdout', saida):
+            call_command('benchmark_vetlab', '--help')
+        self.assertIn(f"(padrão: {benchmark.TOLERANCIA:.0%})", saida.getvalue())
+
+    def test_sessoes_sem_consultas_no_cache_e_no_cookie(self):
+        total = Evento.objects.count()
+        modos = benchmark.sessoes(self.tutor, repeticoes=2, aquecimento=1)['modos']
+        self.assertEqual(Evento.objects.count(), total)
+        self.assertEqual({modo: medida['falhas'] for modo, medida in modos.items()}, dict.fromkeys(benchmark.MODOS_SESSAO, 0))
+        # Uma leitura da sessão por requisição no 'db'; mensagens na sessão ainda gravam nela
+        self.assertEqual(modos['db']['consultas_sessao'], 2)
+        self.assertGreater(modos['db_mensagens_na_sessao']['consultas_sessao'], 2)
+        for modo in ('cached_db', 'signed_cookies'):
+            self.assertEqual(modos[modo]['consultas_sessao'], 0, modo)
+            self.assertEqual(modos[modo]['economia_por_requisicao'], 1, modo)
+
+    def test_perfil_de_producao_exige_secret_key(self):
+        def carregar(**env):
+            ambiente = {chave: valor for chave, valor in os.environ.items() if chave != 'SECRET_KEY'}
+            codigo = 'from django.conf import settings; print(settings.SECRET_KEY[:15])'
+            return subprocess.run(
+                [sys.executable, '-c', codigo], capture_output=True, text=True, cwd=settings.BASE_DIR,
+                env={**ambiente, 'DJANGO_SETTINGS_MODULE': 'project.settings', **env},
+            )
+
+        sem_chave = carregar(VETLAB_PERFIL='producao')
+        self.assertNotEqual(sem_chave.returncode, 0)
+        self.assertIn('exige a variável de ambiente SECRET_KEY', sem_chave.stderr)
+        self.assertEqual(carregar(VETLAB_PERFIL='producao', SECRET_KEY='chave-de-producao').stdout.strip(), 'chave-de-produc')
+        self.assertEqual(carregar().stdout.strip(), 'django-insecure')
+
+    def test_transferencia_com_gzip_e_loader_em_cache(self):
+        # Como no perfil de produção: GZip logo depois do WhiteNoise e loaders explícitos (em cache)
+        middleware = list(settings.MIDDLEWARE)
+        middleware.insert(middleware.index('pets.estaticos.WhiteNoiseMiddleware') + 1, 'django.middleware.gzip.GZipMiddleware')
+        templates = [{**settings.TEMPLATES[0], 'APP_DIRS': False, 'OPTIONS': {
+            **settings.TEMPLATES[0]['OPTIONS'],
+            'loaders': [('django.template.loaders.cached.Loader', benchmark.LOADERS_SEM_CACHE)],
+        }}]
+        # Sem collectstatic no teste: o WhiteNoise procura os estáticos nas apps
+        with override_settings(MIDDLEWARE=middleware, TEMPLATES=templates, WHITENOISE_USE_FINDERS=True, WHITENOISE_AUTOREFRESH=True):
+            resultado = benchmark.transferencia(self.tutor, repeticoes=1, somente=['evento_list'])
+        pagina = resultado['paginas']['evento_list']
+        self.assertEqual((pagina['status'], pagina['content_encoding']), (200, 'gzip'))
+        self.assertLess(pagina['bytes_transferidos'], pagina['bytes_html'] / 2)
+        self.assertGreater(pagina['render_ms'], 0)
+        self.assertEqual(resultado['estaticos']['/static/pets/style.css']['status'], 200)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_mensagens_no_cookie_com_sessao_assinada(self):
+        self.client.force_login(self.tutor)
+        pet = Pet.objects.filter(tutor=self.tutor).first()
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.post(f'/pets/{pet.pk}/eventos/adicionar/', {'tipo': 'consulta', 'data': '2025-11-20'}, follow=True)
+        self.assertContains(resposta, "Evento adicionado!")
+        self.assertFalse(any('django_session' in consulta['sql'] for consulta in consultas.captured_queries))
+
+
+# ===============================================
+# PERFORMANCE: VIEWS ASSÍNCRONAS (ASGI)
+# ===============================================
+@override_settings(ROOT_URLCONF='project.urls_assincronas')
+class TesteViewsAssincronas(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_async', password='testpass123')
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="PetAsync", especie="Cão", data_nascimento=date(2018, 6, 1), peso=12)
+        Evento.objects.create(pet=cls.pet, tipo='consulta', data=date(2024, 5, 1), observacoes='Checkup assíncrono')
+        Evento.objects.create(pet=cls.pet, tipo='vacina', data=date.today(), recorrencia='semanal', intervalo=1)
+        Meta.objects.create(pet=cls.pet, descricao='Meta assíncrona', data_prazo=date(2026, 1, 1), progresso=40)
+        ItemCompra.objects.create(pet=cls.pet, descricao='Item assíncrono')
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_paginas_de_leitura_sao_servidas_pelas_views_async(self):
+        await self.async_client.aforce_login(self.user)
+        paginas = {
+            '/pets/': 'PetAsync',
+            f'/pets/{self.pet.pk}/visao-geral/': 'Meta assíncrona',
+            f'/pets/{self.pet.pk}/eventos/': 'Checkup assíncrono',
+            f'/pets/{self.pet.pk}/metas/': 'Meta assíncrona',
+            f'/pets/{self.pet.pk}/compras/': 'Item assíncrono',
+        }
+        for url, texto in paginas.items():
+            with self.subTest(url=url):
+                resposta = await self.async_client.get(url)
+                self.assertTrue(iscoroutinefunction(resposta.resolver_match.func))
+                self.assertContains(resposta, texto)
+        self.assertEqual(len(resposta.context['itens_nao_comprados']), 1)
+
+    def test_mesmo_orcamento_de_consultas_das_views_sincronas(self):
+        # Métodos síncronos: assertNumQueries precisa abrir a conexão fora do event loop
+        get = async_to_sync(self.async_client.get)
+        async_to_sync(self.async_client.aforce_login)(self.user)
+        url = f'/pets/{self.pet.pk}/visao-geral/'
+        # sessão + usuário + carimbo + pet, eventos, metas e séries + conclusões da série
+        with self.assertNumQueries(8):
+            resposta = get(url)
+        self.assertEqual(resposta.context['total_eventos'], 2)
+        self.assertEqual(len(resposta.context['ocorrencias']), 1)
+        with self.assertNumQueries(3):  # do cache: sessão + usuário + carimbo
+            get(url)
+        with self.assertNumQueries(3):  # 304: só o carimbo, sem cache nem template
+            resposta = get(url, headers={'if-none-match': resposta['ETag']})
+        self.assertEqual(resposta.status_code, 304)
+
+    async def test_login_dono_e_post_continuam_valendo(self):
+        resposta = await self.async_client.get('/pets/')
+        self.assertRedirects(resposta, '/pets/login/?next=/pets/', fetch_redirect_response=False)
+
+        outro = await User.objects.acreate(username='intruso_async')
+        await self.async_client.aforce_login(outro)
+        for url in [f'/pets/{self.pet.pk}/visao-geral/', f'/pets/{self.pet.pk}/eventos/', f'/pets/{self.pet.pk}/metas/', f'/pets/{self.pet.pk}/compras/']:
+            with self.subTest(url=url):
+                self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+        await self.async_client.aforce_login(self.user)
+        resposta = await self.async_client.post(f'/pets/{self.pet.pk}/metas/', {'descricao': 'Via POST', 'data_prazo': '2026-05-01'})
+        self.assertRedirects(resposta, f'/pets/{self.pet.pk}/metas/', fetch_redirect_response=False)
+        self.assertContains(await self.async_client.get(f'/pets/{self.pet.pk}/metas/'), 'Via POST')
+
+    def test_instrumentacao_conta_as_consultas_async(self):
+        async_to_sync(self.async_client.aforce_login)(self.user)
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = async_to_sync(self.async_client.get)(f'/pets/{self.pet.pk}/eventos/')
+        self.assertIn(f'desc="{len(consultas)} consultas"', resposta['Server-Timing'])
+
+
+class TesteCargaWsgiAsgi(TransactionTestCase):
+    """As requisições da carga passam por threads (WSGI) e pelo event loop (ASGI): os dados precisam estar gravados."""
+
+    def test_carga_nos_dois_modos_e_custo_de_conexao(self):
+        semente.semear(1, 1, 5, metas_por_pet=1, itens_por_pet=1, prefixo='carga')
+        tutor = User.objects.get(username='carga_000000')
+        for modo in ('wsgi', 'asgi'):
+            with self.subTest(modo=modo):
+                resultado = benchmark.carga(tutor, modo, requisicoes=10, concorrencia=3)
+                self.assertEqual(resultado['falhas'], 0)
+                self.assertEqual(resultado['requisicoes'], 10)
+                self.assertGreater(resultado['req_por_s'], 0)
+        with self.assertRaises(ValueError):
+            benchmark.carga(tutor, 'cgi')
+
+        idade = connection.settings_dict['CONN_MAX_AGE']
+        resultado = benchmark.conexoes(tutor, requisicoes=6)
+        self.assertEqual(set(resultado['modos']), {'nova', 'persistente'})
+        self.assertEqual([medida['falhas'] for medida in resultado['modos'].values()], [0, 0])
+        self.assertIn('custo_conexao_ms', resultado)
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], idade)
+
+
+# ===============================================
+# TAREFAS EM SEGUNDO PLANO (FILA + WORKER)
+# ===============================================
+class TesteTarefas(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tutor_tarefas', password='testpass123')
+        cls.equipe = User.objects.create_user(username='equipe_tarefas', password='testpass123', is_staff=True)
+        cls.pet = Pet.objects.create(tutor=cls.user, nome="Rex", especie="Cão", data_nascimento=date(2020, 1, 1), peso=12)
+        Evento.objects.create(pet=cls.pet, tipo='vacina', data=date(2025, 3, 1))
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        configuracao = override_settings(VETLAB_ARQUIVOS_TAREFAS=pasta.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def rodar(self, trabalhador='w1'):
+        return [tarefas.executar(tarefa) for tarefa in tarefas.reivindicar(trabalhador, 10)]
+
+    def test_exportacao_enfileirada_pela_view_e_baixada_depois(self):
+        self.client.force_login(self.user)
+        resposta = self.client.post('/pets/exportar/', {'formato': 'jsonl'})
+        tarefa = Tarefa.objects.get()
+        self.assertRedirects(resposta, f'/pets/tarefas/{tarefa.pk}/')
+        self.assertEqual((tarefa.situacao, tarefa.argumentos), ('pendente', {'formato': 'jsonl', 'desde': None}))
+        self.assertContains(self.client.get(f'/pets/tarefas/{tarefa.pk}/'), 'http-equiv="refresh"')
+        self.assertEqual(self.client.get(f'/pets/tarefas/{tarefa.pk}/arquivo/').status_code, 404)
+
+        self.assertEqual(self.rodar(), ['concluida'])
+        self.assertContains(self.client.get(f'/pets/tarefas/{tarefa.pk}/'), "Baixar arquivo")
+        resposta = self.client.get(f'/pets/tarefas/{tarefa.pk}/arquivo/')
+        self.assertIn('attachment; filename="vetlab-tutor_tarefas.jsonl"', resposta['Content-Disposition'])
+        registros = [json.loads(linha) for linha in b''.join(resposta.streaming_content).decode().splitlines()]
+        self.assertEqual([r['registro'] for r in registros], ['pet', 'evento'])
+        resposta.close()
+
+        # Só o dono vê a tarefa
+        self.client.force_login(self.equipe)
+        self.assertEqual(self.client.get(f'/pets/tarefas/{tarefa.pk}/').status_code, 404)
+
+    def test_relatorios_atualizados_pelo_worker(self):
+        self.client.force_login(self.equipe)
+        resposta = self.client.post('/pets/relatorios/')
+        self.assertRedirects(resposta, '/pets/relatorios/')
+        self.assertFalse(RelatorioSnapshot.objects.exists())
+        self.assertEqual(self.rodar(), ['concluida'])
+        self.assertEqual(RelatorioSnapshot.objects.count(), len(relatorios.RELATORIOS))
+
+    def test_falha_volta_para_a_fila_com_espera_ate_o_maximo(self):
+        falhar = mock.Mock(side_effect=RuntimeError("SMTP fora do ar"))
+        with mock.patch.dict(tarefas.EXECUTORES, {'lembretes': falhar}):
+            tarefa = tarefas.enfileirar('lembretes', maximo_tentativas=2)
+            self.assertEqual(self.rodar(), ['pendente'])
+            tarefa.refresh_from_db()
+            self.assertEqual((tarefa.tentativas, tarefa.erro), (1, "RuntimeError: SMTP fora do ar"))
+            self.assertGreaterEqual(tarefa.executar_em, timezone.now() + tarefas.ESPERA_BASE - timedelta(seconds=1))
+            # Ainda esperando: nada a reivindicar
+            self.assertEqual(self.rodar(), [])
+
+            Tarefa.objects.update(executar_em=timezone.now())
+            self.assertEqual(self.rodar(), ['falhou'])
+            self.assertEqual(Tarefa.objects.get().tentativas, 2)
+
+            falhar.side_effect = tarefas.FalhaDefinitiva("Arquivo inválido")
+            tarefas.enfileirar('lembretes')
+            self.assertEqual(self.rodar(), ['falhou'])
+        self.assertLess(tarefas.espera(1), tarefas.espera(3))
+        self.assertLessEqual(tarefas.espera(20), tarefas.ESPERA_MAXIMA * 1.5)
+        with self.assertRaises(ValueError):
+            tarefas.enfileirar('desconhecida')
+
+    def test_reivindicacao_exclusiva_e_recuperacao_de_abandonadas(self):
+        primeira = tarefas.enfileirar('relatorios')
+        segunda = tarefas.enfileirar('relatorios')
+        self.assertEqual(tarefas.reivindicar('w1', 1), [primeira])
+        self.assertEqual(tarefas.reivindicar('w2', 5), [segunda])
+        self.assertEqual(tarefas.reivindicar('w3', 5), [])
+
+        # Tarefa longa de worker vivo: o batimento renovado (ou estar em andamento) impede a devolução
+        antigo = timezone.now() - tarefas.TEMPO_SEM_BATIMENTO * 2
+        Tarefa.objects.update(iniciada_em=antigo, atualizado_em=antigo)
+        self.assertEqual(tarefas.bater('w2', [segunda.pk]), 1)
+        self.assertEqual(tarefas.recuperar_abandonadas(em_andamento=[primeira.pk]), 0)
+
+        # w1 morreu: sem batimento a tarefa volta para a fila
+        self.assertEqual(tarefas.recuperar_abandonadas(), 1)
+        [retomada] = tarefas.reivindicar('w3', 5)
+        self.assertEqual((retomada.pk, retomada.tentativas), (primeira.pk, 2))
+        # O desfecho do worker antigo não sobrescreve o do novo
+        primeira.trabalhador = 'w1'
+        tarefas.executar(primeira)
+        self.assertEqual(Tarefa.objects.get(pk=primeira.pk).situacao, 'executando')
+
+    def test_arquivos_expirados_sao_apagados(self):
+        tarefa = tarefas.enfileirar('exportacao', tutor=self.user, formato='csv')
+        self.assertEqual(self.rodar(), ['concluida'])
+        self.assertEqual(tarefas.limpar_arquivos(), 0)
+        caminho = tarefas.caminho_do_arquivo(Tarefa.objects.get(pk=tarefa.pk).resultado['arquivo'])
+        velho = (timezone.now() - tarefas.VALIDADE_ARQUIVOS - timedelta(hours=1)).timestamp()
+        os.utime(caminho, (velho, velho))
+        self.assertEqual(tarefas.limpar_arquivos(), 1)
+        self.assertFalse(os.path.exists(caminho))
+
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(f'/pets/tarefas/{tarefa.pk}/'), "O arquivo expirou")
+        self.assertEqual(self.client.get(f'/pets/tarefas/{tarefa.pk}/arquivo/').status_code, 404)
+
+    def test_comandos_em_segundo_plano(self):
+        call_command('relatorios', '--segundo-plano', stdout=StringIO())
+        call_command('lembretes', '--segundo-plano', stdout=StringIO())
+        self.assertEqual(list(Tarefa.objects.values_list('tipo', flat=True).order_by('pk')), ['relatorios', 'lembretes'])
+        self.assertFalse(RelatorioSnapshot.objects.exists())
+
+
+class TesteVetlabWorker(TransactionTestCase):
+    """O worker roda as tarefas em threads, cada uma com sua conexão: os dados precisam estar gravados."""
+
+    def test_esvazia_a_fila_e_sai(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        tutor = User.objects.create_user(username='tutor_worker', password='testpass123')
+        Pet.objects.create(tutor=tutor, nome="Rex", especie="Cão", data_nascimento=date(2020, 1, 1), peso=12)
+        caminho = os.path.join(pasta.name, 'legado.jsonl')
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(json.dumps({'registro': 'pet', 'id': 'L1', 'tutor': 'tutor_worker', 'nome': 'Legado', 'especie': 'Gato', 'data_nascimento': '2019-05-01', 'peso': '4'}) + '\n')
+
+        with override_settings(VETLAB_ARQUIVOS_TAREFAS=pasta.name):
+            tarefas.enfileirar('exportacao', tutor=tutor, formato='csv')
+            tarefas.enfileirar('relatorios')
+            tarefas.enfileirar('lembretes')
+            call_command('import_vetlab', caminho, '--segundo-plano', stdout=StringIO())
+            saida = StringIO()
+            # Uma thread: o SQLite em memória dos testes (cache compartilhado) não espera
+            # por lock, falha na hora; com o banco em arquivo ou PostgreSQL use várias
+            call_command('vetlab_worker', '--uma-vez', '--threads', '1', '--intervalo', '0.1', stdout=saida)
+
+        self.assertEqual(set(Tarefa.objects.values_list('situacao', flat=True)), {'concluida'}, saida.getvalue())
+        self.assertTrue(Pet.objects.filter(nome='Legado').exists())
+        exportacao = Tarefa.objects.get(tipo='exportacao')
+        self.assertTrue(os.path.exists(os.path.join(pasta.name, exportacao.resultado['arquivo'])))
+
@@ -23,6 +23,7 @@ urlpatterns = [
     path('eventos/<int:pk>/editar/', views.evento_edit, name='evento_edit'),
     path('eventos/<int:pk>/excluir/', views.evento_delete, name='evento_delete'),
     path('eventos/<int:pk>/concluir/', views.evento_concluir, name='evento_concluir'),
+    path('eventos/lote/', views.evento_lote, name='evento_lote'),
 
     # --- ROTAS DE METAS ---
     path('<int:pet_pk>/metas/', views.meta_list, name='meta_list'),
@@ -35,4 +36,22 @@ urlpatterns = [
     path('<int:pet_pk>/compras/', views.shop_list_view, name='shop_list'),
     path('compras/<int:pk>/marcar/', views.shop_item_marcar, name='shop_item_marcar'),
     path('compras/<int:pk>/remover/', views.shop_item_remover, name='shop_item_remover'),
+    path('<int:pet_pk>/compras/lote/', views.shop_lote, name='shop_lote'),
+
+    # --- AGENDA (TODOS OS PETS) ---
+    path('agenda/', views.agenda_view, name='agenda'),
+    path('agenda/calendario.ics', views.agenda_ics, name='agenda_ics'),
+
+    # --- BUSCA ---
+    path('busca/', views.busca_view, name='busca'),
+
+    # --- RELATÓRIOS DA CLÍNICA ---
+    path('relatorios/', views.relatorios_view, name='relatorios'),
+
+    # --- EXPORTAÇÃO ---
+    path('exportar/', views.exportar_view, name='exportar'),
+
+    # --- TAREFAS EM SEGUNDO PLANO ---
+    path('tarefas/<int:pk>/', views.tarefa_detalhe, name='tarefa_detalhe'),
+    path('tarefas/<int:pk>/arquivo/', views.tarefa_arquivo, name='tarefa_arquivo'),
 ]
\ No newline at end of file
@@ -0,0 +1,18 @@
+# Rotas de pets/urls.py com as páginas de leitura nas versões assíncronas
+# (pets/views_assincronas.py). Usadas pelo project/urls_assincronas.py.
+from django.urls import path
+
+from . import urls, views_assincronas
+
+ASSINCRONAS = {
+    'pet_list': views_assincronas.pet_list,
+    'pet_visao_geral': views_assincronas.pet_visao_geral,
+    'evento_list': views_assincronas.evento_list,
+    'meta_list': views_assincronas.meta_list,
+    'shop_list': views_assincronas.shop_list_view,
+}
+
+urlpatterns = [
+    path(str(padrao.pattern), ASSINCRONAS[padrao.name], name=padrao.name) if padrao.name in ASSINCRONAS else padrao
+    for padrao in urls.urlpatterns
+]
@@ -2,17 +2,119 @@
 # IMPORTS NECESSÁRIOS
 # ==============================================================================
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
+from django.http import FileResponse, Http404, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
 from django.contrib import messages
-from .models import Pet, Evento, Meta, ItemCompra 
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Value
+from .models import Pet, Evento, Meta, ItemCompra, PetStats, ExcecaoRecorrencia, RelatorioSnapshot, Tarefa
+from .paginacao import paginar
+from .cache import em_cache
+from . import agenda, busca, exportacao, lote, recorrencia, relatorios, tarefas
 from decimal import Decimal, InvalidOperation 
-from datetime import date # <<< IMPORTAÇÃO CRÍTICA PARA A IDADE >>>
+from datetime import date, datetime, time, timedelta # <<< IMPORTAÇÃO CRÍTICA PARA A IDADE >>>
+import hashlib
+import os
 
 # Imports para o sistema de Login
 from django.contrib.auth.models import User
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.views.decorators.http import condition
 import traceback
 
+# Ordenações das listas paginadas por cursor. A última coluna é sempre o id,
+# para desempatar e tornar o cursor único; as primeiras seguem os índices compostos.
+ORDENACAO_EVENTOS = ('-data', 'id')
+ORDENACAO_METAS = ('progresso', 'data_prazo', 'id')
+ORDENACAO_ITENS_A_COMPRAR = ('criado_em', 'id')
+ORDENACAO_ITENS_COMPRADOS = ('-criado_em', '-id')
+
+# Janelas (em dias) em que as ocorrências dos eventos recorrentes são calculadas
+JANELA_OCORRENCIAS = 14
+JANELA_VISAO_GERAL = 7
+# Agenda de todos os pets: janela padrão e máxima (em dias)
+JANELA_AGENDA = 30
+JANELA_AGENDA_MAXIMA = 92
+# Datas aceitas em ?de=/?ate=: fora disso não há eventos, e as contas da janela
+# (e das recorrências, que andam até 365 meses) estourariam date.min/date.max
+DATA_MINIMA = date(1900, 1, 1)
+DATA_MAXIMA = date(2999, 12, 31)
+
+
+def limitar_data(data):
+    return min(max(data, DATA_MINIMA), DATA_MAXIMA)
+
+
+def pet_do_tutor(request, pk, queryset=None):
+    """Checagem de dono usada por todas as páginas por pet (e pela API): o pet ou 404."""
+    return get_object_or_404(Pet.objects.all() if queryset is None else queryset, pk=pk, tutor=request.user)
+
+
+def travar(instancia):
+    """
+    Relê `instancia` com SELECT ... FOR UPDATE (dentro de transaction.atomic()).
+    Os signals do PetStats aplicam o delta a partir do estado carregado: lido
+    fora da transação, duas requisições concorrentes (ou um clique duplo em
+    "excluir") aplicariam o mesmo delta duas vezes. 404 se a linha já foi apagada.
+    """
+    # Com o pet junto (sem travá-lo): os signals precisam do tutor para invalidar o cache
+    return get_object_or_404(type(instancia).objects.select_related('pet').select_for_update(of=('self',)), pk=instancia.pk)
+
+
+# ==============================================================================
+# GET CONDICIONAL (ETag / Last-Modified) DAS PÁGINAS POR PET
+# ==============================================================================
+# O carimbo do pet (Pet.carimbo: uma consulta por pk) é comparado com
+# If-None-Match / If-Modified-Since antes de qualquer consulta das listas ou
+# renderização de template; se nada mudou a resposta é um 304 sem corpo.
+
+def _carimbo_da_requisicao(request, kwargs):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    # Mensagens pendentes (ex.: erro de validação após um redirect) precisam ser
+    # renderizadas, então essa resposta não pode virar 304.
+    if len(messages.get_messages(request)):
+        return None
+    pk = kwargs.get('pk', kwargs.get('pet_pk'))
+    cache_carimbos = request.__dict__.setdefault('_carimbos_pet', {})
+    if pk not in cache_carimbos:
+        cache_carimbos[pk] = Pet.carimbo(pk, request.user)
+    return cache_carimbos[pk]
+
+
+def _ultima_modificacao_pet(request, *args, **kwargs):
+    carimbo = _carimbo_da_requisicao(request, kwargs)
+    if carimbo is None:
+        return None
+    # A idade na visão geral muda na virada do dia mesmo sem escrita nenhuma
+    inicio_do_dia = timezone.make_aware(datetime.combine(date.today(), time.min))
+    return max(carimbo, inicio_do_dia)
+
+
+def _segredo_csrf(request):
+    # O HTML traz o token CSRF: se o segredo mudar (ex.: novo login) a página
+    # cacheada não serve mais. get_token() garante o segredo já na primeira
+    # resposta (que também grava o cookie), então o ETag dela já é o definitivo.
+    get_token(request)
+    return request.META.get('CSRF_COOKIE', '')
+
+
+def _etag_pet(request, *args, **kwargs):
+    carimbo = _carimbo_da_requisicao(request, kwargs)
+    if carimbo is None:
+        return None
+    partes = (
+        request.resolver_match.url_name, request.user.pk, carimbo.isoformat(), date.today().isoformat(),
+        _segredo_csrf(request),
+    )
+    return hashlib.sha1('|'.join(str(p) for p in partes).encode()).hexdigest()
+
+
+pagina_condicional = condition(etag_func=_etag_pet, last_modified_func=_ultima_modificacao_pet)
 
 # ==============================================================================
 # VIEWS PÚBLICAS (NÃO PRECISAM DE LOGIN)
@@ -74,9 +176,40 @@ def logout_view(request):
 # VIEWS PROTEGIDAS (SÓ FUNCIONAM PARA USUÁRIOS LOGADOS)
 # ==============================================================================
 
+def pets_com_resumo(tutor, hoje):
+    """
+    Pets do tutor com os contadores via JOIN com PetStats + data do próximo
+    evento via subquery: uma única consulta, não importa quantos pets o tutor tenha.
+    """
+    proximo_evento = (
+        Evento.objects.filter(pet=OuterRef('pk'), concluido=False, data__gte=hoje)
+        .order_by('data')
+        .values('data')[:1]
+    )
+    return (
+        Pet.objects.filter(tutor=tutor)
+        .select_related('stats')
+        .annotate(proximo_evento=Subquery(proximo_evento))
+        .order_by('nome')
+    )
+
+
 @login_required
 def pet_list(request):
-    pets = Pet.objects.filter(tutor=request.user)
+    hoje = date.today()
+
+    def carregar():
+        pets = list(pets_com_resumo(request.user, hoje))
+
+        sem_stats = [pet for pet in pets if not hasattr(pet, 'stats')]
+        if sem_stats:
+            # Pets gravados sem passar pelos signals (ex.: bulk_create): calcula todos de uma vez
+            for pet, stats in zip(sem_stats, PetStats.recalcular([pet.pk for pet in sem_stats])):
+                pet.stats = stats
+        return pets
+
+    # "Próximo evento" depende do dia, por isso a data entra na chave
+    pets = em_cache('pet_list', request.user.pk, None, carregar, hoje.isoformat())
     return render(request, 'pets/pet_list.html', {'pets': pets})
 
 
@@ -108,14 +241,15 @@ def pet_create(request):
             return render(request, 'pets/pet_form.html', {'values': context_values, 'pet': None})
 
         try:
-            Pet.objects.create(
-                tutor=request.user,
-                nome=nome,
-                especie=especie,
-                raca=raca or None, # Converte '' para None
-                data_nascimento=data_nascimento,
-                peso=peso_decimal
-            )
+            with transaction.atomic():  # Pet + sua linha de PetStats
+                Pet.objects.create(
+                    tutor=request.user,
+                    nome=nome,
+                    especie=especie,
+                    raca=raca or None, # Converte '' para None
+                    data_nascimento=data_nascimento,
+                    peso=peso_decimal
+                )
             messages.success(request, f"Pet '{nome}' adicionado com sucesso!")
             return redirect('pet_list')
         except Exception:
@@ -127,7 +261,7 @@ def pet_create(request):
 
 @login_required
 def pet_edit(request, pk):
-    pet = get_object_or_404(Pet, pk=pk, tutor=request.user)
+    pet = pet_do_tutor(request, pk)
 
     if request.method == 'POST':
         nome = request.POST.get('nome')
@@ -160,7 +294,8 @@ def pet_edit(request, pk):
             pet.raca = raca or None # <<< CORREÇÃO DO BUG 500 ESTÁ AQUI
             pet.data_nascimento = data_nascimento
             pet.peso = peso_decimal
-            pet.save()
+            with transaction.atomic():  # Pet + o registro do histórico de peso, se mudou
+                pet.save()
             messages.success(request, f"Dados de '{pet.nome}' atualizados com sucesso!")
             return redirect('pet_list')
         except Exception:
@@ -180,7 +315,7 @@ def pet_edit(request, pk):
 
 @login_required
 def pet_delete(request, pk):
-    pet = get_object_or_404(Pet, pk=pk, tutor=request.user)
+    pet = pet_do_tutor(request, pk)
     if request.method == 'POST':
         nome_pet_deletado = pet.nome
         pet.delete()
@@ -189,44 +324,69 @@ def pet_delete(request, pk):
     return render(request, 'pets/pet_confirm_delete.html', {'pet': pet})
 
 
-@login_required
-def pet_visao_geral(request, pk):
-    pet = get_object_or_404(Pet, pk=pk, tutor=request.user)
-    
+def eventos_recentes(pet):
+    return Evento.objects.filter(pet=pet).order_by('-data')[:5]
+
+
+def metas_em_andamento(pet):
+    # <<< CORREÇÃO DO BUG 2 (FAIL) >>>
+    # Filtra para mostrar apenas metas em andamento (progresso < 100)
+    return Meta.objects.filter(pet=pet, progresso__lt=100).order_by('progresso', 'data_prazo')
+
+
+def janela_visao_geral(hoje):
+    # Recorrentes: só as ocorrências dos próximos dias
+    return hoje, hoje + timedelta(days=JANELA_VISAO_GERAL - 1)
+
+
+def contexto_visao_geral(request, dados, hoje):
+    """Contexto da visão geral a partir dos dados (cacheados) de pet, eventos, metas e ocorrências."""
+    pet, eventos, metas_em_andamento = dados['pet'], dados['eventos'], dados['metas']
+
     # --- Cálculos dos Stats ---
     idade = None
     if pet.data_nascimento:
-        hoje = date.today()
         idade = hoje.year - pet.data_nascimento.year - ((hoje.month, hoje.day) < (pet.data_nascimento.month, pet.data_nascimento.day))
-    
-    total_eventos = pet.eventos.count()
-    metas_concluidas = pet.metas.filter(progresso=100).count()
-    
-    # --- Listas ---
-    eventos = pet.eventos.all().order_by('-data')[:5]
-    
-    # <<< CORREÇÃO DO BUG 2 (FAIL) >>>
-    # Filtra para mostrar apenas metas em andamento (progresso < 100)
-    metas_em_andamento = pet.metas.filter(progresso__lt=100).order_by('progresso', 'data_prazo')
-    
+
     context = {
-        'pet': pet, 
-        'eventos': eventos, 
+        'pet': pet,
+        'eventos': eventos,
         'metas': metas_em_andamento, # <-- Usa a lista filtrada
-        'idade': idade, 
-        'total_eventos': total_eventos, 
-        'metas_concluidas': metas_concluidas, 
+        'ocorrencias': dados['ocorrencias'],
+        'idade': idade,
+        'total_eventos': pet.stats.total_eventos,
+        'metas_concluidas': pet.stats.metas_concluidas,
     }
-    
+
     if not eventos and not metas_em_andamento:
         messages.info(request, 'Esse pet ainda não possui registros de eventos ou metas.')
-        
-    return render(request, 'pets/pet_visao_geral.html', context)
+    return context
+
+
+@login_required
+@pagina_condicional
+def pet_visao_geral(request, pk):
+    hoje = date.today()
+
+    def carregar():
+        # Pet + contadores do PetStats em uma única consulta (JOIN 1-para-1)
+        pet = pet_do_tutor(request, pk, Pet.objects.select_related('stats'))
+        pet.obter_stats()
+        return {
+            'pet': pet,
+            # list() avalia cada consulta uma única vez; o template e o "if" abaixo reaproveitam o resultado
+            'eventos': list(eventos_recentes(pet)),
+            'metas': list(metas_em_andamento(pet)),
+            'ocorrencias': recorrencia.ocorrencias_do_pet(pet, *janela_visao_geral(hoje)),
+        }
+
+    dados = em_cache('pet_visao_geral', request.user.pk, pk, carregar, hoje.isoformat())
+    return render(request, 'pets/pet_visao_geral.html', contexto_visao_geral(request, dados, hoje))
 
 
 @login_required
 def evento_selecionar_pet(request):
-    pets = Pet.objects.filter(tutor=request.user)
+    pets = Pet.objects.filter(tutor=request.user).order_by('nome')
     if not pets.exists():
         messages.info(request, "Não há pets cadastrados. Cadastre um pet antes de adicionar um evento.")
         return render(request, 'pets/evento_sem_pets.html')
@@ -246,16 +406,74 @@ def evento_selecionar_pet(request):
     return render(request, 'pets/evento_selecionar_pet.html', {'pets': pets})
 
 
+def janela_evento_list(request):
+    """(cursor, início, fim) da lista de eventos: ?cursor= da paginação e a janela das ocorrências a partir de ?de=."""
+    try:
+        inicio = limitar_data(date.fromisoformat(request.GET['de'])) if request.GET.get('de') else date.today()
+    except ValueError:
+        inicio = date.today()
+    return request.GET.get('cursor', ''), inicio, inicio + timedelta(days=JANELA_OCORRENCIAS - 1)
+
+
+def contexto_ocorrencias(ocorrencias, inicio, fim):
+    return {
+        'ocorrencias': ocorrencias,
+        'janela_inicio': inicio,
+        'janela_fim': fim,
+        'janela_anterior': inicio - timedelta(days=JANELA_OCORRENCIAS),
+        'janela_proxima': fim + timedelta(days=1),
+    }
+
+
 @login_required
+@pagina_condicional
 def evento_list(request, pet_pk):
-    pet = get_object_or_404(Pet, pk=pet_pk, tutor=request.user)
-    eventos = Evento.objects.filter(pet=pet).order_by('-data')
-    return render(request, 'pets/evento_list.html', {'pet': pet, 'eventos': eventos})
+    cursor, inicio, fim = janela_evento_list(request)
+
+    def carregar():
+        pet = pet_do_tutor(request, pet_pk)
+        context = {'pet': pet, 'eventos': paginar(request, Evento.objects.filter(pet=pet), ORDENACAO_EVENTOS)}
+        if not cursor:
+            # Ocorrências dos recorrentes só na primeira página, para a janela [inicio, fim]
+            context.update(contexto_ocorrencias(recorrencia.ocorrencias_do_pet(pet, inicio, fim), inicio, fim))
+        return context
+
+    context = em_cache('evento_list', request.user.pk, pet_pk, carregar, cursor, inicio.isoformat())
+    return render(request, 'pets/evento_list.html', context)
+
+
+def _ler_recorrencia(post, data):
+    """Campos de recorrência do formulário de evento -> (dict para o model, mensagem de erro ou None)."""
+    tipo = post.get('recorrencia', '')
+    if tipo not in dict(Evento.RECORRENCIAS):
+        return None, "Recorrência inválida."
+    if not tipo:
+        return {'recorrencia': '', 'intervalo': 1, 'dias_semana': '', 'repetir_ate': None}, None
+    try:
+        intervalo = int(post.get('intervalo') or 1)
+    except ValueError:
+        intervalo = 0
+    if not 1 <= intervalo <= 365:
+        return None, "O intervalo da recorrência deve estar entre 1 e 365."
+    dias = sorted({dia for dia in post.getlist('dias_semana') if dia in {str(n) for n, _ in Evento.DIAS_SEMANA}})
+    repetir_ate = None
+    if post.get('repetir_ate'):
+        try:
+            repetir_ate = date.fromisoformat(post['repetir_ate'])
+            inicio = date.fromisoformat(data)
+        except ValueError:
+            return None, "Data final da recorrência inválida."
+        if repetir_ate < inicio:
+            return None, "A data final da recorrência deve ser depois da data do evento."
+    return {
+        'recorrencia': tipo, 'intervalo': intervalo,
+        'dias_semana': ','.join(dias) if tipo == 'semanal' else '', 'repetir_ate': repetir_ate,
+    }, None
 
 
 @login_required
 def evento_adicionar(request, pet_pk):
-    pet = get_object_or_404(Pet, pk=pet_pk, tutor=request.user)
+    pet = pet_do_tutor(request, pet_pk)
     if request.method == 'POST':
         tipo = request.POST.get('tipo')
         data = request.POST.get('data')
@@ -269,15 +487,22 @@ def evento_adicionar(request, pet_pk):
                 'values': request.POST, 
                 'evento': None 
             }
-            return render(request, 'pets/evento_adicionar.html', context)
+            return _render_form_evento(request, context)
         
         if not observacoes:
             observacoes = None
 
-        Evento.objects.create(
-            pet=pet, tipo=tipo, data=data,
-            observacoes=observacoes
-        )
+        regra, erro = _ler_recorrencia(request.POST, data)
+        if erro:
+            messages.error(request, erro)
+            context = {'pet': pet, 'tipos_evento': Evento.TIPOS_EVENTO, 'values': request.POST, 'evento': None}
+            return _render_form_evento(request, context)
+
+        with transaction.atomic():  # Evento + contadores do PetStats
+            Evento.objects.create(
+                pet=pet, tipo=tipo, data=data,
+                observacoes=observacoes, **regra
+            )
         messages.success(request, "Evento adicionado!")
         return redirect('evento_list', pet_pk=pet.pk)
 
@@ -287,6 +512,20 @@ def evento_adicionar(request, pet_pk):
         'values': {}, 
         'evento': None 
     }
+    return _render_form_evento(request, context)
+
+
+def _render_form_evento(request, context):
+    values = context['values']
+    evento = context['evento']
+    if hasattr(values, 'getlist') and 'recorrencia' in values:
+        dias_marcados = values.getlist('dias_semana')
+    else:
+        dias_marcados = [str(dia) for dia in evento.dias_semana_lista()] if evento else []
+    context.update({
+        'recorrencias': Evento.RECORRENCIAS,
+        'dias_semana': [(str(valor), nome, str(valor) in dias_marcados) for valor, nome in Evento.DIAS_SEMANA],
+    })
     return render(request, 'pets/evento_adicionar.html', context)
 
 
@@ -301,21 +540,30 @@ def evento_edit(request, pk):
         if not tipo or not data:
             messages.error(request, "Os campos Tipo de Evento e Data são obrigatórios.")
             context = {'pet': evento.pet, 'evento': evento, 'tipos_evento': Evento.TIPOS_EVENTO, 'values': request.POST}
-            return render(request, 'pets/evento_adicionar.html', context)
+            return _render_form_evento(request, context)
         
         # <<< CORREÇÃO DO BUG 500 ESTÁ AQUI >>>
         if not observacoes:
             observacoes = None
 
-        evento.tipo = tipo
-        evento.data = data
-        evento.observacoes = observacoes # <-- Salva None
-        evento.save()
+        regra, erro = _ler_recorrencia(request.POST, data)
+        if erro:
+            messages.error(request, erro)
+            context = {'pet': evento.pet, 'evento': evento, 'tipos_evento': Evento.TIPOS_EVENTO, 'values': request.POST}
+            return _render_form_evento(request, context)
+        with transaction.atomic():
+            evento = travar(evento)
+            for campo, valor in regra.items():
+                setattr(evento, campo, valor)
+            evento.tipo = tipo
+            evento.data = data
+            evento.observacoes = observacoes # <-- Salva None
+            evento.save()
         messages.success(request, "Evento atualizado com sucesso!")
-        return redirect('evento_list', pet_pk=evento.pet.pk)
+        return redirect('evento_list', pet_pk=evento.pet_id)
 
     context = {'pet': evento.pet, 'evento': evento, 'tipos_evento': Evento.TIPOS_EVENTO, 'values': {}}
-    return render(request, 'pets/evento_adicionar.html', context)
+    return _render_form_evento(request, context)
 
 
 @login_required
@@ -323,7 +571,8 @@ def evento_delete(request, pk):
     evento = get_object_or_404(Evento, pk=pk, pet__tutor=request.user)
     pet = evento.pet
     if request.method == 'POST':
-        evento.delete()
+        with transaction.atomic():
+            travar(evento).delete()
         messages.success(request, f"Evento '{evento.get_tipo_display()}' removido com sucesso.")
         return redirect('evento_list', pet_pk=pet.pk)
     return render(request, 'pets/evento_confirm_delete.html', {'evento': evento, 'pet': pet})
@@ -332,36 +581,105 @@ def evento_delete(request, pk):
 @login_required
 def evento_concluir(request, pk):
     evento = get_object_or_404(Evento, pk=pk, pet__tutor=request.user)
+    if evento.recorrencia:
+        return _concluir_ocorrencia(request, evento)
     if hasattr(evento, 'concluido') and isinstance(evento.concluido, bool):
-        if evento.concluido:
+        with transaction.atomic():
+            evento = travar(evento)
+            ja_concluido = evento.concluido
+            if not ja_concluido:
+                evento.concluido = True
+                evento.save()
+        if ja_concluido:
             messages.warning(request, 'Esse evento já foi concluído.')
         else:
-            evento.concluido = True
-            evento.save()
             messages.success(request, 'Evento marcado como concluído!')
     else:
         messages.error(request, 'Erro: Campo "concluido" não está configurado corretamente no modelo Evento.')
 
-    return redirect('evento_list', pet_pk=evento.pet.pk)
+    return redirect('evento_list', pet_pk=evento.pet_id)
+
+
+def _concluir_ocorrencia(request, evento):
+    """Evento recorrente: a conclusão é de uma ocorrência (?data=AAAA-MM-DD), guardada como exceção."""
+    try:
+        data = date.fromisoformat(request.GET.get('data', ''))
+    except ValueError:
+        data = None
+    if data is None or not recorrencia.e_ocorrencia(evento, data):
+        messages.error(request, 'Escolha uma ocorrência válida do evento recorrente.')
+        return redirect('evento_list', pet_pk=evento.pet_id)
+
+    with transaction.atomic():
+        _, criada = ExcecaoRecorrencia.objects.get_or_create(evento=evento, data=data)
+        if criada:
+            # Toca o evento: atualiza o carimbo (ETag) e invalida o cache do pet pelos signals
+            evento.save(update_fields=['atualizado_em'])
+    if criada:
+        messages.success(request, f'Ocorrência de {data:%d/%m/%Y} marcada como concluída!')
+    else:
+        messages.warning(request, 'Essa ocorrência já foi concluída.')
+    # Volta para a janela que estava sendo vista
+    try:
+        janela = date.fromisoformat(request.GET.get('de', ''))
+    except ValueError:
+        janela = data
+    return redirect(f"{reverse('evento_list', args=[evento.pet_id])}?de={janela.isoformat()}")
 
 
 @login_required
+def evento_lote(request):
+    """Mesmo evento (ex.: campanha de vacinação) para vários pets em um único INSERT."""
+    pets = Pet.objects.filter(tutor=request.user).order_by('nome')
+    context = {'pets': pets, 'tipos_evento': Evento.TIPOS_EVENTO, 'values': {}, 'selecionados': []}
+
+    if request.method == 'POST':
+        pet_ids = request.POST.getlist('pets')
+        context['values'] = request.POST
+        context['selecionados'] = [int(pk) for pk in pet_ids if pk.isdigit()]
+        if not pet_ids:
+            messages.error(request, "Selecione pelo menos um pet.")
+            return render(request, 'pets/evento_lote.html', context)
+
+        linhas = [
+            {'pet': pk, 'tipo': request.POST.get('tipo'), 'data': request.POST.get('data'), 'observacoes': request.POST.get('observacoes')}
+            for pk in pet_ids
+        ]
+        try:
+            criados = lote.criar_eventos(request.user, linhas)
+        except ValidationError as erro:
+            for mensagem in erro.messages:
+                messages.error(request, mensagem)
+            return render(request, 'pets/evento_lote.html', context)
+
+        messages.success(request, f"Evento adicionado para {len(criados)} pet(s)!")
+        return redirect('pet_list')
+
+    return render(request, 'pets/evento_lote.html', context)
+
+
+@login_required
+@pagina_condicional
 def meta_list(request, pet_pk):
-    pet = get_object_or_404(Pet, pk=pet_pk, tutor=request.user)
     if request.method == 'POST':
+        pet = pet_do_tutor(request, pet_pk)
         descricao = request.POST.get('descricao')
         data_prazo = request.POST.get('data_prazo')
         if not descricao or not data_prazo:
             messages.error(request, 'Preencha a descrição e a data para adicionar a meta.')
         else:
-            Meta.objects.create(
-                pet=pet, descricao=descricao, data_prazo=data_prazo
-            )
+            with transaction.atomic():
+                Meta.objects.create(
+                    pet=pet, descricao=descricao, data_prazo=data_prazo
+                )
             messages.success(request, 'Meta adicionada!')
         return redirect('meta_list', pet_pk=pet.pk)
 
-    metas = Meta.objects.filter(pet=pet).order_by('progresso', 'data_prazo')
-    context = {'pet': pet, 'metas': metas}
+    def carregar():
+        pet = pet_do_tutor(request, pet_pk)
+        return {'pet': pet, 'metas': paginar(request, Meta.objects.filter(pet=pet), ORDENACAO_METAS)}
+
+    context = em_cache('meta_list', request.user.pk, pet_pk, carregar, request.GET.get('cursor', ''))
     return render(request, 'pets/meta_list.html', context)
 
 
@@ -376,12 +694,14 @@ def meta_atualizar_progresso(request, pk):
             # ❗ Bloqueia valor 0%
             if progresso == 0:
                 messages.error(request, 'O progresso não pode ser 0%. Defina um valor maior.')
-                return redirect('pet_visao_geral', pk=meta.pet.pk)
+                return redirect('pet_visao_geral', pk=meta.pet_id)
 
             # ❗ Continua validação normal
             if 1 <= progresso <= 100:
-                meta.progresso = progresso
-                meta.save()
+                with transaction.atomic():
+                    meta = travar(meta)
+                    meta.progresso = progresso
+                    meta.save()
                 messages.success(request, 'Progresso da meta atualizado!')
             else:
                 messages.error(request, 'O progresso deve estar entre 1 e 100.')
@@ -389,38 +709,51 @@ def meta_atualizar_progresso(request, pk):
         except (ValueError, TypeError):
             messages.error(request, 'Valor de progresso inválido.')
 
-    return redirect('pet_visao_geral', pk=meta.pet.pk)
+    return redirect('pet_visao_geral', pk=meta.pet_id)
 @login_required
 def meta_remover(request, pk):
     meta = get_object_or_404(Meta, pk=pk, pet__tutor=request.user)
 
     if request.method == 'POST':
-        pet_pk = meta.pet.pk
-        meta.delete()
+        pet_pk = meta.pet_id
+        with transaction.atomic():
+            travar(meta).delete()
         messages.success(request, "Meta removida com sucesso!")
         return redirect('meta_list', pet_pk=pet_pk)
 
     # Caso alguém tente acessar por GET, apenas redireciona sem apagar
     messages.error(request, "Requisição inválida para remover meta.")
-    return redirect('meta_list', pet_pk=meta.pet.pk)
+    return redirect('meta_list', pet_pk=meta.pet_id)
+
+
 
+def itens_da_lista(pet, comprado):
+    # Value(...) gera "comprado = %s" em vez de "NOT comprado", que o SQLite não
+    # consegue usar no índice (pet, comprado, criado_em).
+    return ItemCompra.objects.filter(pet=pet, comprado=Value(comprado))
 
 
 @login_required
+@pagina_condicional
 def shop_list_view(request, pet_pk):
-    pet = get_object_or_404(Pet, pk=pet_pk, tutor=request.user)
+    pet = pet_do_tutor(request, pet_pk)
     
     if request.method == 'POST':
         descricao = request.POST.get('descricao')
         if not descricao:
             messages.error(request, 'Você precisa digitar o nome do item.')
         else:
-            ItemCompra.objects.create(pet=pet, descricao=descricao)
+            with transaction.atomic():
+                ItemCompra.objects.create(pet=pet, descricao=descricao)
             messages.success(request, 'Item adicionado à lista de compras!')
         return redirect('shop_list', pet_pk=pet.pk)
     
-    itens_nao_comprados = ItemCompra.objects.filter(pet=pet, comprado=False).order_by('criado_em')
-    itens_comprados = ItemCompra.objects.filter(pet=pet, comprado=True).order_by('-criado_em')
+    itens_nao_comprados = paginar(
+        request, itens_da_lista(pet, False), ORDENACAO_ITENS_A_COMPRAR, parametro='cursor_a_comprar',
+    )
+    itens_comprados = paginar(
+        request, itens_da_lista(pet, True), ORDENACAO_ITENS_COMPRADOS, parametro='cursor_comprados',
+    )
     
     context = {
         'pet': pet,
@@ -434,15 +767,17 @@ def shop_list_view(request, pet_pk):
 def shop_item_marcar(request, pk):
     item = get_object_or_404(ItemCompra, pk=pk, pet__tutor=request.user)
     
-    item.comprado = not item.comprado
-    item.save()
+    with transaction.atomic():
+        item = travar(item)
+        item.comprado = not item.comprado
+        item.save()
     
     if item.comprado:
         messages.success(request, f"Item '{item.descricao}' marcado como comprado!")
     else:
         messages.info(request, f"Item '{item.descricao}' movido de volta para a lista.")
         
-    return redirect('shop_list', pet_pk=item.pet.pk)
+    return redirect('shop_list', pet_pk=item.pet_id)
 
 
 @login_required
@@ -451,8 +786,180 @@ def shop_item_remover(request, pk):
     descricao_item = item.descricao
     
     if request.method == 'POST':
-        item.delete()
+        with transaction.atomic():
+            travar(item).delete()
         messages.success(request, f"Item '{descricao_item}' removido da lista.")
-        return redirect('shop_list', pet_pk=item.pet.pk)
+        return redirect('shop_list', pet_pk=item.pet_id)
     
-    return render(request, 'pets/shop_item_confirm_delete.html', {'item': item})
\ No newline at end of file
+    return render(request, 'pets/shop_item_confirm_delete.html', {'item': item})
+
+
+@login_required
+def shop_lote(request, pet_pk):
+    """Vários itens (um por linha do textarea) em um único INSERT."""
+    if request.method == 'POST':
+        descricoes = [linha.strip() for linha in request.POST.get('itens', '').splitlines() if linha.strip()]
+        if not descricoes:
+            messages.error(request, 'Digite pelo menos um item (um por linha).')
+        else:
+            try:
+                criados = lote.criar_itens(request.user, [{'pet': pet_pk, 'descricao': d} for d in descricoes])
+                messages.success(request, f"{len(criados)} itens adicionados à lista de compras!")
+            except ValidationError as erro:
+                for mensagem in erro.messages:
+                    messages.error(request, mensagem)
+    return redirect('shop_list', pet_pk=pet_pk)
+
+
+@login_required
+def exportar_view(request):
+    """
+    Histórico completo do tutor (ou só o que mudou desde ?desde=) em CSV ou JSONL.
+    GET: por streaming, na hora. POST: enfileira a exportação para o worker e
+    manda para a página da tarefa, de onde o arquivo é baixado quando ficar pronto.
+    """
+    parametros = request.POST if request.method == 'POST' else request.GET
+    formato = parametros.get('formato', 'csv')
+    if formato not in exportacao.FORMATOS:
+        return HttpResponseBadRequest("Formato inválido. Use csv ou jsonl.")
+    desde = None
+    if parametros.get('desde'):
+        try:
+            desde = exportacao.interpretar_desde(parametros['desde'])
+        except ValueError:
+            return HttpResponseBadRequest("Parâmetro 'desde' inválido. Use AAAA-MM-DD ou data/hora ISO 8601.")
+
+    if request.method == 'POST':
+        tarefa = tarefas.enfileirar('exportacao', tutor=request.user, formato=formato, desde=desde)
+        messages.success(request, "Exportação enfileirada! O arquivo fica disponível aqui assim que for gerado.")
+        return redirect('tarefa_detalhe', pk=tarefa.pk)
+
+    linhas = exportacao.linhas(formato, tutores=[request.user.pk], desde=desde)
+    tipo = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    resposta = StreamingHttpResponse(exportacao.em_blocos(linhas), content_type=f'{tipo}; charset=utf-8')
+    resposta['Content-Disposition'] = f'attachment; filename="vetlab-{request.user.username}.{formato}"'
+    return resposta
+
+
+# ==============================================================================
+# AGENDA (TODOS OS PETS DO TUTOR) E FEED .ICS
+# ==============================================================================
+
+@login_required
+def agenda_view(request):
+    hoje = date.today()
+    try:
+        inicio = limitar_data(date.fromisoformat(request.GET['de'])) if request.GET.get('de') else hoje
+        fim = limitar_data(date.fromisoformat(request.GET['ate'])) if request.GET.get('ate') else inicio + timedelta(days=JANELA_AGENDA - 1)
+    except ValueError:
+        messages.error(request, "Datas inválidas. Use o formato AAAA-MM-DD.")
+        inicio, fim = hoje, hoje + timedelta(days=JANELA_AGENDA - 1)
+    if fim < inicio:
+        inicio, fim = fim, inicio
+    fim = min(fim, inicio + timedelta(days=JANELA_AGENDA_MAXIMA - 1))
+    dias = (fim - inicio).days + 1
+
+    itens = em_cache('agenda', request.user.pk, None, lambda: agenda.itens_da_agenda(request.user, inicio, fim), inicio.isoformat(), fim.isoformat())
+    context = {
+        'itens': itens,
+        'inicio': inicio,
+        'fim': fim,
+        'anterior': (inicio - timedelta(days=dias), inicio - timedelta(days=1)),
+        'proxima': (fim + timedelta(days=1), fim + timedelta(days=dias)),
+        'hoje': hoje,
+        'url_feed': request.build_absolute_uri(f"{reverse('agenda_ics')}?token={agenda.token_agenda(request.user)}"),
+    }
+    return render(request, 'pets/agenda.html', context)
+
+
+def _tutor_do_feed(request):
+    # Clientes de calendário não têm a sessão: o token na URL identifica o tutor
+    if '_tutor_feed' not in request.__dict__:
+        token = request.GET.get('token')
+        if token:
+            request._tutor_feed = agenda.usuario_do_token(token)
+        else:
+            request._tutor_feed = request.user if request.user.is_authenticated else None
+    return request._tutor_feed
+
+
+def _carimbo_feed(request):
+    if '_carimbo_feed' not in request.__dict__:
+        tutor = _tutor_do_feed(request)
+        request._carimbo_feed = agenda.carimbo_agenda(tutor) if tutor else (None, None)
+    return request._carimbo_feed
+
+
+@condition(
+    etag_func=lambda request: _carimbo_feed(request)[1],
+    last_modified_func=lambda request: _carimbo_feed(request)[0],
+)
+def agenda_ics(request):
+    tutor = _tutor_do_feed(request)
+    if tutor is None:
+        return HttpResponseForbidden("Token de calendário inválido.")
+    resposta = StreamingHttpResponse(
+        agenda.linhas_ics(tutor, request.get_host().split(':')[0]),
+        content_type='text/calendar; charset=utf-8',
+    )
+    resposta['Content-Disposition'] = 'inline; filename="vetlab.ics"'
+    return resposta
+
+
+# ==============================================================================
+# BUSCA TEXTUAL
+# ==============================================================================
+
+@login_required
+def busca_view(request):
+    texto = request.GET.get('q', '').strip()[:200]
+    resultados = []
+    if busca.termos(texto):
+        # Mesma geração de cache do tutor: qualquer escrita invalida as buscas salvas
+        resultados = em_cache('busca', request.user.pk, None, lambda: busca.buscar(request.user, texto), texto)
+    return render(request, 'pets/busca.html', {'texto': texto, 'resultados': resultados})
+
+
+# ==============================================================================
+# RELATÓRIOS DA CLÍNICA (SÓ EQUIPE)
+# ==============================================================================
+
+@login_required
+def relatorios_view(request):
+    if not request.user.is_staff:
+        return HttpResponseForbidden("Relatórios disponíveis apenas para a equipe da clínica.")
+    if request.method == 'POST':
+        # As consultas agregadas rodam no worker, fora da requisição
+        tarefas.enfileirar('relatorios', tutor=request.user)
+        messages.success(request, "Atualização dos relatórios enfileirada; recarregue a página em instantes.")
+        return redirect('relatorios')
+    # Só lê os snapshots prontos (gerados por `manage.py relatorios` ou pelo worker)
+    snapshots = relatorios.mais_recentes()
+    context = {
+        'relatorios': [(tipo, titulo, snapshots.get(tipo)) for tipo, titulo in RelatorioSnapshot.TIPOS],
+    }
+    return render(request, 'pets/relatorios.html', context)
+
+
+# ==============================================================================
+# TAREFAS EM SEGUNDO PLANO (SITUAÇÃO E DOWNLOAD)
+# ==============================================================================
+
+@login_required
+def tarefa_detalhe(request, pk):
+    tarefa = get_object_or_404(Tarefa, pk=pk, tutor=request.user)
+    context = {'tarefa': tarefa}
+    if tarefa.tipo == 'exportacao' and tarefa.situacao == 'concluida':
+        context['arquivo_expira_em'] = tarefas.arquivo_expira_em(tarefa)
+        context['arquivo_expirou'] = not os.path.exists(tarefas.caminho_do_arquivo(tarefa.resultado['arquivo']))
+    return render(request, 'pets/tarefa.html', context)
+
+
+@login_required
+def tarefa_arquivo(request, pk):
+    tarefa = get_object_or_404(Tarefa, pk=pk, tutor=request.user, tipo='exportacao', situacao='concluida')
+    caminho = tarefas.caminho_do_arquivo(tarefa.resultado['arquivo'])
+    if not os.path.exists(caminho):
+        raise Http404("Arquivo da exportação expirou; peça uma nova.")
+    formato = tarefa.argumentos.get('formato', 'csv')
+    return FileResponse(open(caminho, 'rb'), as_attachment=True, filename=f'vetlab-{request.user.username}.{formato}')
@@ -0,0 +1,147 @@
+# ==============================================================================
+# VIEWS ASSÍNCRONAS DAS PÁGINAS DE LEITURA (DEPLOY ASGI)
+# ==============================================================================
+# Versões async de pet_list, pet_visao_geral, evento_list, meta_list e
+# shop_list_view, com o ORM assíncrono (aget, afirst, async for) e o cache pela
+# API async. Sob ASGI as views síncronas passam por sync_to_async a cada
+# requisição; estas só vão para a thread do banco nas consultas. As consultas
+# rodam uma depois da outra: o ORM assíncrono as executa todas na mesma thread
+# do banco, então dispará-las juntas não as faria correr em paralelo.
+#
+# Desligadas por padrão, também sob ASGI: VETLAB_VIEWS_ASSINCRONAS=True troca o
+# ROOT_URLCONF por project/urls_assincronas.py. Consultas, contexto e
+# templates são os mesmos das views de pets/views.py; POST (adicionar meta /
+# item) continua nas views síncronas.
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import aget_object_or_404, render
+
+from . import recorrencia, views
+from .cache import aem_cache
+from .models import Evento, Meta, Pet, PetStats
+from .paginacao import apaginar
+
+
+def _login_obrigatorio(view):
+    """
+    login_required que também carrega request.user: o contexto `user` dos
+    templates e as checagens de dono não podem consultar o banco de forma
+    síncrona dentro do event loop.
+    """
+    @wraps(view)
+    async def com_usuario(request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return com_usuario
+
+
+def _pagina_condicional(view):
+    """pagina_condicional com o carimbo do pet lido antes, pelo ORM assíncrono (as funções de ETag são síncronas)."""
+    condicional = views.pagina_condicional(view)
+
+    @wraps(view)
+    async def com_carimbo(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD') and not len(messages.get_messages(request)):
+            pk = kwargs.get('pk', kwargs.get('pet_pk'))
+            carimbos = request.__dict__.setdefault('_carimbos_pet', {})
+            if pk not in carimbos:
+                carimbos[pk] = await Pet.acarimbo(pk, request.user)
+        return await condicional(request, *args, **kwargs)
+    return com_carimbo
+
+
+async def apet_do_tutor(request, pk, queryset=None):
+    """pet_do_tutor() assíncrono: o pet ou 404."""
+    return await aget_object_or_404(Pet.objects.all() if queryset is None else queryset, pk=pk, tutor=request.user)
+
+
+async def _lista(queryset):
+    return [obj async for obj in queryset]
+
+
+@_login_obrigatorio
+async def pet_list(request):
+    hoje = date.today()
+
+    async def carregar():
+        pets = await _lista(views.pets_com_resumo(request.user, hoje))
+        sem_stats = [pet for pet in pets if not hasattr(pet, 'stats')]
+        if sem_stats:
+            for pet, stats in zip(sem_stats, await sync_to_async(PetStats.recalcular)([pet.pk for pet in sem_stats])):
+                pet.stats = stats
+        return pets
+
+    pets = await aem_cache('pet_list', request.user.pk, None, carregar, hoje.isoformat())
+    return render(request, 'pets/pet_list.html', {'pets': pets})
+
+
+@_login_obrigatorio
+@_pagina_condicional
+async def pet_visao_geral(request, pk):
+    hoje = date.today()
+
+    async def carregar():
+        # O pet primeiro: se não for do tutor, o 404 sai sem consultar as listas
+        pet = await apet_do_tutor(request, pk, Pet.objects.select_related('stats'))
+        eventos = await _lista(views.eventos_recentes(pk))
+        metas = await _lista(views.metas_em_andamento(pk))
+        ocorrencias = await recorrencia.aocorrencias_do_pet(pk, *views.janela_visao_geral(hoje))
+        if not hasattr(pet, 'stats'):
+            await sync_to_async(pet.obter_stats)()
+        return {'pet': pet, 'eventos': eventos, 'metas': metas, 'ocorrencias': ocorrencias}
+
+    dados = await aem_cache('pet_visao_geral', request.user.pk, pk, carregar, hoje.isoformat())
+    return render(request, 'pets/pet_visao_geral.html', views.contexto_visao_geral(request, dados, hoje))
+
+
+@_login_obrigatorio
+@_pagina_condicional
+async def evento_list(request, pet_pk):
+    cursor, inicio, fim = views.janela_evento_list(request)
+
+    async def carregar():
+        pet = await apet_do_tutor(request, pet_pk)
+        eventos = await apaginar(request, Evento.objects.filter(pet=pet_pk), views.ORDENACAO_EVENTOS)
+        context = {'pet': pet, 'eventos': eventos}
+        if not cursor:
+            ocorrencias = await recorrencia.aocorrencias_do_pet(pet_pk, inicio, fim)
+            context.update(views.contexto_ocorrencias(ocorrencias, inicio, fim))
+        return context
+
+    context = await aem_cache('evento_list', request.user.pk, pet_pk, carregar, cursor, inicio.isoformat())
+    return render(request, 'pets/evento_list.html', context)
+
+
+@_login_obrigatorio
+@_pagina_condicional
+async def meta_list(request, pet_pk):
+    if request.method == 'POST':
+        return await sync_to_async(views.meta_list)(request, pet_pk=pet_pk)
+
+    async def carregar():
+        pet = await apet_do_tutor(request, pet_pk)
+        metas = await apaginar(request, Meta.objects.filter(pet=pet_pk), views.ORDENACAO_METAS)
+        return {'pet': pet, 'metas': metas}
+
+    context = await aem_cache('meta_list', request.user.pk, pet_pk, carregar, request.GET.get('cursor', ''))
+    return render(request, 'pets/meta_list.html', context)
+
+
+@_login_obrigatorio
+@_pagina_condicional
+async def shop_list_view(request, pet_pk):
+    if request.method == 'POST':
+        return await sync_to_async(views.shop_list_view)(request, pet_pk=pet_pk)
+
+    context = {'pet': await apet_do_tutor(request, pet_pk)}
+    context['itens_nao_comprados'] = await apaginar(
+        request, views.itens_da_lista(pet_pk, False), views.ORDENACAO_ITENS_A_COMPRAR, parametro='cursor_a_comprar')
+    context['itens_comprados'] = await apaginar(
+        request, views.itens_da_lista(pet_pk, True), views.ORDENACAO_ITENS_COMPRADOS, parametro='cursor_comprados')
+    return render(request, 'pets/petshop.html', context)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+# As views assíncronas das páginas de leitura não vêm ligadas aqui: quem faz o
+# deploy liga com VETLAB_VIEWS_ASSINCRONAS=True depois de medir (ver CONTRIBUTING)
 
 application = get_asgi_application()
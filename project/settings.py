@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os 
+import sys
 import dj_database_url
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -20,11 +23,24 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
+# Perfil de configuração: 'desenvolvimento' (padrão: runserver e testes) ou
+# 'producao' (Render). Os blocos abaixo que dependem do perfil dizem o que
+# muda; as variáveis de ambiente específicas de cada um valem por cima dele.
+VETLAB_PERFIL = os.environ.get('VETLAB_PERFIL', 'desenvolvimento')
+if VETLAB_PERFIL not in ('desenvolvimento', 'producao'):
+    raise ImproperlyConfigured(f"VETLAB_PERFIL inválido: {VETLAB_PERFIL!r} (use desenvolvimento ou producao).")
+PRODUCAO = VETLAB_PERFIL == 'producao'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-(3vzc&z%-^+p$$if(2#y&b)txe+a+-pzve0$4ucw-5!&82fcj4'
+# A chave fixa só vale para desenvolvimento e testes; em produção SECRET_KEY é obrigatória.
+SECRET_KEY = os.environ.get('SECRET_KEY') or (
+    None if PRODUCAO else 'django-insecure-(3vzc&z%-^+p$$if(2#y&b)txe+a+-pzve0$4ucw-5!&82fcj4'
+)
+if SECRET_KEY is None:
+    raise ImproperlyConfigured("VETLAB_PERFIL=producao exige a variável de ambiente SECRET_KEY.")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', 'False' if PRODUCAO else 'True') == 'True'
 
 ALLOWED_HOSTS = ['vetlab.onrender.com', 'localhost', '127.0.0.1']
 
@@ -42,9 +58,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    
+    # Primeiro da lista: o tempo total medido inclui todos os outros middlewares
+    'pets.instrumentacao.InstrumentacaoMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise que também aceita a cadeia assíncrona (deploy ASGI)
+    'pets.estaticos.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -52,12 +70,22 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
-
-ROOT_URLCONF = 'project.urls'
+if PRODUCAO:
+    # Produção: HTML/JSON comprimidos com gzip (estáticos já saem pré-comprimidos
+    # do WhiteNoise, por isso fica depois dele). O GZipMiddleware do Django
+    # embaralha o tamanho da resposta contra o ataque BREACH.
+    MIDDLEWARE.insert(MIDDLEWARE.index('pets.estaticos.WhiteNoiseMiddleware') + 1, 'django.middleware.gzip.GZipMiddleware')
+
+# Views assíncronas nas páginas de leitura (pets/views_assincronas.py). O
+# project/asgi.py liga por padrão; sob WSGI fica desligado, porque lá uma view
+# async precisa de um event loop por requisição.
+VETLAB_VIEWS_ASSINCRONAS = os.environ.get('VETLAB_VIEWS_ASSINCRONAS', 'False') == 'True'
+ROOT_URLCONF = 'project.urls_assincronas' if VETLAB_VIEWS_ASSINCRONAS else 'project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + medição do tempo de render para o Server-Timing / métricas
+        'BACKEND': 'pets.instrumentacao.TemplatesInstrumentados',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -69,6 +97,18 @@ TEMPLATES = [
         },
     },
 ]
+if PRODUCAO:
+    # Produção: templates compilados uma vez por processo (loader em cache), sem
+    # checar alterações nos arquivos. O Django já usa o loader em cache quando
+    # 'loaders' não é informado; aqui fica explícito para não se perder se
+    # alguém configurar loaders próprios.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
 
 WSGI_APPLICATION = 'project.wsgi.application'
 
@@ -77,20 +117,107 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 # Configuração de Banco de Dados Inteligente
+#
+# Reaproveitamento de conexões (medido com `benchmark_vetlab --conexoes`):
+# - DB_CONN_MAX_AGE: segundos que a conexão fica aberta entre requisições do
+#   mesmo processo/thread (0 = uma conexão nova por requisição). Padrão 600 no
+#   WSGI; 0 com VETLAB_VIEWS_ASSINCRONAS=True (ASGI), onde cada requisição roda
+#   numa thread nova e a conexão persistente não seria reaproveitada (use o pool).
+# - DB_CONN_HEALTH_CHECKS: testa a conexão reaproveitada antes do primeiro uso
+#   em cada requisição (evita erro se o PostgreSQL a derrubou).
+# - DB_POOL=True: pool de conexões do psycopg 3 (`psycopg[binary,pool]` no
+#   requirements.txt); DB_POOL_MIN/DB_POOL_MAX/DB_POOL_TIMEOUT por processo.
+#   Com o pool, CONN_MAX_AGE fica 0: quem guarda as conexões é o pool.
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'
+DB_CONN_MAX_AGE = 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 0 if VETLAB_VIEWS_ASSINCRONAS else 600))
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
 if 'DATABASE_URL' in os.environ:
     # Estamos no Render, use o PostgreSQL
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        'default': dj_database_url.parse(
+            os.environ.get('DATABASE_URL'),
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        )
     }
+    if DB_POOL:
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
 else:
     # Estamos no computador local, use o SQLite
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Abrir conexão no SQLite é barato; o padrão segue o do PostgreSQL para o
+            # comportamento local ser o mesmo da produção
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
         }
     }
 
+# Cache (páginas por tutor/pet, pets/cache.py)
+# LocMemCache por padrão: um cache em cada processo. Serve para o runserver e
+# para um deploy com um único processo. A invalidação por geração só alcança
+# quem lê o mesmo cache, então com vários workers do servidor (ou com o
+# vetlab_worker, o import_vetlab e o recalcular_stats gravando por fora) use um
+# backend compartilhado, ex.: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# e CACHE_LOCATION=redis://... Com o LocMemCache, uma escrita feita em outro
+# processo deixa páginas velhas no ar por até VETLAB_CACHE_TIMEOUT;
+# `manage.py check --deploy` avisa quando o perfil de produção está assim.
+CACHE_LOCAL = 'django.core.cache.backends.locmem.LocMemCache'
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', CACHE_LOCAL),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'vetlab'),
+    }
+}
+
+# Sessões e mensagens (medido com `benchmark_vetlab --sessoes`)
+# Com o backend 'db' (padrão do Django, usado no desenvolvimento) toda
+# requisição logada lê a sessão no banco. No perfil de produção:
+# - cached_db: a sessão é lida do cache e só vai ao banco na falta ou ao gravar.
+#   Exige cache compartilhado entre os processos (CACHE_BACKEND=...RedisCache):
+#   com o LocMemCache um logout em um worker não derrubaria a cópia guardada nos
+#   outros, então sem cache compartilhado a produção continua em 'db'.
+# - SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies: nenhuma
+#   consulta nem escrita, mas o logout não invalida cópias antigas do cookie.
+# As mensagens ficam no FallbackStorage padrão do Django: vão no cookie e só
+# gravam na sessão quando não cabem nele.
+CACHE_COMPARTILHADO = CACHES['default']['BACKEND'] not in (CACHE_LOCAL, 'django.core.cache.backends.dummy.DummyCache')
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', (
+    'django.contrib.sessions.backends.cached_db' if PRODUCAO and CACHE_COMPARTILHADO
+    else 'django.contrib.sessions.backends.db'
+))
+
+# Tempo (s) que as páginas por tutor/pet ficam no cache; escritas invalidam antes disso
+VETLAB_CACHE_TIMEOUT = int(os.environ.get('VETLAB_CACHE_TIMEOUT', 300))
+
+# Instrumentação (pets/instrumentacao.py): token que o Prometheus envia em
+# 'Authorization: Bearer ...' para ler /metrics (sem token, só a equipe logada)
+# e a partir de quantas repetições da mesma consulta o log acusa um N+1.
+VETLAB_METRICAS_TOKEN = os.environ.get('VETLAB_METRICAS_TOKEN', '')
+VETLAB_N_MAIS_1_LIMITE = int(os.environ.get('VETLAB_N_MAIS_1_LIMITE', 5))
+
+# E-mail (lembretes de eventos, `manage.py lembretes`)
+# Console por padrão; em produção, ex.: EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend
+# com EMAIL_HOST/EMAIL_PORT/EMAIL_HOST_USER/EMAIL_HOST_PASSWORD.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'False') == 'True'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'VETLAB <nao-responda@vetlab.local>')
+
+# Tarefas em segundo plano (pets/tarefas.py, `manage.py vetlab_worker`): pasta
+# onde as exportações geradas pelo worker ficam até o tutor baixar.
+VETLAB_ARQUIVOS_TAREFAS = os.environ.get('VETLAB_ARQUIVOS_TAREFAS', str(BASE_DIR / 'arquivos_tarefas'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -110,6 +237,12 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Nos testes (`manage.py test`) o PBKDF2 de cada create_user/login dominava o
+# tempo da suíte; um hasher rápido basta para senhas de teste.
+if len(sys.argv) > 1 and sys.argv[1] == 'test':
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -134,4 +267,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Produção: `collectstatic` grava cada arquivo com o hash do conteúdo no nome
+# (style.3f2a….css) e já comprimido (.gz, e .br se o pacote brotli estiver
+# instalado); o WhiteNoise serve a versão comprimida que o navegador aceita, com
+# Cache-Control "immutable" de um ano, pois o nome muda quando o conteúdo muda.
+# Exige rodar `python manage.py collectstatic --noinput` no build.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': (
+        'whitenoise.storage.CompressedManifestStaticFilesStorage' if PRODUCAO
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+    )},
+}
 LOGIN_URL = '/pets/login/'
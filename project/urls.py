@@ -4,6 +4,7 @@ from django.contrib import admin
 from django.urls import path, include
 # IMPORTAMOS AS VIEWS DO APP PETS
 from pets import views as pets_views
+from pets import instrumentacao
 
 urlpatterns = [
     # A linha abaixo vai renderizar nossa página inicial na raiz do site
@@ -11,4 +12,6 @@ urlpatterns = [
     
     path('admin/', admin.site.urls),
     path('pets/', include('pets.urls')),
+    path('api/v1/', include('pets.api_urls')),
+    path('metrics', instrumentacao.metricas, name='metricas'),
 ]
\ No newline at end of file
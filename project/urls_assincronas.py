@@ -0,0 +1,7 @@
+# ROOT_URLCONF com VETLAB_VIEWS_ASSINCRONAS (deploy ASGI): as mesmas URLs de
+# project/urls.py, com as páginas de leitura de pets/ nas versões assíncronas.
+from django.urls import include, path
+
+from .urls import urlpatterns as urlpatterns_sincronas
+
+urlpatterns = [path('pets/', include('pets.urls_assincronas'))] + urlpatterns_sincronas